@@ -0,0 +1,105 @@
+"""
+Size, and write and read throughput, of compressed spec files.
+
+The spec of a synthetic package (see `synthetic.py`), or the given spec file,
+is written with `save_spec` and read back with `load_spec` as plain JSON and
+with each codec and level. Throughput is in MB of uncompressed text per
+second; memory is the peak of `tracemalloc` while reading, to be compared with
+the size of the text.
+
+    python benchmarks/bench_codecs.py [--scale medium] [--spec FILE]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from synthetic import generate_package
+
+from frappuccino import compression, load_spec, save_spec, visit_modules
+
+SCALES = {
+    "small": dict(modules=10, classes=5, methods=10, depth=3),
+    "medium": dict(modules=50, classes=10, methods=20, depth=5),
+    "large": dict(modules=200, classes=20, methods=30, depth=10),
+}
+
+# name, suffix, level.
+CODECS = [
+    ("plain", "", None),
+    ("gz:1", ".gz", 1),
+    ("gz:6", ".gz", 6),
+    ("gz:9", ".gz", 9),
+    ("xz:0", ".xz", 0),
+    ("xz:6", ".xz", 6),
+]
+
+
+def synthetic_spec(directory: Path, scale: str):
+    modules = generate_package(directory, mutations=0.0, **SCALES[scale])
+    sys.path.insert(0, str(directory))
+    return visit_modules(modules[0], modules)[1].spec
+
+
+def bench(spec, directory: Path):
+    plain = directory / "spec.json"
+    save_spec(plain, spec)
+    text_size = os.path.getsize(plain)
+    print(
+        "{} entries, {:.1f} MB of JSON".format(len(spec), text_size / 2**20),
+    )
+    print(
+        "{:<8}{:>10}{:>8}{:>14}{:>13}{:>13}".format(
+            "codec", "size MB", "ratio", "write MB/s", "read MB/s", "read peak MB"
+        )
+    )
+    for name, suffix, level in CODECS:
+        if suffix == ".gz":
+            compression.GZIP_LEVEL = level
+        elif suffix == ".xz":
+            compression.XZ_PRESET = level
+        path = directory / ("spec.json" + suffix)
+        start = time.perf_counter()
+        save_spec(path, spec)
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = load_spec(path)
+        read = time.perf_counter() - start
+        assert loaded == spec
+        del loaded
+        tracemalloc.start()
+        load_spec(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = os.path.getsize(path)
+        print(
+            "{:<8}{:>10.2f}{:>7.1f}x{:>14.1f}{:>13.1f}{:>13.1f}".format(
+                name,
+                size / 2**20,
+                text_size / size,
+                text_size / 2**20 / write,
+                text_size / 2**20 / read,
+                peak / 2**20,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", default="medium", choices=list(SCALES))
+    parser.add_argument("--spec", help="spec file to use instead")
+    options = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        if options.spec:
+            spec = load_spec(options.spec)
+        else:
+            spec = synthetic_spec(Path(tmp) / "package", options.scale)
+        bench(spec, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Time and memory of crawling, saving, loading and comparing specs.
+
+For each scale, an "old" and a mutated "new" synthetic package are generated
+(see `synthetic.py`). Each is crawled with `visit_modules` in a fresh process,
+which also times `serialize_spec`; `deserialize_spec` and `compare` are then
+measured in this process. Memory is the peak of `tracemalloc` for in process
+phases, and the maximum resident set size of the worker for crawling.
+
+Results are printed and written to `benchmarks/results/<date>-<commit>.json`;
+pass a previous results file with `--compare-to` to see ratios.
+
+    python benchmarks/bench_crawl.py [--scales small medium] [--compare-to FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from synthetic import generate_package
+
+import frappuccino
+from frappuccino import compare, deserialize_spec, serialize_spec, visit_modules
+
+# modules, classes per module, methods per class, inheritance chain length.
+SCALES = {
+    "small": dict(modules=10, classes=5, methods=10, depth=3),
+    "medium": dict(modules=50, classes=10, methods=20, depth=5),
+    "large": dict(modules=200, classes=20, methods=30, depth=10),
+}
+
+MUTATIONS = 0.02
+
+RESULTS = Path(__file__).parent / "results"
+
+
+def _measure(function, *args):
+    """
+    Return the result of `function(*args)`, its duration and peak memory; the
+    function is called twice, as tracing memory slows it down.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": elapsed, "peak_bytes": peak}
+
+
+def _crawl(directory, modules, conn):
+    import resource
+
+    sys.path.insert(0, directory)
+    start = time.perf_counter()
+    _, visitor = visit_modules(modules[0], modules)
+    crawl = {
+        "seconds": time.perf_counter() - start,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    data, serialize = _measure(serialize_spec, visitor.spec)
+    conn.send((data, len(visitor.spec), crawl, serialize))
+    conn.close()
+
+
+def crawl(directory, modules):
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_crawl, args=(str(directory), modules, child))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def run_scale(scale: str) -> dict:
+    params = SCALES[scale]
+    results = {"parameters": params}
+    specs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for version, mutations in [("old", 0.0), ("new", MUTATIONS)]:
+            directory = Path(tmp) / version
+            modules = generate_package(directory, mutations=mutations, **params)
+            data, entries, crawled, serialized = crawl(directory, modules)
+            specs[version], loaded = _measure(deserialize_spec, data)
+            if version == "old":
+                results.update(
+                    entries=entries,
+                    size_bytes=len(data),
+                    crawl=crawled,
+                    serialize_spec=serialized,
+                    deserialize_spec=loaded,
+                )
+    differences, results["compare"] = _measure(
+        lambda: compare(specs["old"], spec=specs["new"])
+    )
+    results["differences"] = [len(d) for d in differences]
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+PHASES = ["crawl", "serialize_spec", "deserialize_spec", "compare"]
+
+
+def report(results: dict, previous: dict = None):
+    for scale, result in results["scales"].items():
+        print(
+            "{} ({} entries, {:.1f} MB spec):".format(
+                scale, result["entries"], result["size_bytes"] / 2**20
+            )
+        )
+        for phase in PHASES:
+            measure = result[phase]
+            memory = measure.get("peak_bytes", measure.get("max_rss_bytes"))
+            line = "    {:<17} {:8.3f}s {:8.1f} MB".format(
+                phase, measure["seconds"], memory / 2**20
+            )
+            if previous and scale in previous["scales"]:
+                before = previous["scales"][scale][phase]["seconds"]
+                line += "  ({:.2f}x)".format(measure["seconds"] / before)
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scales", nargs="*", default=["small", "medium"], choices=list(SCALES)
+    )
+    parser.add_argument("--compare-to", help="previous results file")
+    parser.add_argument("--output", default=str(RESULTS), help="results directory")
+    options = parser.parse_args()
+
+    results = {
+        "frappuccino": frappuccino.__version__,
+        "commit": _commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scales": {scale: run_scale(scale) for scale in options.scales},
+    }
+    previous = None
+    if options.compare_to:
+        with open(options.compare_to) as f:
+            previous = json.load(f)
+    report(results, previous)
+
+    output = Path(options.output)
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / "{}-{}.json".format(
+        results["date"].replace(":", ""), results["commit"]
+    )
+    with path.open("w") as f:
+        json.dump(results, f, indent=2)
+    print("Results written to", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Throughput of reading string signatures back from spec files.
+
+Compares `sigparse.parse_signature` with the previous approach of compiling and
+executing `def f<signature>: pass` for each function, on synthetic signatures
+shaped like the ones found in real spec files.
+
+    python benchmarks/bench_sigparse.py [number of signatures]
+"""
+
+import inspect
+import random
+import sys
+import time
+
+from frappuccino.sigparse import parse_signature
+from frappuccino.visitor import sig_dump
+
+DEFAULTS = ["'None'", "0", "1.5", "True", "'utf-8'", "-1", "inf", "'a, b'"]
+
+
+def make_signature(rng: random.Random) -> str:
+    params = ["self"]
+    for i in range(rng.randint(0, 6)):
+        if rng.random() < 0.5:
+            params.append("arg{}={}".format(i, rng.choice(DEFAULTS)))
+        else:
+            params.append("arg{}".format(i))
+    # required parameters must come first.
+    params.sort(key=lambda p: "=" in p)
+    if rng.random() < 0.2:
+        params.append("*args")
+    if rng.random() < 0.3:
+        if not params[-1].startswith("*"):
+            params.append("*")
+        params.append("key={}".format(rng.choice(DEFAULTS)))
+    if rng.random() < 0.2:
+        params.append("**kwargs")
+    return "({})".format(", ".join(params))
+
+
+def exec_signature(text: str):
+    d = {"inf": float("inf")}
+    exec(f"def f{text}:pass", d)
+    return sig_dump(inspect.signature(d["f"]))
+
+
+def bench(name, function, signatures):
+    start = time.perf_counter()
+    for text in signatures:
+        function(text)
+    elapsed = time.perf_counter() - start
+    print(
+        "{:>14}: {:>10,.0f} signatures/s ({:.3f}s)".format(
+            name, len(signatures) / elapsed, elapsed
+        )
+    )
+    return elapsed
+
+
+def main(n: int = 100_000):
+    rng = random.Random(0)
+    signatures = [make_signature(rng) for _ in range(n)]
+    for text in signatures[:1000]:
+        assert parse_signature(text) == exec_signature(text), text
+    old = bench("exec", exec_signature, signatures)
+    new = bench("parse_signature", parse_signature, signatures)
+    print("speedup: {:.1f}x".format(old / new))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
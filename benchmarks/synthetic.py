@@ -0,0 +1,84 @@
+"""
+Generate synthetic packages to benchmark frappuccino on.
+
+A package has `modules` modules, each with `classes` classes of `methods`
+methods and as many module level functions. Classes of a module form
+inheritance chains of length `depth`, the first class of each chain deriving
+from a class of the previous module, so members accumulate along the chains.
+
+Generating the same package with `mutations > 0` gives a "new" version of it,
+where that fraction of functions and methods had their API changed (renamed,
+added or removed parameter, changed default) or were removed.
+"""
+
+import random
+from pathlib import Path
+from typing import List
+
+MUTATIONS = ["rename", "add", "remove_param", "default", "remove"]
+
+
+def _function(name: str, rng: random.Random, mutations: float, indent="") -> List[str]:
+    params = ["a", "b=1", "*", "c=None"]
+    if rng.random() < mutations:
+        kind = rng.choice(MUTATIONS)
+        if kind == "remove":
+            return []
+        if kind == "rename":
+            params[0] = "x"
+        elif kind == "add":
+            params.append("d=0")
+        elif kind == "remove_param":
+            params.remove("b=1")
+        elif kind == "default":
+            params[1] = "b=2"
+    if indent:
+        params.insert(0, "self")
+    return [
+        "{}def {}({}):".format(indent, name, ", ".join(params)),
+        "{}    pass".format(indent),
+        "",
+    ]
+
+
+def generate_package(
+    directory,
+    name: str = "synthpkg",
+    *,
+    modules: int = 10,
+    classes: int = 5,
+    methods: int = 10,
+    depth: int = 3,
+    mutations: float = 0.0,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Write package `name` in `directory`, and return the names of its modules.
+    """
+    rng = random.Random(seed)
+    package = Path(directory) / name
+    package.mkdir(parents=True, exist_ok=True)
+    names = ["mod{}".format(m) for m in range(modules)]
+    (package / "__init__.py").write_text(
+        "from . import {}\n".format(", ".join(names)) if names else ""
+    )
+    for m, module in enumerate(names):
+        lines = []
+        if m:
+            lines += ["from .mod{} import Class{}_0 as _Base".format(m - 1, m - 1), ""]
+        for c in range(classes):
+            if c % depth:
+                base = "Class{}_{}".format(m, c - 1)
+            else:
+                base = "_Base" if m else "object"
+            lines.append("class Class{}_{}({}):".format(m, c, base))
+            lines.append("    attribute = {}".format(c))
+            lines.append("")
+            for k in range(methods):
+                lines += _function(
+                    "method{}_{}".format(c, k), rng, mutations, indent="    "
+                )
+        for k in range(methods):
+            lines += _function("function{}".format(k), rng, mutations)
+        (package / (module + ".py")).write_text("\n".join(lines))
+    return [name] + ["{}.{}".format(name, module) for module in names]
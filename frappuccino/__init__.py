@@ -48,7 +48,6 @@ Frappuccino is there to help.
 __version__ = "0.0.8"
 
 import argparse
-import importlib
 import inspect
 import json
 import re
@@ -56,15 +55,40 @@ import sys
 import types
 from argparse import RawTextHelpFormatter
 from collections import defaultdict
-from copy import copy
+from collections.abc import Mapping
 from inspect import Parameter, Signature
 from pathlib import Path
 from textwrap import dedent
 
 import pytoml
 
+from .astinit import visit_modules_static
+from .batch import run_batch
+from .binary import BinarySpec, dump_binary, is_binary
+from .cache import CrawlCache
+from .compression import compression_suffix, open_spec, strip_compression
+from .fingerprint import Spec, api_changed
+from .gitrev import spec_for_rev
+from .history import load_history
+from .importcost import import_regressions, is_import_cost_key, measure_imports
 from .logging import logger
-from .visitor import Visitor, hexuniformify, sig_dump
+from .parallel import CrawlResult, merge_entry, partial_spec, visit_modules_parallel
+from .profiling import CrawlProfile, import_module, module_section, phase_section
+from .records import signature, to_json
+from .sigparse import parse_signature
+from .sortedspec import compare_sorted, report_sorted, sort_spec
+from .store import SpecStore
+from .stream import (
+    SpecStream,
+    dump_json,
+    is_ndjson,
+    iter_json,
+    read_ndjson,
+    write_ndjson,
+)
+from .stubs import StubIndex
+from .visitor import Visitor, hexuniformify, register, resolve_items, sig_dump
+from .watch import Watcher, request, serve, watch
 
 
 def format_signature_from_dump(data):
@@ -73,10 +97,9 @@ def format_signature_from_dump(data):
     """
     prms = []
     for k, v in data:
-        v = copy(v)
-        default = v.pop("default")
-        kind = getattr(Parameter, v.pop("kind"))
-        name = v.pop("name")
+        default = v["default"]
+        kind = getattr(Parameter, v["kind"])
+        name = v["name"]
         annotation = v.get("annotation", inspect._empty)
         if default == "<class 'inspect._empty'>":
             default = inspect._empty
@@ -93,30 +116,54 @@ def format_signature_from_dump(data):
 
 
 def deserialize_spec(compact_spec):
-    compact_spec = json.loads(compact_spec)
-    expanded_spec = dict()
-    for type_, container in compact_spec.items():
-        for k, v in container.items():
-            if type_ == "function":
-                if isinstance(v, str):
-                    d = {"inf": float("inf")}
-                    try:
-                        exec(f"def f{v}:pass", d)
-                        sig = sig_dump(inspect.signature(d["f"]))
-                    except:
-                        print("V is ", repr(v))
-                else:
-                    sig = v
-                assert k not in expanded_spec
-                expanded_spec[k] = {"signature": sig}
-            else:
-                assert k not in expanded_spec
-                expanded_spec[k] = v
+    """
+    Inverse of `serialize_spec`.
 
-            expanded_spec[k]["type"] = type_
+    `compact_spec` is the serialised text, or a text file it is read from a
+    chunk at a time (see `stream.iter_json`).
+    """
+    if isinstance(compact_spec, str):
+        entries = (
+            (k, type_, v)
+            for type_, container in json.loads(compact_spec).items()
+            for k, v in container.items()
+        )
+    else:
+        entries = iter_json(compact_spec)
+    expanded_spec = Spec()
+    for k, type_, v in entries:
+        assert k not in expanded_spec
+        expanded_spec[k] = _expand_entry(type_, v)
     return expanded_spec
 
 
+def _expand_entry(type_, stored):
+    """
+    Inverse of `_compact_entry`.
+    """
+    if type_ == "function":
+        if isinstance(stored, str):
+            sig = parse_signature(stored)
+        else:
+            sig = stored
+        entry = {"signature": signature(sig)}
+    else:
+        entry = stored
+    entry["type"] = type_
+    return entry
+
+
+def _compact_entry(value):
+    """
+    Return the type of a spec entry, and what needs to be stored for it.
+    """
+    type_ = value["type"]
+    store = {k: v for k, v in value.items() if k != "type"}
+    if type_ == "function":
+        store = _serialise_function_signature(store["signature"])
+    return type_, store
+
+
 def serialize_spec(expanded_spec):
     """Serialise an API spec.
 
@@ -127,14 +174,62 @@ def serialize_spec(expanded_spec):
 
 
     """
+    return json.dumps(_compact_spec(expanded_spec), indent=2, default=to_json)
+
+
+def save_spec(path, spec):
+    """
+    Write `spec`, a mapping or an iterable of `(key, entry)` pairs, to `path`.
+
+    Files with a `.ndjson` or `.jsonl` extension are written one entry per
+    line as entries come, `.fspec` files in the binary format of
+    `frappuccino.binary`, others like `serialize_spec` does. Files with a
+    further `.gz` or `.xz` extension are compressed, see `compression`.
+    """
+    _check_compression(path)
+    if is_ndjson(path):
+        with open_spec(path, "w") as f:
+            write_ndjson(spec.items() if isinstance(spec, Mapping) else spec, f)
+        return
+    if not isinstance(spec, Mapping):
+        entries, spec = spec, Spec()
+        for key, entry in entries:
+            merge_entry(spec, key, entry)
+    if is_binary(path):
+        with open(path, "wb") as f:
+            dump_binary(spec, f)
+    else:
+        with open_spec(path, "w") as f:
+            dump_json(spec, f)
+
+
+def load_spec(path):
+    """
+    Read a spec written by `save_spec`.
+
+    Binary spec files are memory mapped and entries decoded when accessed,
+    others are read a chunk at a time.
+    """
+    _check_compression(path)
+    if is_binary(path):
+        return BinarySpec(path)
+    with open_spec(path) as f:
+        if is_ndjson(path):
+            return read_ndjson(f)
+        return deserialize_spec(f)
+
+
+def _check_compression(path):
+    if compression_suffix(path) and is_binary(strip_compression(path)):
+        raise ValueError("Binary spec files cannot be compressed: {}".format(path))
+
+
+def _compact_spec(expanded_spec):
     compact_spec = defaultdict(lambda: {})
     for key, value in expanded_spec.items():
-        type_ = value["type"]
-        store = {k: v for k, v in value.items() if k != "type"}
-        if type_ == "function":
-            store = _serialise_function_signature(store["signature"])
+        type_, store = _compact_entry(value)
         compact_spec[type_][key] = store
-    return json.dumps(compact_spec, indent=2)
+    return compact_spec
 
 
 def _serialise_function_signature(function_signature):
@@ -148,10 +243,12 @@ def _serialise_function_signature(function_signature):
     for argname, parameter_info in function_signature:
         if parameter_info["kind"] == "POSITIONAL_ONLY":
             return function_signature
-        parameter_info = copy(parameter_info)
-        default = parameter_info.pop("default")
-        kind = getattr(Parameter, parameter_info.pop("kind"))
-        name = parameter_info.pop("name")
+        if type(parameter_info["default"]) not in (str, int, float, bool):
+            # for example IntEnum members, their repr is not a literal.
+            return function_signature
+        default = parameter_info["default"]
+        kind = getattr(Parameter, parameter_info["kind"])
+        name = parameter_info["name"]
         annotation = parameter_info.get("annotation", inspect._empty)
         if default == "<class 'inspect._empty'>":
             default = inspect._empty
@@ -186,7 +283,16 @@ def params_compare(old_ps, new_ps):
         raise
 
 
-def visit_modules(rootname: str, modules):
+def visit_modules(
+    rootname: str,
+    modules,
+    *,
+    cache=None,
+    stubs=None,
+    own_members=False,
+    resolve_lazy=False,
+    profile=None,
+):
     """
     visit given modules and return a tree visitor that have visited the given modules.
 
@@ -201,31 +307,79 @@ def visit_modules(rootname: str, modules):
 
     Another example would be namespace packages.
 
+    If a `CrawlCache` is given, each module is visited on its own and its
+    fragment reused as long as the source of the module, and of the modules its
+    entries come from, did not change. A `CrawlResult` is then returned in place
+    of the visitor.
+
+    `stubs` is the `StubIndex` where signatures of extension modules are looked
+    up when they cannot be inspected. See `Visitor` for `own_members` and
+    `resolve_lazy`.
+
+    If a `CrawlProfile` is given, imports and visits are timed in it, per
+    module, phase and `visit_*` method.
+
     This is not made to explore multiple top level modules. (Maybe we
     should allow that for things that re-expose other projects but that's a
     question for another time.
     """
-    tree_visitor = Visitor(rootname.split(".")[0], logger=logger)
+    if cache is not None:
+        return _visit_modules_cached(
+            rootname, modules, cache, stubs, own_members, resolve_lazy, profile
+        )
+    tree_visitor = Visitor(
+        rootname.split(".")[0],
+        logger=logger,
+        profile=profile,
+        stubs=stubs,
+        own_members=own_members,
+        resolve_lazy=resolve_lazy,
+    )
     skipped = []
     for module_name in modules:
         # Here we allow also ModuleTypes for easy testing, figure out a clean
         # way with stable types. Likely move the requirement to import things
         # one more level up, then we can also remove the need for catching
         # import,runtime and attribute errors and push it to the caller.
-        if isinstance(module_name, types.ModuleType):
-            module = module_name
-        else:
-            try:
-                module = importlib.import_module(module_name)
-            except (ImportError, RuntimeError, AttributeError):
-                skipped.append(module_name)
-                raise
-                continue
-        tree_visitor.visit(module)
+        name = getattr(module_name, "__name__", module_name)
+        with module_section(profile, name, tree_visitor.spec):
+            if isinstance(module_name, types.ModuleType):
+                module = module_name
+            else:
+                try:
+                    module = import_module(module_name, profile)
+                except (ImportError, RuntimeError, AttributeError):
+                    skipped.append(module_name)
+                    raise
+                    continue
+            tree_visitor.visit(module)
 
     return skipped, tree_visitor
 
 
+def _visit_modules_cached(
+    rootname: str, modules, cache, stubs, own_members, resolve_lazy, profile
+):
+    result = CrawlResult()
+    for module_name in modules:
+        fragment = cache.get(rootname, module_name)
+        if fragment is None:
+            visitor = Visitor(
+                rootname.split(".")[0],
+                logger=logger,
+                profile=profile,
+                stubs=stubs,
+                own_members=own_members,
+                resolve_lazy=resolve_lazy,
+            )
+            with module_section(profile, module_name, visitor.spec):
+                visitor.visit(import_module(module_name, profile))
+            fragment = partial_spec(rootname, module_name, visitor)
+            cache.put(rootname, module_name, fragment)
+        result.merge(fragment)
+    return [], result
+
+
 def _sorted_list(it):
 
     return list(sorted(it, key=str))
@@ -237,10 +391,21 @@ def compare(old_spec, *, spec):
 
     Todo:  yield better structured informations
 
+    If both specs have a fingerprint, only entries in subtrees whose
+    fingerprints differ are looked at. Import costs are not compared, see
+    `import_regressions`.
     """
     new_spec = spec
-    new_spec_keys = set(new_spec.keys())
-    old_spec_keys = set(old_spec.keys())
+    # look at the types, accessing `fingerprint` may compute it.
+    if hasattr(type(old_spec), "fingerprint") and hasattr(type(new_spec), "fingerprint"):
+        if not api_changed(old_spec, new_spec):
+            return [], [], []
+        candidates = old_spec.fingerprint.changed_keys(new_spec.fingerprint)
+        new_spec_keys = {k for k in candidates if k in new_spec}
+        old_spec_keys = {k for k in candidates if k in old_spec}
+    else:
+        new_spec_keys = {k for k in new_spec.keys() if not is_import_cost_key(k)}
+        old_spec_keys = {k for k in old_spec.keys() if not is_import_cost_key(k)}
 
     _common_keys = new_spec_keys.intersection(old_spec_keys)
     _removed_keys = old_spec_keys.difference(new_spec_keys)
@@ -249,48 +414,10 @@ def compare(old_spec, *, spec):
     # Todo, print that only if there are differences.
     changed_keys = []
     for key in sorted(_common_keys):
-        from_dump = old_spec[key]
-        current_spec = new_spec[key]
-
-        if from_dump != current_spec:
-
-            if current_spec["type"] == "type":  # Classes / Module / Function
-                current_spec_item = current_spec["items"]
-                try:
-                    from_dump = from_dump["items"]
-                except KeyError:
-                    continue
-                new = [k for k in current_spec_item if k not in from_dump]
-                if new:
-                    for n in new:
-                        changed_keys.append([key, None, n])
-                removed = [k for k in from_dump if k not in current_spec_item]
-                if removed:
-                    for r in removed:
-                        changed_keys.append([key, r, None])
-            elif current_spec["type"] == "function":
-                from_dump = from_dump["signature"]
-                current_spec_item = current_spec["signature"]
-                changed_keys.append(
-                    [
-                        key,
-                        format_signature_from_dump(from_dump),
-                        format_signature_from_dump(current_spec_item),
-                    ]
-                )
-            elif current_spec["type"] == "module_item":
-                pass  # not implemented.
-            else:
-                raise ValueError(current_spec["type"])
-    new_keys = []
-    for k in _added_keys:
-        current_spec = new_spec[k]
-        if current_spec["type"] == "function":
-            new_keys.append(
-                [k, str(format_signature_from_dump(current_spec["signature"]))]
-            )
-        else:
-            new_keys.append([k, ""])
+        changed_keys.extend(
+            _compare_entry(key, old_spec[key], new_spec[key], old_spec, new_spec)
+        )
+    new_keys = [_new_key(k, new_spec[k]) for k in _added_keys]
 
     return (
         _sorted_list(new_keys),
@@ -299,6 +426,155 @@ def compare(old_spec, *, spec):
     )
 
 
+def _compare_entry(key, from_dump, current_spec, old_spec, new_spec):
+    """
+    `[key, old, new]` rows of `compare` for `key`, an entry of both specs.
+    """
+    changed_keys = []
+    if from_dump == current_spec:
+        return changed_keys
+
+    if current_spec["type"] == "type":  # Classes / Module / Function
+        current_spec_item = resolve_items(new_spec, current_spec)
+        try:
+            from_dump = resolve_items(old_spec, from_dump)
+        except KeyError:
+            return changed_keys
+        if from_dump == current_spec_item:
+            return changed_keys
+        new = [k for k in current_spec_item if k not in from_dump]
+        if new:
+            for n in new:
+                changed_keys.append([key, None, n])
+        removed = [k for k in from_dump if k not in current_spec_item]
+        if removed:
+            for r in removed:
+                changed_keys.append([key, r, None])
+    elif current_spec["type"] == "function":
+        from_dump = from_dump["signature"]
+        current_spec_item = current_spec["signature"]
+        changed_keys.append(
+            [
+                key,
+                format_signature_from_dump(from_dump),
+                format_signature_from_dump(current_spec_item),
+            ]
+        )
+    elif current_spec["type"] == "module_item":
+        pass  # not implemented.
+    else:
+        raise ValueError(current_spec["type"])
+    return changed_keys
+
+
+def _new_key(key, current_spec):
+    """
+    `[key, signature]` row of `compare` for `key`, only in the new spec.
+    """
+    if current_spec["type"] == "function":
+        return [key, str(format_signature_from_dump(current_spec["signature"]))]
+    return [key, ""]
+
+
+def moved_keys(removed_keys, *, spec):
+    """
+    Return `[old key, new key]` for the removed keys that are still reachable
+    as members of their class in `spec`, through one of its bases.
+    """
+    moved = []
+    for key in removed_keys:
+        owner, _, name = key.rpartition(".")
+        entry = spec.get(owner)
+        if entry is None or entry["type"] != "type":
+            continue
+        target = resolve_items(spec, entry).get(name)
+        if target and target != key:
+            moved.append([key, target])
+    return moved
+
+
+def report_comparison(
+    old_spec, spec, *, import_threshold=0.2, profile=None, compared=None
+):
+    """
+    Print the differences between `old_spec` and `spec`, and the modules that
+    became more expensive to import, and return whether there are any.
+
+    `compared` is whether the API changed and the result of `compare`, when
+    they are already known (see `sortedspec.compare_sorted`).
+    """
+    if compared is None:
+        changed = api_changed(old_spec, spec)
+        with phase_section(profile, "compare"):
+            compared = compare(old_spec, spec=spec)
+    else:
+        changed, compared = compared
+    if not changed:
+        print("API unchanged.")
+
+    new_keys, removed_keys, changed_keys = compared
+    if new_keys:
+        print("The following items are new:")
+        for n in new_keys:
+            print("    +", n[0] + n[1])
+        print()
+    moved = moved_keys(removed_keys, spec=spec)
+    if moved:
+        print("The following items have moved to a superclass:")
+        for o, n in moved:
+            print("    -", o, "->", n)
+        print()
+    removed_keys = [k for k in removed_keys if k not in {o for o, _ in moved}]
+    if removed_keys:
+        print("The following items have been removed:")
+        for o in removed_keys:
+            print("    -", o)
+        print()
+    if changed_keys:
+        print("The following signatures differ between versions:")
+        for k, o, n in changed_keys:
+            if n is None or o is None:
+                continue
+            print()
+            print(f"    - {k}{o}")
+            print(f"    + {k}{n}")
+
+        print()
+        print("The following attribute seem new, but we are not too sure,")
+        print("(They might be new inherited attributes, or stuff we don't handle yet)")
+        print()
+        for k, o, n in changed_keys:
+            if o is not None or f"{k}.(n)" in new_keys:
+                continue
+
+            print(f"    + {k}.{n}")
+
+        print()
+        print("The following attribute seem to have been removed:")
+        print(
+            "(They might have been inherited attributes, or stuff we didn't handle then)"
+        )
+        print()
+        for k, o, n in changed_keys:
+            if n is not None or f"{k}.{o}" in removed_keys:
+                continue
+            print(f"    - {k}.{o}")
+
+    regressions = import_regressions(old_spec, spec, import_threshold)
+    if regressions:
+        print()
+        print("The following modules are more expensive to import:")
+        for module_name, metric, old, new in regressions:
+            if metric == "seconds":
+                old, new = f"{old * 1000:.1f} ms", f"{new * 1000:.1f} ms"
+            else:
+                old, new = f"{old / 2**20:.1f} MB", f"{new / 2**20:.1f} MB"
+            print(f"    ! {module_name} {metric}: {old} -> {new}")
+        print()
+
+    return bool(new_keys or removed_keys or changed_keys or regressions)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description=dedent(
@@ -338,7 +614,13 @@ def main():
         help="root modules and submodules",
     )
     parser.add_argument(
-        "--save", action="store", help="file to dump API to", metavar="<file>"
+        "--save",
+        action="store",
+        help=(
+            "file to dump API to; .fspec files are binary, .ndjson and .jsonl "
+            "files have one entry per line, others are JSON."
+        ),
+        metavar="<file>",
     )
     parser.add_argument(
         "--version", action="store_true", help="print version number on exit."
@@ -349,7 +631,176 @@ def main():
         help="file with dump API to compare to",
         metavar="<file>",
     )
+    parser.add_argument(
+        "--compare-rev",
+        action="store",
+        help=(
+            "compare to the API at this revision of the git repository of the "
+            "current directory, crawled from a temporary worktree and cached "
+            "by commit."
+        ),
+        metavar="<rev>",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store",
+        nargs=2,
+        help=(
+            "compare two spec files without crawling, a key range per --jobs "
+            "worker, without loading them in memory."
+        ),
+        metavar=("<old>", "<new>"),
+    )
+    parser.add_argument(
+        "--store",
+        action="store",
+        help=(
+            "SQLite database of specs; --save stores the spec as that version "
+            "of the first module, and --compare also looks versions up there."
+        ),
+        metavar="<db>",
+    )
+    parser.add_argument(
+        "--history",
+        action="store",
+        nargs="+",
+        help=(
+            "print when each item changed across these spec files, oldest "
+            "first, and the crawled modules if any."
+        ),
+        metavar="<file>",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "keep running, re-crawl modules as their sources change, and print "
+            "the comparison again each time."
+        ),
+    )
+    parser.add_argument(
+        "--serve",
+        action="store",
+        help=(
+            "keep running like --watch, answering the --connect requests sent "
+            "to this Unix socket."
+        ),
+        metavar="<socket>",
+    )
+    parser.add_argument(
+        "--connect",
+        action="store",
+        help=(
+            "print the --compare report of the frappuccino --serve listening "
+            "on this Unix socket, instead of crawling."
+        ),
+        metavar="<socket>",
+    )
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--own-members",
+        action="store_true",
+        help=(
+            "only record members classes define themselves, and their bases; "
+            "inherited members are resolved when comparing."
+        ),
+    )
+    parser.add_argument(
+        "--resolve-lazy",
+        action="store_true",
+        help=(
+            "import the attributes modules load lazily in their __getattr__, "
+            "instead of recording them from their loader or stubs."
+        ),
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="print a digest of the API, that changes whenever the API does.",
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store",
+        type=int,
+        default=1,
+        help="crawl each module in a separate process, using that many workers.",
+        metavar="<n>",
+    )
+    parser.add_argument(
+        "--timeout",
+        action="store",
+        type=float,
+        help="with --jobs, skip modules taking more than that to crawl.",
+        metavar="<seconds>",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store",
+        help=(
+            "crawl each of the given modules, or of the modules of the "
+            "[tool.frappuccino.configuration] table of pyproject.toml, in its "
+            "own interpreter, --jobs at a time, comparing them to their path in "
+            "its `baselines` table, and write their specs and a summary.json "
+            "to this directory."
+        ),
+        metavar="<dir>",
+    )
+    parser.add_argument(
+        "--static",
+        action="store_true",
+        help="build the spec from source files without importing them when possible.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        action="store",
+        help="directory where to cache per-module crawl results.",
+        metavar="<dir>",
+    )
+    parser.add_argument(
+        "--cache-size",
+        action="store",
+        type=int,
+        default=512,
+        help="maximum size of the crawl cache (default 512).",
+        metavar="<MB>",
+    )
+    parser.add_argument(
+        "--import-cost",
+        action="store_true",
+        help=(
+            "measure import time and memory of the modules in new interpreters "
+            "and store them in the spec."
+        ),
+    )
+    parser.add_argument(
+        "--import-threshold",
+        action="store",
+        type=float,
+        default=0.2,
+        help=(
+            "with --compare, report modules whose import cost grew by more than "
+            "that ratio (default 0.2)."
+        ),
+        metavar="<ratio>",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print where the time goes, per phase, visit method and module.",
+    )
+    parser.add_argument(
+        "--profile-json",
+        action="store",
+        help="write the --profile results to a JSON file.",
+        metavar="<file>",
+    )
+    parser.add_argument(
+        "--max-memory",
+        action="store",
+        type=int,
+        help="with --jobs, maximum memory of each worker process.",
+        metavar="<MB>",
+    )
 
     # TODO add stdin/stdout options for spec.
 
@@ -369,80 +820,267 @@ def main():
     if options.debug:
         logger.setLevel("DEBUG")
 
+    if options.history and not options.modules:
+        print(load_history(options.history).report())
+        sys.exit(0)
+    if options.diff:
+        old, new = options.diff
+        changed = report_sorted(
+            old, new, jobs=options.jobs, import_threshold=options.import_threshold
+        )
+        sys.exit(int(changed))
+    if options.batch:
+        configuration = conf.get("configuration", {})
+        packages = options.modules or configuration.get("modules", [])
+        if not packages:
+            sys.exit("Pass at least one module name, or configure modules")
+        summary = run_batch(
+            packages,
+            options.batch,
+            baselines=configuration.get("baselines", {}),
+            jobs=options.jobs if options.jobs > 1 else None,
+            timeout=options.timeout,
+            static=options.static,
+            own_members=options.own_members,
+            resolve_lazy=options.resolve_lazy,
+        )
+        width = max(len(p) for p in packages)
+        for package, result in summary["packages"].items():
+            print(
+                "{:<{w}}  {:<9}  {:>7.2f}s".format(
+                    package, result["status"], result["seconds"], w=width
+                )
+            )
+        print("Total: {:.2f}s".format(summary["seconds"]))
+        sys.exit(summary["status"])
+    if options.compare and options.compare_rev:
+        sys.exit("--compare and --compare-rev are exclusive")
+    if options.connect:
+        if not options.compare:
+            sys.exit("--connect needs --compare")
+        name = options.compare
+        if Path(name).exists():
+            # the server may run from another directory.
+            name = str(Path(name).resolve())
+        reply = request(
+            options.connect,
+            {"compare": name, "import_threshold": options.import_threshold},
+        )
+        print(reply["report"], end="")
+        sys.exit(reply["status"])
     if not options.modules:
         sys.exit("Pass at least one module name")
+    if options.static and options.own_members:
+        sys.exit("--own-members is not supported with --static")
+    if options.static and options.resolve_lazy:
+        sys.exit("--resolve-lazy is not supported with --static")
+    profile = None
+    if options.profile or options.profile_json:
+        if options.static or options.jobs > 1:
+            sys.exit("--profile is not supported with --static or --jobs")
+        profile = CrawlProfile()
 
     rootname = options.modules[0]
     # tree_visitor = Visitor(rootname.split('.')[0], logger=logger)
 
-    skipped, tree_visitor = visit_modules(rootname, options.modules)
-    if skipped:
-        print("skipped modules :", ",".join(skipped))
+    cache = None
+    if options.cache_dir:
+        cache = CrawlCache(
+            options.cache_dir,
+            max_size=options.cache_size * 2**20,
+            variant=",".join(
+                name
+                for name, enabled in [
+                    ("own-members", options.own_members),
+                    ("resolve-lazy", options.resolve_lazy),
+                ]
+                if enabled
+            ),
+        )
+        stubs = StubIndex(cache.directory / "stubs")
+    else:
+        stubs = StubIndex()
 
-    print("Collected (Object founds):", len(tree_visitor.collected))
-    print("Visited (don't start with _, not in stdlib...):", len(tree_visitor.visited))
-    print(
-        "Rejected (Unknown nodes, or instances, don't know what to do with those):",
-        len(tree_visitor.rejected),
-    )
-    print()
+    store = SpecStore(options.store) if options.store else None
 
-    if options.save:
-        with open(options.save, "w") as f:
-            f.write(serialize_spec(tree_visitor.spec))
-    if options.compare:
-        with open(options.compare, "r") as f:
-            loaded = deserialize_spec(f.read())
-
-        # round trip for testing, and make a deepcopy
-        spec = deserialize_spec(serialize_spec(tree_visitor.spec))
-        assert spec == tree_visitor.spec
-
-        new_keys, removed_keys, changed_keys = compare(loaded, spec=tree_visitor.spec)
-        if new_keys:
-            print("The following items are new:")
-            for n in new_keys:
-                print("    +", n[0] + n[1])
-            print()
-        if removed_keys:
-            print("The following items have been removed (or moved to superclass):")
-            for o in removed_keys:
-                print("    -", o)
-            print()
-        if changed_keys:
-            print("The following signatures differ between versions:")
-            for k, o, n in changed_keys:
-                if n is None or o is None:
-                    continue
-                print()
-                print(f"    - {k}{o}")
-                print(f"    + {k}{n}")
+    def load_compare(name):
+        if store is not None and (rootname, name) in store:
+            return store.load(rootname, name)
+        return load_spec(name)
 
-            print()
-            print("The following attribute seem new, but we are not too sure,")
-            print(
-                "(They might be new inherited attributes, or stuff we don't handle yet)"
+    def load_baseline():
+        if options.compare_rev:
+            try:
+                return spec_for_rev(
+                    options.compare_rev,
+                    options.modules,
+                    cache_dir=options.cache_dir and Path(options.cache_dir) / "revs",
+                    static=options.static,
+                    own_members=options.own_members,
+                    resolve_lazy=options.resolve_lazy,
+                )
+            except RuntimeError as e:
+                sys.exit(str(e))
+        if options.compare:
+            return load_compare(options.compare)
+        return None
+
+    if options.watch or options.serve:
+        if options.static or options.jobs > 1:
+            sys.exit("--watch and --serve are not supported with --static or --jobs")
+        watcher = Watcher(
+            rootname,
+            options.modules,
+            stubs=stubs,
+            own_members=options.own_members,
+            resolve_lazy=options.resolve_lazy,
+        )
+        if options.serve:
+            print("Listening on", options.serve)
+            serve(watcher, options.serve, load_compare)
+        else:
+            watch(
+                watcher,
+                load_baseline(),
+                import_threshold=options.import_threshold,
             )
-            print()
-            for k, o, n in changed_keys:
-                if o is not None or f"{k}.(n)" in new_keys:
-                    continue
-
-                print(f"    + {k}.{n}")
+        sys.exit(0)
 
-            print()
-            print("The following attribute seem to have been removed:")
+    # the spec is only needed in memory to compare it, otherwise entries are
+    # written as they are found.
+    streaming = (
+        options.save
+        and is_ndjson(options.save)
+        and not (
+            options.store
+            or options.compare
+            or options.compare_rev
+            or options.static
+            or cache
+            or options.jobs > 1
+            or options.import_cost
+            or options.history
+        )
+    )
+    if streaming:
+        tree_visitor = SpecStream(
+            rootname,
+            options.modules,
+            stubs=stubs,
+            own_members=options.own_members,
+            resolve_lazy=options.resolve_lazy,
+            profile=profile,
+        )
+        save_spec(options.save, tree_visitor)
+        skipped, tree_visitor = tree_visitor.skipped, tree_visitor.visitor
+    elif options.static:
+        skipped, tree_visitor = visit_modules_static(
+            rootname,
+            options.modules,
+            jobs=options.jobs if options.jobs > 1 else None,
+            stubs=stubs,
+        )
+        if tree_visitor.fallbacks:
             print(
-                "(They might have been inherited attributes, or stuff we didn't handle then)"
+                "Imported (could not be crawled statically):",
+                ",".join(sorted(tree_visitor.fallbacks)),
             )
-            print()
-            for k, o, n in changed_keys:
-                if n is not None or f"{k}.{o}" in removed_keys:
-                    continue
-                print(f"    - {k}.{o}")
+    elif options.jobs > 1:
+        skipped, tree_visitor = visit_modules_parallel(
+            rootname,
+            options.modules,
+            jobs=options.jobs,
+            timeout=options.timeout,
+            memory_limit=options.max_memory and options.max_memory * 2**20,
+            cache=cache,
+            stubs=stubs,
+            own_members=options.own_members,
+            resolve_lazy=options.resolve_lazy,
+        )
+    else:
+        skipped, tree_visitor = visit_modules(
+            rootname,
+            options.modules,
+            cache=cache,
+            stubs=stubs,
+            own_members=options.own_members,
+            resolve_lazy=options.resolve_lazy,
+            profile=profile,
+        )
+    if skipped:
+        print("skipped modules :", ",".join(skipped))
+    if cache is not None:
+        print("Cache: {hits} hits, {misses} misses".format(**cache.stats()))
+    if options.import_cost:
+        costs, failed = measure_imports(options.modules)
+        if failed:
+            print("could not measure import cost of :", ",".join(failed))
+        tree_visitor.spec.update(costs)
+
+    counts = tree_visitor.counts()
+    print("Collected (Object founds):", counts["collected"])
+    print("Visited (don't start with _, not in stdlib...):", counts["visited"])
+    print(
+        "Rejected (Unknown nodes, or instances, don't know what to do with those):",
+        counts["rejected"],
+    )
+    if isinstance(tree_visitor, Visitor):
+        stats = tree_visitor.render.stats()
+        print(
+            "Rendered values: {calls} ({capped} capped) in {seconds:.3f}s".format(
+                **stats
+            )
+        )
+        if options.debug:
+            for name, seconds in stats["slowest"]:
+                print("    {}: {:.3f}s".format(name, seconds))
+    if options.debug and isinstance(tree_visitor, Visitor):
+        stats = tree_visitor.visited.stats()
+        print(
+            "Visited registry: {size} live entries, {hits} hits, {misses} misses "
+            "(hit rate {hit_rate:.1%})".format(**stats)
+        )
+        stats = tree_visitor.signatures.stats()
+        print(
+            "Signature cache: {size} entries, {hits} hits, {misses} misses, "
+            "{evictions} evictions (hit rate {hit_rate:.1%})".format(**stats)
+        )
+    print()
 
-        if any([new_keys, removed_keys, changed_keys]):
-            sys.exit(1)
+    status = 0
+    if options.save and store is not None:
+        with phase_section(profile, "save"):
+            store.save(rootname, options.save, tree_visitor.spec)
+    elif options.save and not streaming:
+        with phase_section(profile, "save"):
+            save_spec(options.save, tree_visitor.spec)
+    if options.fingerprint:
+        print("API fingerprint:", tree_visitor.spec.fingerprint.hexdigest)
+    if options.history:
+        history = load_history(options.history)
+        history.add("current", tree_visitor.spec)
+        print(history.report())
+        print()
+    if options.compare or options.compare_rev:
+        with phase_section(profile, "load"):
+            loaded = load_baseline()
+        if report_comparison(
+            loaded,
+            tree_visitor.spec,
+            import_threshold=options.import_threshold,
+            profile=profile,
+        ):
+            status = 1
+
+    if store is not None:
+        store.close()
+    if options.profile:
+        print(profile.report())
+    if options.profile_json:
+        with open(options.profile_json, "w") as f:
+            profile.dump(f)
+    if status:
+        sys.exit(status)
 
 
 if __name__ == "__main__":
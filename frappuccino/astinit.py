@@ -1,166 +1,852 @@
-"""Frappucinno
-
-
-DEPRECATED/UNUSED
-
-This was a proof of concept trying to visit the AST, though Python is dynamic
-enough that this is often too limited. in the end I choose to go with actually
-importing things, and walking every reachable object which fully qualified name
-does start with give prefixes.
-
-Freeze your API and make sure you do not introduce backward incompatibilities
 """
-import ast
-
-test1 = """
-
-
-class Bird:
-    def bar(a,b, *args, kow, **kw ):
-        pass
+Static crawl engine.
+
+Build the same spec as `Visitor` (functions with `sig_dump` compatible
+parameters, `type` items and `module_item`), by parsing the source of modules
+instead of importing them. This avoids the cost of importing the target package
+and all its dependencies.
+
+Python is dynamic enough that this is not always possible; a module is handed
+back to the import based `Visitor` as soon as it uses a construct whose result
+cannot be known without executing code, for example:
+
+    - a module level `__getattr__` or a star import from another package,
+    - a decorator other than `staticmethod`, `classmethod`, `property`,
+      `abstractmethod` and `overload`, or a class decorator or metaclass,
+    - a base class defined outside of the crawled package and the standard
+      library,
+    - a default value, or a class attribute, that is not a literal or a builtin.
+
+Names imported from other non standard library packages are assumed to be
+re-exports of classes or functions, and thus not recorded.
+
+Crawling works in two phases: each reachable source file is summarised
+(`APIVisitor`) in parallel worker processes, then summaries are linked together
+to resolve imports and inherited class members, and emit spec entries.
+"""
 
-    def foo(c):
-        pass
+import ast
+import builtins
+import importlib
+import inspect
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .cache import find_source
+from .logging import logger
+from .parallel import CrawlResult, partial_spec
+from .records import signature
+from .render import render
+from .stubs import StubIndex, stub_path
+from .visitor import Visitor, is_reexport
+
+# attributes python sets on every module imported from a source file.
+MODULE_DUNDERS = [
+    "__builtins__",
+    "__cached__",
+    "__doc__",
+    "__file__",
+    "__loader__",
+    "__name__",
+    "__package__",
+    "__spec__",
+]
+
+# attributes of extension modules, see `StaticCrawler.summarise`.
+EXTENSION_DUNDERS = [
+    "__doc__",
+    "__file__",
+    "__loader__",
+    "__name__",
+    "__package__",
+    "__spec__",
+]
+
+# decorators that keep the decorated function a plain function.
+TRANSPARENT_DECORATORS = {"abstractmethod", "overload"}
+
+# below this number of files, parsing in the current process is faster than
+# starting a pool of workers.
+PARALLEL_THRESHOLD = 64
+
+_EMPTY = str(inspect.Parameter.empty)
+_KINDS = {
+    name: str(getattr(inspect.Parameter, name))
+    for name in [
+        "POSITIONAL_ONLY",
+        "POSITIONAL_OR_KEYWORD",
+        "VAR_POSITIONAL",
+        "KEYWORD_ONLY",
+        "VAR_KEYWORD",
+    ]
+}
+
+
+class Dynamic(Exception):
+    """
+    A construct whose result cannot be known statically.
+    """
 
 
-    def missing():
-        pass
+def _dotted(node) -> str:
+    """
+    Dotted name of a `Name` or `Attribute` node.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return _dotted(node.value) + "." + node.attr
+    raise Dynamic("not a name: {}".format(ast.dump(node)))
 
-    def _private():
-        pass
-"""
 
-test2 = """
-class Bird:
-    def bar(a,b, *args, kow, **kw ):
-        pass
+def render_default(value):
+    """
+    Default value as stored by `visitor.parameter_dump`.
+    """
+    if isinstance(value, (int, float, bool)):
+        return value
+    return render(value)
 
-    def foo(c):
-        pass
 
-    def _private():
-        pass
-"""
+def _parameter(name: str, kind: str, default, strict: bool = True) -> Dict:
+    """
+    Same as `visitor.parameter_dump`, from a parameter node.
 
+    Defaults referring to a name are stored as a `("ref", dotted name)` tuple, to
+    be resolved once all modules are summarised. If not `strict` (for stub
+    files), they are stored as the dotted name itself, or `...` for other
+    expressions.
+    """
+    if default is None:
+        value = _EMPTY
+    elif isinstance(default, ast.Constant):
+        value = render_default(default.value)
+    else:
+        try:
+            value = render_default(ast.literal_eval(default))
+        except ValueError:
+            try:
+                value = ("ref", _dotted(default))
+            except Dynamic:
+                if strict:
+                    raise
+                value = ("ref", "...")
+            if not strict:
+                value = value[1]
+    return {"kind": _KINDS[kind], "name": name, "default": value}
+
+
+def signature_dump(
+    args: ast.arguments, *, bound: bool = False, strict: bool = True
+) -> List:
+    """
+    Same as `visitor.sig_dump`, from the arguments of a function definition.
 
-def keyfy(s):
-    return '"%s":' % s
+    If `bound`, drop the first positional parameter, like for bound methods.
+    See `_parameter` for `strict`.
+    """
+    params = []
+    posonly = getattr(args, "posonlyargs", [])
+    positional = posonly + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+    for i, (arg, default) in enumerate(zip(positional, defaults)):
+        kind = "POSITIONAL_ONLY" if i < len(posonly) else "POSITIONAL_OR_KEYWORD"
+        params.append(_parameter(arg.arg, kind, default, strict))
+    if bound and params:
+        params = params[1:]
+    if args.vararg:
+        params.append(_parameter(args.vararg.arg, "VAR_POSITIONAL", None))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(_parameter(arg.arg, "KEYWORD_ONLY", default, strict))
+    if args.kwarg:
+        params.append(_parameter(args.kwarg.arg, "VAR_KEYWORD", None))
+    return [[p["name"], p] for p in params]
 
 
 class APIVisitor:
     """
-    A node visitor base class that walks the abstract syntax tree and calls a
-    visitor function for every node found.  This function may return a value
-    which is forwarded by the `visit` method.
-
-    This class is meant to be subclassed, with the subclass adding visitor
-    methods.
-
-    Per default the visitor functions for the nodes are ``'visit_'`` +
-    class name of the node.  So a `TryFinally` node visit function would
-    be `visit_TryFinally`.  This behavior can be changed by overriding
-    the `visit` method.  If no visitor function exists for a node
-    (return value `None`) the `generic_visit` visitor is used instead.
-
-    Don't use the `NodeVisitor` if you want to apply changes to nodes during
-    traversing.  For this a special visitor exists (`NodeTransformer`) that
-    allows modifications.
+    Summarise the namespace of a module from its AST.
+
+    The summary maps each name bound at module level to a symbol, a tuple whose
+    first element is its kind:
+
+        ("function", qualname, signature dump, decorator)
+        ("class", qualname, {"bases": [dotted names], "namespace": {...}})
+        ("value", value)             for literals
+        ("expr",)                    for any other expression
+        ("ref", dotted name)         for aliases, `x = a.b`
+        ("import", module)           for `import module`
+        ("from", module, name)       for `from module import name`
+        ("try", symbol, symbol)      for names bound both in the body of a
+                                     try statement and in its handlers
+
+    Like `ast.NodeVisitor`, statements are dispatched on `visit_<class name>`,
+    statements without a visitor do not bind names.
+
+    Stub files are summarised with `strict=False`: as they are only
+    declarations, constructs that would make a module dynamic are ignored, and
+    class attributes without literal values are not recorded.
     """
 
-    def visit(self, node):
-        """Visit a node."""
-        method = "visit_" + node.__class__.__name__
-        visitor = getattr(self, method, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        """Called if no explicit visitor function exists for a node."""
-        res = []
-        for field, value in ast.iter_fields(node):
-            if isinstance(value, list):
-                for item in value:
-                    vv = self.visit(item)
-                    res.append(vv)
-            elif isinstance(value, dict):
-                for k, v in value:
-                    res.append(self.visit(v))
-                res.append(self.visit(value))
-        if not res:
-            print("visiting", node)
-        return list(filter(None, res))
-
-    def visit_FunctionDef(self, node):
-        if node.name.startswith("_"):
-            return None
-        args = node.args
+    def __init__(self, module_name: str, is_package: bool, strict: bool = True):
+        self.module_name = module_name
+        self.strict = strict
+        self.package = module_name if is_package else module_name.rpartition(".")[0]
+        # fully qualified names of modules, or module attributes, imported.
+        self.imports = set()
+        self.stars = []
+        self.annotations = False
+        self._qualname = []
+
+    def imports_of(self, tree):
+        """
+        Only record imports of a module, ignoring any other statements.
+        """
+
+        def visit(node, namespace):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                APIVisitor.visit(self, node, namespace)
+            elif not isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                for child in ast.iter_child_nodes(node):
+                    if isinstance(child, ast.stmt):
+                        visit(child, namespace)
+
+        for node in tree.body:
+            visit(node, {})
+        return sorted(self.imports)
+
+    def summary(self, tree) -> Dict:
+        namespace = {}
+        for node in tree.body:
+            self.visit(node, namespace)
+        if "__getattr__" in namespace:
+            if self.strict:
+                raise Dynamic("module level __getattr__")
+            del namespace["__getattr__"]
         return {
-            node.name: {
-                "type": node.__class__.__name__,
-                "args": [a.arg for a in args.args],
-                "kwonlyargs": [a.arg for a in args.kwonlyargs],
-                "vararg": args.vararg.arg if args.vararg else [],
-                "kwarg": args.kwarg.arg if args.kwarg else [],
-            }
+            "namespace": namespace,
+            "imports": sorted(self.imports),
+            "stars": self.stars,
+            "annotations": self.annotations,
         }
 
-    def visit_ClassDef(self, node):
-        vis = self.generic_visit(node)
-        d = {}
-        for item in vis:
-            d.update(item)
-        return {node.name: {"type": node.__class__.__name__, "attributes": d}}
-
+    @property
+    def in_class(self) -> bool:
+        return bool(self._qualname)
 
-def is_compatible(old_tree, new_tree):
-    pass
+    def visit(self, node, namespace):
+        """Visit a statement."""
+        method = "visit_" + node.__class__.__name__
+        visitor = getattr(self, method, None)
+        if visitor is not None:
+            visitor(node, namespace)
+
+    def _visit_bodies(self, node, namespace):
+        for field in ("body", "orelse", "finalbody"):
+            for item in getattr(node, field, []):
+                self.visit(item, namespace)
+        for handler in getattr(node, "handlers", []):
+            for item in handler.body:
+                self.visit(item, namespace)
+
+    visit_If = visit_For = visit_While = visit_With = _visit_bodies
+
+    def visit_Try(self, node, namespace):
+        # names bound both in the body and in exception handlers are resolved
+        # once all modules are known, see `StaticCrawler.resolve`.
+        handled = dict(namespace)
+        for handler in node.handlers:
+            for item in handler.body:
+                self.visit(item, handled)
+        body = dict(namespace)
+        for item in node.body + node.orelse:
+            self.visit(item, body)
+        for name in set(body).union(handled):
+            b, h = body.get(name), handled.get(name)
+            if b is not namespace.get(name) and h is not namespace.get(name):
+                namespace[name] = ("try", b, h)
+            elif b is not namespace.get(name):
+                namespace[name] = b
+            else:
+                namespace[name] = h
+        for item in node.finalbody:
+            self.visit(item, namespace)
+
+    visit_TryStar = visit_Try
+
+    def _qual(self, name: str) -> str:
+        return ".".join(self._qualname + [name])
+
+    def visit_FunctionDef(self, node, namespace):
+        if node.name.startswith("_") and node.name != "__getattr__":
+            # private functions are not crawled.
+            return
+        decorator = None
+        for deco in node.decorator_list:
+            if isinstance(deco, ast.Attribute) and deco.attr in {
+                "setter",
+                "getter",
+                "deleter",
+            }:
+                name = "property"
+            else:
+                name = _dotted(deco).rpartition(".")[2]
+            if name in {"staticmethod", "classmethod", "property"}:
+                decorator = name
+            elif name not in TRANSPARENT_DECORATORS and self.strict:
+                raise Dynamic("decorator {}".format(name))
+        bound = decorator == "classmethod"
+        namespace[node.name] = (
+            "function",
+            self._qual(node.name),
+            signature_dump(node.args, bound=bound, strict=self.strict),
+            decorator,
+        )
 
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node, namespace):
+        if (node.keywords or node.decorator_list) and self.strict:
+            raise Dynamic("class decorator or metaclass on {}".format(node.name))
+        bases = []
+        for base in node.bases:
+            try:
+                bases.append(_dotted(base))
+            except Dynamic:
+                # Generic[T] and such in stubs.
+                if self.strict:
+                    raise
+        qualname = self._qual(node.name)
+        self._qualname.append(node.name)
+        members = {}
+        try:
+            for item in node.body:
+                self.visit(item, members)
+        finally:
+            self._qualname.pop()
+        namespace[node.name] = (
+            "class",
+            qualname,
+            {"bases": bases, "namespace": members},
+        )
 
-class DoubleTreeVisitor:
+    def _value(self, node):
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            try:
+                return ("ref", _dotted(node))
+            except Dynamic:
+                pass
+        try:
+            return ("value", ast.literal_eval(node))
+        except ValueError:
+            if self.in_class:
+                if not self.strict:
+                    return None
+                raise Dynamic("class attribute {}".format(ast.dump(node)))
+            return ("expr",)
+
+    def _bind(self, target, value, namespace):
+        if isinstance(target, ast.Name):
+            namespace[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)) and not self.in_class:
+            for elt in target.elts:
+                self._bind(elt, ("expr",), namespace)
+        elif self.in_class:
+            raise Dynamic("assignment to {}".format(ast.dump(target)))
+
+    def _assign(self, targets, value, namespace):
+        if self.in_class and all(
+            isinstance(t, ast.Name) and t.id.startswith("_") for t in targets
+        ):
+            # private class attributes are not crawled.
+            return
+        value = self._value(value)
+        if value is None:
+            return
+        for target in targets:
+            self._bind(target, value, namespace)
+
+    def visit_Assign(self, node, namespace):
+        self._assign(node.targets, node.value, namespace)
+
+    def visit_AnnAssign(self, node, namespace):
+        if not self.in_class:
+            self.annotations = True
+        if node.value is not None:
+            self._assign([node.target], node.value, namespace)
+
+    def visit_Import(self, node, namespace):
+        for alias in node.names:
+            self.imports.add(alias.name)
+            if alias.asname:
+                namespace[alias.asname] = ("import", alias.name)
+            else:
+                top = alias.name.split(".")[0]
+                namespace[top] = ("import", top)
+
+    def _absolute(self, module: Optional[str], level: int) -> str:
+        if not level:
+            return module
+        parts = self.package.split(".")
+        base = ".".join(parts[: len(parts) - (level - 1)])
+        return base + "." + module if module else base
+
+    def visit_ImportFrom(self, node, namespace):
+        module = self._absolute(node.module, node.level)
+        self.imports.add(module)
+        for alias in node.names:
+            if alias.name == "*":
+                self.stars.append(module)
+                continue
+            self.imports.add(module + "." + alias.name)
+            namespace[alias.asname or alias.name] = ("from", module, alias.name)
+
+
+def summarise(module_name: str, path: str) -> Dict:
     """
-    Like AstVisitor, but compare two tree for compatibility.
+    Parse the source file of `module_name` and summarise its namespace.
+
+    The `dynamic` field of the summary gives the reason the module cannot be
+    crawled statically, if any.
     """
+    with open(path, "rb") as f:
+        return summarise_source(module_name, path, f.read())
 
-    def visit(self, old_list, new_list, name=None):
-        """Visit a node."""
-        for old_node, new_node in zip(old_list, new_list):
-            for k, v in old_node.items():
-                if k in new_node:
-                    method = "visit_" + v["type"]
-                    visitor = getattr(self, method, self.generic_visit)
-                    visitor(v, new_node[k], k)
 
-    def generic_visit(self, old_node, new_node):
-        """Called if no explicit visitor function exists for a node."""
-        res = []
-        for field, value in old_node.items():
-            if isinstance(value, list):
-                for item in value:
-                    if isinstance(item, ast.AST):
-                        res.append(self.visit(item))
-            elif isinstance(value, ast.AST):
-                res.append(self.visit(value))
-        return list(filter(None, res))
+def summarise_source(module_name: str, path: str, source: bytes) -> Dict:
+    """
+    Same as `summarise`, with the content of the file already read.
 
-    def visit_ClassDef(self, old_class, new_class, name):
-        missing_attributes = set(old_class["attributes"].keys()).difference(
-            set(new_class["attributes"].keys())
-        )
-        if missing_attributes:
-            print(
-                "Class `{}` has lost non deprecated and non private "
-                "following attributes : {}".format(name, *missing_attributes)
-            )
+    `.pyi` stub files are summarised leniently, see `APIVisitor`.
+    """
+    is_package = os.path.basename(path).startswith("__init__.")
+    stub = path.endswith(".pyi")
+    summary = {
+        "name": module_name,
+        "package": is_package,
+        "stub": stub,
+        "dynamic": None,
+    }
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, ValueError) as e:
+        summary["dynamic"] = "{}: {}".format(type(e).__name__, e)
+        return summary
+    try:
+        summary.update(APIVisitor(module_name, is_package, not stub).summary(tree))
+    except Dynamic as e:
+        summary["dynamic"] = str(e)
+        # still follow imports, other modules may be reachable through them.
+        summary["imports"] = APIVisitor(module_name, is_package).imports_of(tree)
+    return summary
+
+
+def _summarise(args):
+    return summarise(*args)
+
+
+def _is_stdlib(module_name: str) -> bool:
+    top = module_name.split(".")[0]
+    return top in sys.builtin_module_names or top in getattr(
+        sys, "stdlib_module_names", ()
+    )
+
+
+class StaticCrawler:
+    """
+    Link module summaries together and emit spec entries.
 
-        self.generic_visit(old_class, new_class)
+    Objects from the standard library (base classes, or class attributes
+    imported from it) are imported and visited with a regular `Visitor`, as
+    this is cheap and is the only way to know what they expose.
+    """
 
+    def __init__(self, rootname: str, *, stubs=None):
+        self.name = rootname.split(".")[0]
+        self.stubs = stubs if stubs is not None else StubIndex()
+        self.summaries: Dict[str, Dict] = {}
+        self.spec: Dict[str, Dict] = {}
+        self.collected = set()
+        self._runtime = Visitor(self.name, logger=logger, stubs=self.stubs)
+        self._class_items: Dict[str, Dict] = {}
+        self._signatures: Dict[str, List] = {}
+        self._emitted_modules = set()
+        # in scope modules without python source.
+        self.missing = set()
+        # module name -> reason it needs to be crawled by importing it.
+        self.fallbacks: Dict[str, str] = {}
+
+    def in_scope(self, module_name: str) -> bool:
+        return module_name.startswith(self.name)
+
+    def exists(self, module_name: str) -> bool:
+        """
+        Whether importing `module_name` can succeed, as far as we can tell.
+        """
+        if not self.in_scope(module_name):
+            return True
+        return module_name in self.summaries or module_name in self.missing
+
+    # Resolution of names to targets, tuples whose first element is their kind:
+    #   ("function", key, dump, decorator), ("class", key, module, info),
+    #   ("module", name), ("value", str), ("expr",), ("external", object) for
+    #   objects of the standard library, or ("unknown",) otherwise.
+
+    def _external(self, module_name: str, attr: Optional[str] = None):
+        if not _is_stdlib(module_name):
+            return ("unknown",)
+        try:
+            obj = importlib.import_module(module_name)
+            if attr is not None:
+                obj = getattr(obj, attr)
+        except (ImportError, AttributeError):
+            return ("unknown",)
+        return ("external", obj)
+
+    def resolve(self, module_name: str, symbol, depth: int = 0, scope=None):
+        """
+        Resolve a symbol of the namespace of `module_name` to a target.
+
+        `scope` is the namespace of the class body the symbol comes from, if any.
+        """
+        if depth > 50:
+            raise Dynamic("import cycle resolving {}".format(symbol))
+        kind = symbol[0]
+        if kind == "function":
+            _, qualname, dump, decorator = symbol
+            key = module_name + "." + qualname
+            return (
+                "function",
+                key,
+                self.signature(key, module_name, dump, scope),
+                decorator,
+            )
+        if kind == "class":
+            _, qualname, info = symbol
+            return ("class", module_name + "." + qualname, module_name, info)
+        if kind == "import":
+            if symbol[1] in self.summaries or symbol[1] in self.missing:
+                return ("module", symbol[1])
+            if self.in_scope(symbol[1]):
+                return ("unknown",)
+            return self._external(symbol[1])
+        if kind == "from":
+            return self.lookup(symbol[1], symbol[2], depth + 1)
+        if kind == "ref":
+            return self.lookup_dotted(module_name, symbol[1], depth + 1, scope)
+        if kind == "try":
+            # the handler only wins if the body imports a missing module.
+            _, body, handler = symbol
+            if body[0] in ("import", "from") and not self.exists(body[1]):
+                return self.resolve(module_name, handler, depth + 1, scope)
+            return self.resolve(module_name, body, depth + 1, scope)
+        return symbol
+
+    def namespace(self, module_name: str) -> Dict:
+        """
+        Names bound in a module, including by star imports, and the submodules
+        set as attributes of a package when they are imported.
+        """
+        summary = self.summaries[module_name]
+        if "_namespace" in summary:
+            return summary["_namespace"]
+        namespace = {}
+        if summary["package"]:
+            prefix = module_name + "."
+            for name in list(self.summaries) + list(self.missing):
+                if name.startswith(prefix) and "." not in name[len(prefix) :]:
+                    namespace[name[len(prefix) :]] = ("import", name)
+        for star in summary["stars"]:
+            if star not in self.summaries or self.summaries[star]["dynamic"]:
+                raise Dynamic("star import from {}".format(star))
+            for name in self.namespace(star):
+                if not name.startswith("_"):
+                    namespace[name] = ("from", star, name)
+        namespace.update(summary["namespace"])
+        summary["_namespace"] = namespace
+        return namespace
+
+    def lookup(self, module_name: str, attr: str, depth: int = 0):
+        """
+        Resolve `attr` in module `module_name`.
+        """
+        submodule = module_name + "." + attr
+        if module_name in self.summaries:
+            if self.summaries[module_name]["dynamic"]:
+                return ("unknown",)
+            namespace = self.namespace(module_name)
+            if attr in namespace and namespace[attr] != ("from", module_name, attr):
+                return self.resolve(module_name, namespace[attr], depth)
+            if submodule in self.summaries or submodule in self.missing:
+                return ("module", submodule)
+            return ("unknown",)
+        if submodule in self.summaries or submodule in self.missing:
+            return ("module", submodule)
+        if self.in_scope(module_name):
+            return ("unknown",)
+        return self._external(module_name, attr)
+
+    def lookup_dotted(self, module_name: str, dotted: str, depth: int = 0, scope=None):
+        """
+        Resolve a dotted name as seen from module `module_name`, or from the
+        body of a class defined in it if `scope` is given.
+        """
+        first, *rest = dotted.split(".")
+        namespace = self.namespace(module_name)
+        if scope and first in scope:
+            target = self.resolve(module_name, scope[first], depth)
+        elif first in namespace:
+            target = self.resolve(module_name, namespace[first], depth)
+        elif hasattr(builtins, first):
+            target = ("external", getattr(builtins, first))
+        else:
+            return ("unknown",)
+        for attr in rest:
+            if target[0] == "module":
+                target = self.lookup(target[1], attr, depth + 1)
+            elif target[0] == "class":
+                _, _, owner, info = target
+                if attr not in info["namespace"]:
+                    return ("unknown",)
+                target = self.resolve(
+                    owner, info["namespace"][attr], depth + 1, info["namespace"]
+                )
+            elif target[0] == "external":
+                if not hasattr(target[1], attr):
+                    return ("unknown",)
+                target = ("external", getattr(target[1], attr))
+            else:
+                return ("unknown",)
+        return target
+
+    def signature(self, key: str, module_name: str, dump: List, scope=None) -> List:
+        """
+        Resolve defaults of the signature dump of function `key` referring to
+        other names, as seen from `module_name` and class body `scope`.
+        """
+        if key in self._signatures:
+            return self._signatures[key]
+        resolved = []
+        for name, parameter in dump:
+            default = parameter["default"]
+            if isinstance(default, tuple):
+                target = self.lookup_dotted(module_name, default[1], scope=scope)
+                if target[0] == "value":
+                    default = render_default(target[1])
+                elif target[0] == "external":
+                    default = render_default(target[1])
+                elif target[0] == "class":
+                    default = "<class '{}'>".format(target[1])
+                else:
+                    raise Dynamic("default value {} of {}".format(default[1], key))
+                parameter = dict(parameter, default=default)
+            resolved.append([name, parameter])
+        self._signatures[key] = resolved
+        return resolved
+
+    # Emission of spec entries
+
+    def _item(self, target) -> Optional[str]:
+        """
+        Value `Visitor.visit` would return for the target, and emit its entries.
+        """
+        kind = target[0]
+        if kind == "function":
+            if target[3] == "property":
+                return "<property object at 0xffffff>"
+            self.emit_function(target)
+            return target[1]
+        if kind == "class":
+            return self.emit_class(target)
+        if kind == "value":
+            return render(target[1])
+        if kind == "module":
+            return None
+        if kind == "external":
+            return self._runtime.visit(target[1])
+        raise Dynamic("cannot resolve class member {}".format(target))
+
+    def emit_function(self, target):
+        _, key, dump, _ = target
+        self.spec[key] = {"type": "function", "signature": signature(dump)}
+        self.collected.add(key)
+
+    def class_items(self, target) -> Dict:
+        _, key, module_name, info = target
+        if key in self._class_items:
+            return self._class_items[key]
+        items = {}
+        for base in reversed(info["bases"]):
+            base_target = self.lookup_dotted(module_name, base)
+            if base_target[0] == "class":
+                items.update(self.class_items(base_target))
+            elif base_target[0] == "external" and isinstance(base_target[1], type):
+                cls = base_target[1]
+                for k in sorted(dir(cls)):
+                    if not k.startswith("_"):
+                        items[k] = self._runtime.visit(getattr(cls, k))
+            else:
+                raise Dynamic("base class {} of {}".format(base, key))
+        for name, symbol in info["namespace"].items():
+            if not name.startswith("_"):
+                target = self.resolve(module_name, symbol, scope=info["namespace"])
+                items[name] = self._item(target)
+        items = {k: v for k, v in items.items() if v}
+        self._class_items[key] = items
+        return items
+
+    def emit_class(self, target) -> str:
+        key = target[1]
+        if key not in self.spec or self.spec[key]["type"] != "type":
+            items = self.class_items(target)
+            self.spec[key] = {"type": "type", "items": items}
+            self.collected.add(key)
+        return key
+
+    def emit_module(self, module_name: str):
+        """
+        Emit entries `Visitor.visit_module` would, for a summarised module.
+        """
+        if module_name in self._emitted_modules:
+            return
+        self._emitted_modules.add(module_name)
+        summary = self.summaries.get(module_name)
+        if summary is None:
+            self.fallbacks[module_name] = "no python source"
+        elif summary["dynamic"]:
+            self.fallbacks[module_name] = summary["dynamic"]
+        else:
+            try:
+                self._emit_module(module_name, summary)
+            except Dynamic as e:
+                # entries emitted so far are complete, the import based
+                # visitor will add the missing ones.
+                self.fallbacks[module_name] = str(e)
+
+    def _emit_module(self, module_name: str, summary: Dict):
+        dunders = list(EXTENSION_DUNDERS if summary["stub"] else MODULE_DUNDERS)
+        if summary["package"]:
+            dunders.append("__path__")
+        if summary["annotations"]:
+            dunders.append("__annotations__")
+        namespace = self.namespace(module_name)
+        names = set(dunders)
+        names.update(k for k in namespace if not k.startswith("_"))
+        names.update(k for k in namespace if k.startswith("__") and k.endswith("__"))
+        for name in sorted(names):
+            key = module_name + "." + name
+            target = self.lookup(module_name, name) if name in namespace else None
+            if target is None:
+                kind = "value"
+            else:
+                kind = target[0]
+            if kind in ("function", "class"):
+                if target[1] != key:
+                    continue
+            elif kind == "module":
+                if target[1] != key:
+                    continue
+            elif kind == "external":
+                if is_reexport(key, target[1]):
+                    continue
+            elif kind == "unknown":
+                # assumed to be a re-exported class or function.
+                continue
+            if key in self.spec:
+                continue
+            self.spec[key] = {"type": "module_item"}
+            if kind == "function":
+                self.emit_function(target)
+            elif kind == "class":
+                self.emit_class(target)
+            elif kind == "module":
+                self.emit_module(target[1])
+
+    def summarise(self, modules: List[str], jobs: Optional[int] = None):
+        """
+        Summarise `modules`, and in scope modules they import, recursively.
+
+        Extension modules are summarised from their stub file if they have
+        one, and are otherwise left to the import based visitor.
+        """
+        wave = list(modules)
+        seen = set()
+        while wave:
+            todo = []
+            stubs = []
+            for name in wave:
+                if name in seen:
+                    continue
+                seen.add(name)
+                path = find_source(name)
+                if path and path.endswith(".py"):
+                    todo.append((name, path))
+                elif path:
+                    self.missing.add(name)
+                    stub = self.stubs.summary(name, stub_path(path))
+                    if stub is not None:
+                        stubs.append(dict(stub))
+            if len(todo) >= PARALLEL_THRESHOLD and jobs != 1:
+                with ProcessPoolExecutor(jobs) as pool:
+                    summaries = list(pool.map(_summarise, todo, chunksize=16))
+            else:
+                summaries = [summarise(*args) for args in todo]
+            summaries.extend(stubs)
+            wave = []
+            for summary in summaries:
+                self.summaries[summary["name"]] = summary
+                for name in summary.get("imports", []):
+                    # importing a module also imports its parents.
+                    parts = name.split(".")
+                    for i in range(1, len(parts) + 1):
+                        parent = ".".join(parts[:i])
+                        if self.in_scope(parent) and parent not in seen:
+                            wave.append(parent)
+
+
+def visit_modules_static(rootname: str, modules: List[str], *, jobs=None, stubs=None):
+    """
+    Same as `visit_modules`, without importing modules when possible.
 
-if __name__ == "__main__":
-    tree = ast.parse(test1)
-    serialized_tree = APIVisitor().visit(tree)
+    Modules that cannot be crawled statically are imported and crawled by a
+    `Visitor`, each on its own.
 
-    # pprint(serialized_tree)
+    Returns
+    =======
 
-    tree2 = ast.parse(test2)
-    serialized_tree2 = APIVisitor().visit(tree2)
+    (skipped, result): a list of module names that could not be crawled, and a
+    `CrawlResult`. `result.fallbacks` maps modules crawled with the import
+    based visitor to the reason they could not be crawled statically.
 
-    dt = DoubleTreeVisitor().visit(serialized_tree, serialized_tree2)
+    `stubs` is the `StubIndex` used for extension modules.
+    """
+    crawler = StaticCrawler(rootname, stubs=stubs)
+    crawler.summarise(modules, jobs=jobs)
+    for name in modules:
+        crawler.emit_module(name)
+    result = CrawlResult()
+    result.fallbacks = crawler.fallbacks
+    result.merge(
+        {
+            "spec": crawler.spec,
+            "collected": crawler.collected,
+            "visited": 0,
+            "rejected": 0,
+        }
+    )
+
+    skipped = []
+    for name, reason in sorted(result.fallbacks.items()):
+        logger.info("static: importing %s (%s)", name, reason)
+        try:
+            module = importlib.import_module(name)
+        except (ImportError, RuntimeError, AttributeError) as e:
+            skipped.append(name)
+            result.failures[name] = "{}: {}".format(type(e).__name__, e)
+            continue
+        visitor = Visitor(rootname.split(".")[0], logger=logger, stubs=crawler.stubs)
+        visitor.visit(module)
+        result.merge(partial_spec(rootname, name, visitor))
+    return skipped, result
@@ -0,0 +1,248 @@
+"""
+Crawl many packages at once, each in its own interpreter.
+
+`run_batch` crawls each package of a list, typically the `modules` of the
+`[tool.frappuccino.configuration]` table of `pyproject.toml`, in a pool of
+worker processes. It writes `<package>.json` (the spec) and `<package>.txt`
+(the output of the crawl and of the comparison to the baseline of the package,
+if any) for each package, and a `summary.json` of all of them, to an output
+directory.
+
+Packages expected to take longest start first, so that the batch takes about
+as long as its slowest package rather than ending on it: by how long they took
+in the previous summary in the output directory if all were in it, otherwise
+by the size of their sources.
+
+A worker exits with `UNCHANGED` if the API is the same as the baseline (or if
+there is none), `CHANGED` if it differs, and `FAILED` if the package could not
+be crawled or compared; the batch status is the highest of those.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .cache import find_source
+
+UNCHANGED, CHANGED, FAILED = 0, 1, 2
+_STATUS = {UNCHANGED: "unchanged", CHANGED: "changed", FAILED: "failed"}
+
+_WORKER = "from frappuccino.batch import main; main()"
+
+
+def source_size(package: str) -> int:
+    """
+    Size of the files of `package`, without importing it; 0 if not found.
+    """
+    source = find_source(package)
+    if source is None or not os.path.isfile(source):
+        return 0
+    if Path(source).stem != "__init__":
+        return os.path.getsize(source)
+    size = 0
+    for directory, _, files in os.walk(os.path.dirname(source)):
+        for name in files:
+            if not name.endswith(".pyc"):
+                size += os.path.getsize(os.path.join(directory, name))
+    return size
+
+
+def schedule(packages: List[str], previous: Optional[Dict] = None) -> List[str]:
+    """
+    `packages`, the ones expected to take longest first.
+
+    `previous` is the summary of a previous batch; its times are used if it
+    has all the packages.
+    """
+    times = (previous or {}).get("packages", {})
+    if all(times.get(p, {}).get("seconds") is not None for p in packages):
+        return sorted(packages, key=lambda p: -times[p]["seconds"])
+    return sorted(packages, key=lambda p: -source_size(p))
+
+
+def _worker_command(
+    package, spec_path, baseline, static, own_members, resolve_lazy, python
+):
+    command = [python, "-c", _WORKER, package, str(spec_path)]
+    if baseline:
+        command += ["--compare", str(baseline)]
+    if static:
+        command.append("--static")
+    if own_members:
+        command.append("--own-members")
+    if resolve_lazy:
+        command.append("--resolve-lazy")
+    return command
+
+
+def run_batch(
+    packages: List[str],
+    output,
+    *,
+    baselines: Optional[Dict[str, str]] = None,
+    jobs: Optional[int] = None,
+    timeout: Optional[float] = None,
+    static: bool = False,
+    own_members: bool = False,
+    resolve_lazy: bool = False,
+    python: str = sys.executable,
+) -> Dict:
+    """
+    Crawl `packages` with `jobs` workers, compare them to their path in
+    `baselines` if any, and write their specs, reports and summary to the
+    `output` directory. Return the summary.
+
+    Workers running for more than `timeout` seconds are killed.
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    baselines = baselines or {}
+    jobs = jobs or os.cpu_count() or 1
+    summary_path = output / "summary.json"
+    previous = None
+    if summary_path.exists():
+        with summary_path.open() as f:
+            previous = json.load(f)
+
+    start = time.monotonic()
+    pending = schedule(packages, previous)
+    running = {}  # package -> (process, report file, start time)
+    results = {}
+    statuses = [UNCHANGED]
+    env = dict(os.environ)
+    # workers import this frappuccino.
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(__file__).resolve().parent.parent)]
+        + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+    )
+
+    def _finish(package, reason=None):
+        process, report, started = running.pop(package)
+        report.close()
+        returncode = process.wait()
+        status = returncode if returncode in _STATUS else FAILED
+        spec = output / (package + ".json")
+        if status == CHANGED and not spec.exists():
+            # the worker did not get to run.
+            status = FAILED
+        if reason is not None:
+            status = FAILED
+            with open(report.name, "a") as f:
+                f.write("\n" + reason + "\n")
+        statuses.append(status)
+        results[package] = {
+            "status": _STATUS[status],
+            "seconds": time.monotonic() - started,
+            "spec": str(spec) if status != FAILED else None,
+            "report": report.name,
+            "baseline": baselines.get(package),
+        }
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            package = pending.pop(0)
+            report = open(output / (package + ".txt"), "w")
+            command = _worker_command(
+                package,
+                output / (package + ".json"),
+                baselines.get(package),
+                static,
+                own_members,
+                resolve_lazy,
+                python,
+            )
+            process = subprocess.Popen(
+                command, stdout=report, stderr=subprocess.STDOUT, env=env
+            )
+            running[package] = (process, report, time.monotonic())
+        time.sleep(0.05)
+        now = time.monotonic()
+        for package, (process, _, started) in list(running.items()):
+            if process.poll() is not None:
+                _finish(package)
+            elif timeout and now - started > timeout:
+                process.kill()
+                _finish(package, "timed out after {}s".format(timeout))
+
+    summary = {
+        "status": max(statuses),
+        "seconds": time.monotonic() - start,
+        "packages": {p: results[p] for p in packages},
+    }
+    with summary_path.open("w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def _crawl(
+    package: str,
+    spec_path: str,
+    baseline,
+    static: bool,
+    own_members: bool,
+    resolve_lazy: bool,
+):
+    from . import (
+        StubIndex,
+        load_spec,
+        report_comparison,
+        save_spec,
+        visit_modules,
+        visit_modules_static,
+    )
+
+    # read first, the baseline may be the spec of a previous batch.
+    old_spec = load_spec(baseline) if baseline is not None else None
+    stubs = StubIndex()
+    if static:
+        skipped, visitor = visit_modules_static(package, [package], stubs=stubs)
+    else:
+        skipped, visitor = visit_modules(
+            package,
+            [package],
+            stubs=stubs,
+            own_members=own_members,
+            resolve_lazy=resolve_lazy,
+        )
+    if skipped:
+        print("skipped modules :", ",".join(skipped))
+    save_spec(spec_path, visitor.spec)
+    if old_spec is None:
+        return UNCHANGED
+    changed = report_comparison(old_spec, visitor.spec)
+    return CHANGED if changed else UNCHANGED
+
+
+def main(argv=None):
+    """
+    Worker of `run_batch`: crawl one package and exit with its status.
+    """
+    import argparse
+    import traceback
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("package")
+    parser.add_argument("spec")
+    parser.add_argument("--compare")
+    parser.add_argument("--static", action="store_true")
+    parser.add_argument("--own-members", action="store_true")
+    parser.add_argument("--resolve-lazy", action="store_true")
+    options = parser.parse_args(argv)
+    try:
+        status = _crawl(
+            options.package,
+            options.spec,
+            options.compare,
+            options.static,
+            options.own_members,
+            options.resolve_lazy,
+        )
+    except BaseException:
+        traceback.print_exc()
+        status = FAILED
+    sys.stdout.flush()
+    sys.exit(status)
@@ -0,0 +1,329 @@
+"""
+Compact binary spec files, loaded lazily through `mmap`.
+
+JSON spec files repeat the same qualified name prefixes, parameter kinds and
+default values over and over. Here every string is stored once in a string
+table, every distinct parameter (name, kind, default) once in a parameter
+table, and functions are lists of parameter ids. Entries are found through an
+index sorted by key, so `BinarySpec` only decodes the entries, and the strings,
+that are actually looked up.
+
+Layout, all integers little endian:
+
+    header      magic, version, number of strings, parameters and entries,
+                offsets of the four sections below, and the digest of the
+                spec fingerprint
+    strings     (n + 1) u64 offsets into the UTF-8 blob that follows them
+    parameters  fixed size records: name string id, kind string id, default
+                tag, 8 bytes of default value
+    index       fixed size records: key string id, offset of the entry data,
+                digest of the entry (see `fingerprint`), sorted by key
+    data        per entry, a tag then its content, see `_Writer.entry`
+"""
+
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+from typing import Dict, Iterator, Tuple
+
+from .fingerprint import Fingerprint, entry_digest
+from .records import ParameterDump, parameter, signature, to_json
+
+MAGIC = b"FRAPSPEC"
+VERSION = 2
+
+# file extension of binary spec files.
+BINARY_SUFFIX = ".fspec"
+
+_HEADER = struct.Struct("<8sIIII4Q16s")
+_OFFSET = struct.Struct("<Q")
+_PARAMETER = struct.Struct("<IIB3x8s")
+_INDEX = struct.Struct("<IQ16s")
+_U32 = struct.Struct("<I")
+_INT64 = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+
+# entry tags
+_FUNCTION, _TYPE, _MODULE_ITEM, _JSON = range(4)
+# default value tags
+_STR, _INT, _FLOAT_TAG, _BOOL, _BIGINT = range(5)
+
+
+def is_binary(path) -> bool:
+    return str(path).endswith(BINARY_SUFFIX)
+
+
+class _Writer:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.parameters: Dict[Tuple, int] = {}
+
+    def string(self, s: str) -> int:
+        sid = self.strings.get(s)
+        if sid is None:
+            sid = self.strings[s] = len(self.strings)
+        return sid
+
+    def parameter(self, parameter: Dict) -> int:
+        default = parameter["default"]
+        # bool before int, as it is a subclass of it.
+        if isinstance(default, bool):
+            record = (_BOOL, int(default))
+        elif isinstance(default, int):
+            if -(2**63) <= default < 2**63:
+                record = (_INT, default)
+            else:
+                record = (_BIGINT, self.string(str(default)))
+        elif isinstance(default, float):
+            record = (_FLOAT_TAG, default)
+        else:
+            record = (_STR, self.string(default))
+        key = (self.string(parameter["name"]), self.string(parameter["kind"])) + record
+        pid = self.parameters.get(key)
+        if pid is None:
+            pid = self.parameters[key] = len(self.parameters)
+        return pid
+
+    def entry(self, entry: Dict) -> bytes:
+        """
+        Encode one spec entry, falling back to JSON for anything unusual.
+        """
+        type_ = entry["type"]
+        if type_ == "module_item" and len(entry) == 1:
+            return bytes([_MODULE_ITEM])
+        if (
+            type_ == "function"
+            and entry.keys() == {"type", "signature"}
+            and all(
+                p.keys() == {"kind", "name", "default"} and name == p["name"]
+                for name, p in entry["signature"]
+            )
+        ):
+            ids = [self.parameter(p) for _, p in entry["signature"]]
+            return struct.pack("<BI{}I".format(len(ids)), _FUNCTION, len(ids), *ids)
+        if (
+            type_ == "type"
+            and entry.keys() == {"type", "items"}
+            and all(isinstance(v, str) for v in entry["items"].values())
+        ):
+            ids = []
+            for k, v in entry["items"].items():
+                ids.extend((self.string(k), self.string(v)))
+            return struct.pack(
+                "<BI{}I".format(len(ids)), _TYPE, len(entry["items"]), *ids
+            )
+        return struct.pack(
+            "<BI", _JSON, self.string(json.dumps(entry, default=to_json))
+        )
+
+
+def dump_binary(spec: Mapping, f):
+    """
+    Write `spec` to binary file `f`.
+    """
+    writer = _Writer()
+    index = []
+    data = []
+    digests = []
+    offset = 0
+    for key in sorted(spec):
+        entry = spec[key]
+        encoded = writer.entry(entry)
+        digest = entry_digest(entry)
+        index.append(_INDEX.pack(writer.string(key), offset, digest))
+        digests.append((key, digest))
+        data.append(encoded)
+        offset += len(encoded)
+
+    blob = [s.encode("utf-8", "surrogatepass") for s in writer.strings]
+    offsets = [0]
+    for b in blob:
+        offsets.append(offsets[-1] + len(b))
+    strings = b"".join(_OFFSET.pack(o) for o in offsets) + b"".join(blob)
+
+    parameters = []
+    for name, kind, tag, value in writer.parameters:
+        if tag == _FLOAT_TAG:
+            value = _FLOAT.pack(value)
+        else:
+            value = _INT64.pack(value)
+        parameters.append(_PARAMETER.pack(name, kind, tag, value))
+    parameters = b"".join(parameters)
+
+    strings_offset = _HEADER.size
+    parameters_offset = strings_offset + len(strings)
+    index_offset = parameters_offset + len(parameters)
+    data_offset = index_offset + len(index) * _INDEX.size
+    f.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(writer.strings),
+            len(writer.parameters),
+            len(index),
+            strings_offset,
+            parameters_offset,
+            index_offset,
+            data_offset,
+            Fingerprint(digests).digest,
+        )
+    )
+    f.write(strings)
+    f.write(parameters)
+    f.write(b"".join(index))
+    f.write(b"".join(data))
+
+
+class BinarySpec(Mapping):
+    """
+    Read only spec backed by a memory mapped binary spec file.
+
+    Entries are decoded each time they are accessed; strings and parameters
+    are decoded once. `digest` is the digest of the spec fingerprint, read from
+    the header.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self._n_strings,
+            self._n_parameters,
+            self._n_entries,
+            self._strings_offset,
+            self._parameters_offset,
+            self._index_offset,
+            self._data_offset,
+            self.digest,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("{} is not a version {} spec file".format(path, VERSION))
+        self._blob_offset = self._strings_offset + (self._n_strings + 1) * _OFFSET.size
+        self._strings: Dict[int, str] = {}
+        self._parameters: Dict[int, ParameterDump] = {}
+        # key -> position in index, filled when iterating over all keys.
+        self._positions: Dict[str, int] = {}
+        self._fingerprint = None
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _string(self, sid: int) -> str:
+        s = self._strings.get(sid)
+        if s is None:
+            start, end = struct.unpack_from(
+                "<QQ", self._map, self._strings_offset + sid * _OFFSET.size
+            )
+            s = self._strings[sid] = str(
+                self._map[self._blob_offset + start : self._blob_offset + end],
+                "utf-8",
+                "surrogatepass",
+            )
+        return s
+
+    def _parameter(self, pid: int) -> ParameterDump:
+        parameter_ = self._parameters.get(pid)
+        if parameter_ is None:
+            name, kind, tag, value = _PARAMETER.unpack_from(
+                self._map, self._parameters_offset + pid * _PARAMETER.size
+            )
+            if tag == _FLOAT_TAG:
+                default = _FLOAT.unpack(value)[0]
+            else:
+                default = _INT64.unpack(value)[0]
+                if tag == _STR:
+                    default = self._string(default)
+                elif tag == _BOOL:
+                    default = bool(default)
+                elif tag == _BIGINT:
+                    default = int(self._string(default))
+            parameter_ = self._parameters[pid] = parameter(
+                self._string(kind), self._string(name), default
+            )
+        return parameter_
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        """
+        Fingerprint of the spec, built from the stored digests without
+        decoding entries.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = Fingerprint(
+                (self._key(position), self._index(position)[2])
+                for position in range(self._n_entries)
+            )
+        return self._fingerprint
+
+    def _index(self, position: int) -> Tuple[int, int, bytes]:
+        return _INDEX.unpack_from(
+            self._map, self._index_offset + position * _INDEX.size
+        )
+
+    def _key(self, position: int) -> str:
+        return self._string(self._index(position)[0])
+
+    def _find(self, key: str) -> int:
+        if key in self._positions:
+            return self._positions[key]
+        lo, hi = 0, self._n_entries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_entries and self._key(lo) == key:
+            return lo
+        return -1
+
+    def _entry(self, position: int) -> Dict:
+        offset = self._data_offset + self._index(position)[1]
+        tag = self._map[offset]
+        if tag == _MODULE_ITEM:
+            return {"type": "module_item"}
+        (count,) = _U32.unpack_from(self._map, offset + 1)
+        if tag == _JSON:
+            return json.loads(self._string(count))
+        ids = struct.unpack_from(
+            "<{}I".format(count * (2 if tag == _TYPE else 1)), self._map, offset + 5
+        )
+        if tag == _FUNCTION:
+            pairs = []
+            for pid in ids:
+                parameter_ = self._parameter(pid)
+                pairs.append((parameter_.name, parameter_))
+            return {"type": "function", "signature": signature(pairs)}
+        items = {
+            self._string(ids[i]): self._string(ids[i + 1])
+            for i in range(0, len(ids), 2)
+        }
+        return {"type": "type", "items": items}
+
+    def __getitem__(self, key: str) -> Dict:
+        position = self._find(key)
+        if position < 0:
+            raise KeyError(key)
+        return self._entry(position)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._n_entries):
+            key = self._key(position)
+            self._positions[key] = position
+            yield key
+
+    def __len__(self) -> int:
+        return self._n_entries
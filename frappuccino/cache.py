@@ -0,0 +1,186 @@
+"""
+On-disk cache of per-module spec fragments.
+
+A fragment is the spec obtained by visiting a single module with a fresh
+`Visitor`. It is stored under a name derived from the module name, the hash of
+its source file, the crawl root, the interpreter version and the frappuccino
+version. Each fragment also records the source hash of every in-scope module
+its entries come from (for example through re-exports), and is invalidated if
+any of those changed.
+
+Fragments are found without importing anything, so an unchanged module costs
+a file hash and a small JSON load instead of an import and a crawl.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from importlib.machinery import PathFinder
+from pathlib import Path
+from typing import Dict, Optional
+
+from .logging import logger
+from .records import to_json
+
+
+def find_source(module_name: str) -> Optional[str]:
+    """
+    Return the path of the file defining `module_name`, without importing it.
+
+    Return None for builtin modules, namespace packages or unknown modules.
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return getattr(module, "__file__", None)
+    path = None
+    spec = None
+    parts = module_name.split(".")
+    for i in range(len(parts)):
+        spec = PathFinder.find_spec(".".join(parts[: i + 1]), path)
+        if spec is None:
+            return None
+        path = spec.submodule_search_locations
+        if path is None and i != len(parts) - 1:
+            return None
+    if spec is None or not spec.has_location:
+        return None
+    return spec.origin
+
+
+def module_dependencies(rootname: str, module_name: str, spec: Dict) -> Dict:
+    """
+    Map in-scope modules the entries of `spec` come from to their source file.
+
+    Must be called in the process that crawled `spec`, as it looks at the
+    imported modules.
+    """
+    loaded = {
+        name: getattr(module, "__file__", None)
+        for name, module in list(sys.modules.items())
+        if name.startswith(rootname)
+    }
+    used = {module_name}
+    for key in spec:
+        parts = key.split(".")
+        for i in range(1, len(parts)):
+            prefix = ".".join(parts[:i])
+            if prefix in loaded:
+                used.add(prefix)
+    return {name: loaded.get(name) for name in sorted(used) if loaded.get(name)}
+
+
+class CrawlCache:
+    """
+    Directory of cached module fragments, bounded in size.
+
+    When the total size exceeds `max_size` bytes, least recently used fragments
+    are removed first. Fragments are only reused by caches with the same
+    `variant`, that identifies the options of the visitors that crawled them.
+    """
+
+    def __init__(
+        self, directory, *, max_size: Optional[int] = None, variant: str = ""
+    ):
+        self.directory = Path(directory)
+        self.variant = variant
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._digests: Dict[str, str] = {}
+
+    def _digest(self, path: str) -> str:
+        if path not in self._digests:
+            with open(path, "rb") as f:
+                self._digests[path] = hashlib.sha256(f.read()).hexdigest()
+        return self._digests[path]
+
+    def _path(self, rootname: str, module_name: str) -> Optional[Path]:
+        from . import __version__
+        from .stubs import stub_path
+
+        source = find_source(module_name)
+        if source is None or not os.path.isfile(source):
+            return None
+        parts = [
+            rootname,
+            module_name,
+            self._digest(source),
+            sys.version,
+            __version__,
+            self.variant,
+        ]
+        stub = stub_path(source)
+        if stub is not None:
+            # signatures of extension modules may come from their stub.
+            parts.append(self._digest(stub))
+        key = "\0".join(parts)
+        return self.directory / (hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, rootname: str, module_name: str) -> Optional[Dict]:
+        """
+        Return the cached fragment for `module_name` if still valid, else None.
+        """
+        path = self._path(rootname, module_name)
+        fragment = None
+        if path is not None and path.exists():
+            try:
+                with path.open() as f:
+                    fragment = json.load(f)
+            except ValueError:
+                logger.warning("Ignoring corrupted cache entry %s", path)
+            else:
+                for name, digest in fragment["dependencies"].items():
+                    source = find_source(name)
+                    if source is None or self._digest(source) != digest:
+                        logger.debug("cache: %s invalidated by %s", module_name, name)
+                        fragment = None
+                        break
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(str(path))
+        return fragment
+
+    def put(self, rootname: str, module_name: str, fragment: Dict):
+        """
+        Store `fragment`, its `dependencies` mapping module names to source files.
+        """
+        path = self._path(rootname, module_name)
+        if path is None:
+            return
+        fragment = dict(fragment)
+        fragment["dependencies"] = {
+            name: self._digest(source)
+            for name, source in fragment["dependencies"].items()
+        }
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            json.dump(fragment, f, default=to_json)
+        os.replace(str(tmp), str(path))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used fragments until under `max_size`.
+        """
+        if self.max_size is None:
+            return
+        entries = [(p.stat(), p) for p in self.directory.glob("*.json")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, p in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_size:
+                break
+            p.unlink()
+            total -= stat.st_size
+
+    def stats(self) -> Dict[str, int]:
+        files = list(self.directory.glob("*.json"))
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(files),
+            "size": sum(p.stat().st_size for p in files),
+        }
@@ -0,0 +1,156 @@
+"""
+Merkle fingerprints of specs.
+
+Each entry is hashed, and entries are arranged in a tree following the dots of
+their keys (`pkg` -> `pkg.mod` -> `pkg.mod.Class` -> `pkg.mod.Class.meth`).
+The digest of a node covers its own entry, if any, and the digests of all its
+children; the digest of the root thus changes whenever anything in the spec
+does.
+
+Comparing two fingerprints tells in constant time whether two specs are
+identical, and otherwise which subtrees differ, so that `compare` only looks
+at entries below those.
+
+Import costs (see `importcost`) are not part of the API, and are left out.
+"""
+
+import hashlib
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .importcost import is_import_cost_key
+from .records import to_json
+
+DIGEST_SIZE = 16
+
+_encode = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), default=to_json
+).encode
+
+
+def entry_digest(entry: Dict) -> bytes:
+    """
+    Digest of a single spec entry, independent of the order of its keys.
+    """
+    return hashlib.blake2b(_encode(entry).encode(), digest_size=DIGEST_SIZE).digest()
+
+
+class Fingerprint:
+    """
+    Digests of all the nodes of a spec tree, built from `(key, entry digest)`
+    pairs. The root node is the empty string.
+    """
+
+    def __init__(self, digests: Iterable[Tuple[str, bytes]]):
+        entries = {k: d for k, d in digests if not is_import_cost_key(k)}
+        children: Dict[str, Set[str]] = defaultdict(set)
+        for key in entries:
+            parent = ""
+            i = key.find(".")
+            while i != -1:
+                node = key[:i]
+                children[parent].add(node)
+                parent = node
+                i = key.find(".", i + 1)
+            children[parent].add(key)
+        self.entries = entries
+        self.children: Dict[str, List[str]] = {
+            node: sorted(c) for node, c in children.items()
+        }
+        self.digests: Dict[str, bytes] = {}
+        # children before their parents.
+        for node in sorted(self.children, key=lambda n: -n.count(".") - bool(n)):
+            h = hashlib.blake2b(entries.get(node, b""), digest_size=DIGEST_SIZE)
+            for child in self.children[node]:
+                h.update(child.encode())
+                h.update(self.digests.get(child) or entries[child])
+            self.digests[node] = h.digest()
+        for key, digest in entries.items():
+            self.digests.setdefault(key, digest)
+
+    @classmethod
+    def of(cls, spec) -> "Fingerprint":
+        return cls((key, entry_digest(entry)) for key, entry in spec.items())
+
+    @property
+    def digest(self) -> bytes:
+        return self.digests.get("", hashlib.blake2b(digest_size=DIGEST_SIZE).digest())
+
+    @property
+    def hexdigest(self) -> str:
+        return self.digest.hex()
+
+    def changed_keys(self, other: "Fingerprint") -> Set[str]:
+        """
+        Keys of entries that are in only one of the two specs, or that differ.
+
+        Subtrees with the same digest in both are not descended into.
+        """
+        changed = set()
+        stack = [""]
+        while stack:
+            node = stack.pop()
+            if self.digests.get(node) == other.digests.get(node):
+                continue
+            if node in self.entries or node in other.entries:
+                if self.entries.get(node) != other.entries.get(node):
+                    changed.add(node)
+            stack.extend(
+                set(self.children.get(node, ())).union(other.children.get(node, ()))
+            )
+        return changed
+
+
+class Spec(dict):
+    """
+    A spec, that is a dict mapping keys to entries, with a `fingerprint`.
+
+    The fingerprint is computed on first access and forgotten when the spec is
+    modified.
+    """
+
+    _fingerprint: Optional[Fingerprint] = None
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        if self._fingerprint is None:
+            self._fingerprint = Fingerprint.of(self)
+        return self._fingerprint
+
+    @property
+    def digest(self) -> bytes:
+        return self.fingerprint.digest
+
+    def _modified(method):
+        def wrapper(self, *args, **kwargs):
+            self._fingerprint = None
+            return method(self, *args, **kwargs)
+
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    __setitem__ = _modified(dict.__setitem__)
+    __delitem__ = _modified(dict.__delitem__)
+    clear = _modified(dict.clear)
+    pop = _modified(dict.pop)
+    popitem = _modified(dict.popitem)
+    setdefault = _modified(dict.setdefault)
+    update = _modified(dict.update)
+    del _modified
+
+
+def _api(spec) -> Dict:
+    return {k: v for k, v in spec.items() if not is_import_cost_key(k)}
+
+
+def api_changed(old_spec, new_spec) -> bool:
+    """
+    Whether two specs differ, comparing their digests when they have one.
+    """
+    old = getattr(old_spec, "digest", None)
+    new = getattr(new_spec, "digest", None)
+    if old is None or new is None:
+        return _api(old_spec) != _api(new_spec)
+    return old != new
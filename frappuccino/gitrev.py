@@ -0,0 +1,175 @@
+"""
+Specs of git revisions, without checking them out.
+
+`spec_for_rev` adds a temporary worktree of the revision, crawls it with
+frappuccino in a new interpreter (running this frappuccino, and importing the
+package from the worktree), and removes the worktree. The spec is saved in the
+binary format under the SHA of the commit, so later comparisons to the same
+revision, whatever name it is given (a branch, a tag...), only load it.
+
+Only pure Python packages can be crawled by importing them this way, as
+extension modules are not built in the worktree; `static=True` crawls their
+sources instead (see `astinit`).
+"""
+
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+from .cache import find_source
+
+
+def _git(repo, *args) -> str:
+    result = subprocess.run(
+        ["git", "-C", str(repo)] + list(args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode:
+        raise RuntimeError(
+            "git {} failed:\n{}".format(" ".join(args), result.stderr.strip())
+        )
+    return result.stdout.strip()
+
+
+def resolve_rev(rev: str, repo=".") -> str:
+    """
+    SHA of the commit `rev` refers to in the git repository at `repo`.
+    """
+    return _git(repo, "rev-parse", "--verify", "--quiet", rev + "^{commit}")
+
+
+def rev_cache_path(
+    directory,
+    sha: str,
+    modules: List[str],
+    *,
+    static=False,
+    own_members=False,
+    resolve_lazy=False,
+) -> Path:
+    """
+    Where the spec of `modules` at commit `sha` is cached in `directory`.
+    """
+    from . import __version__
+
+    options = "\0".join(
+        list(modules)
+        + [str(static), str(own_members), str(resolve_lazy), sys.version, __version__]
+    )
+    digest = hashlib.sha256(options.encode()).hexdigest()[:16]
+    return Path(directory) / "{}-{}-{}.fspec".format(modules[0], sha, digest)
+
+
+def _source_root(toplevel: Path, rootname: str) -> Path:
+    """
+    Directory of the repository the package `rootname` is imported from,
+    relative to the top of the repository: `.`, `src`, ...
+    """
+    top = rootname.split(".")[0]
+    source = find_source(top)
+    if source is not None:
+        directory = Path(source).resolve().parent
+        if Path(source).stem == "__init__":
+            directory = directory.parent
+        try:
+            return directory.relative_to(toplevel.resolve())
+        except ValueError:
+            pass
+    return Path("src") if (toplevel / "src").is_dir() else Path(".")
+
+
+def _crawl(
+    toplevel: Path, sha: str, modules: List[str], path: Path, python: str, options
+):
+    with tempfile.TemporaryDirectory(prefix="frappuccino-") as tmp:
+        worktree = Path(tmp) / "worktree"
+        _git(toplevel, "worktree", "add", "--detach", str(worktree), sha)
+        try:
+            env = dict(os.environ)
+            # the package from the worktree, then this frappuccino.
+            env["PYTHONPATH"] = os.pathsep.join(
+                [
+                    str(worktree / _source_root(toplevel, modules[0])),
+                    str(Path(__file__).resolve().parent.parent),
+                ]
+                + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+            )
+            result = subprocess.run(
+                [python, "-m", "frappuccino"]
+                + list(modules)
+                + ["--save", str(path)]
+                + options,
+                cwd=str(worktree),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            )
+            if result.returncode:
+                raise RuntimeError(
+                    "could not crawl {} at {}:\n{}".format(
+                        modules[0], sha[:12], result.stderr.strip()
+                    )
+                )
+        finally:
+            _git(toplevel, "worktree", "remove", "--force", str(worktree))
+
+
+def spec_for_rev(
+    rev: str,
+    modules: List[str],
+    *,
+    repo=".",
+    cache_dir=None,
+    static: bool = False,
+    own_members: bool = False,
+    resolve_lazy: bool = False,
+    python: str = sys.executable,
+):
+    """
+    Spec of `modules` at revision `rev` of the git repository at `repo`.
+
+    Specs are cached in `cache_dir`, by default in the `frappuccino` directory
+    of the git directory of the repository. Raise `RuntimeError` if the
+    revision does not exist or cannot be crawled.
+    """
+    from . import load_spec
+
+    toplevel = Path(_git(repo, "rev-parse", "--show-toplevel"))
+    try:
+        sha = resolve_rev(rev, toplevel)
+    except RuntimeError:
+        raise RuntimeError("unknown revision: {}".format(rev)) from None
+    if cache_dir is None:
+        git_dir = Path(_git(toplevel, "rev-parse", "--git-common-dir"))
+        cache_dir = (toplevel / git_dir) / "frappuccino"
+    path = rev_cache_path(
+        cache_dir,
+        sha,
+        modules,
+        static=static,
+        own_members=own_members,
+        resolve_lazy=resolve_lazy,
+    )
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        options = ["--static"] if static else []
+        if own_members:
+            options.append("--own-members")
+        if resolve_lazy:
+            options.append("--resolve-lazy")
+        # written next to its final place, and only moved there when complete.
+        partial = path.with_name(path.stem + ".{}.fspec".format(os.getpid()))
+        try:
+            _crawl(toplevel, sha, modules, partial, python, options)
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+    return load_spec(path)
@@ -0,0 +1,128 @@
+"""
+Timeline of an API over many versions.
+
+`History` takes the specs of successive versions one at a time, and records
+for each key the versions where its entry was added, changed or removed.
+Consecutive specs are compared through their fingerprints, so unchanged
+subtrees are skipped, and only two specs are held at a time. Entries are only
+kept for the versions where they changed, once per distinct entry (by digest),
+so memory grows with the number of distinct entries rather than with the
+number of versions.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .fingerprint import Fingerprint, entry_digest
+
+# kinds of events; `PRESENT` is the state of keys in the first version that
+# changed later.
+PRESENT, ADDED, CHANGED, REMOVED = " ", "+", "~", "-"
+
+# (version index, kind, digest of the entry or None if removed)
+Event = Tuple[int, str, Optional[bytes]]
+
+
+def _fingerprint(spec) -> Fingerprint:
+    if hasattr(type(spec), "fingerprint"):
+        return spec.fingerprint
+    return Fingerprint.of(spec)
+
+
+class History:
+    """
+    Versions of an API and, for each key that changed, its events.
+    """
+
+    def __init__(self):
+        self.versions: List[str] = []
+        self.timelines: Dict[str, List[Event]] = {}
+        # digest -> entry, for the entries of all events.
+        self.entries: Dict[bytes, Dict] = {}
+        self._spec = None
+        self._fingerprint: Optional[Fingerprint] = None
+
+    def _store(self, entry: Dict) -> bytes:
+        digest = entry_digest(entry)
+        self.entries.setdefault(digest, entry)
+        return digest
+
+    def add(self, label: str, spec):
+        """
+        Add the spec of the version after the last added one.
+        """
+        version = len(self.versions)
+        self.versions.append(label)
+        fingerprint = _fingerprint(spec)
+        if self._fingerprint is not None:
+            previous = self._spec
+            for key in sorted(self._fingerprint.changed_keys(fingerprint)):
+                timeline = self.timelines.get(key)
+                if timeline is None:
+                    timeline = self.timelines[key] = []
+                    if key in previous:
+                        timeline.append((0, PRESENT, self._store(previous[key])))
+                if key not in spec:
+                    timeline.append((version, REMOVED, None))
+                elif key in previous:
+                    timeline.append((version, CHANGED, self._store(spec[key])))
+                else:
+                    timeline.append((version, ADDED, self._store(spec[key])))
+        self._spec = spec
+        self._fingerprint = fingerprint
+
+    def _describe(self, before: Optional[Dict], entry: Optional[Dict]) -> str:
+        from . import format_signature_from_dump
+
+        if entry is None:
+            return ""
+        if entry["type"] == "function":
+            return str(format_signature_from_dump(entry["signature"]))
+        if entry["type"] == "type" and before is not None and before["type"] == "type":
+            old, new = before["items"], entry["items"]
+            return " ".join(
+                [ADDED + k for k in sorted(new.keys() - old)]
+                + [REMOVED + k for k in sorted(old.keys() - new)]
+                + [CHANGED + k for k in sorted(old.keys() & new) if old[k] != new[k]]
+            )
+        return entry["type"]
+
+    def report(self, keys: Optional[Iterable[str]] = None) -> str:
+        """
+        Timeline of each key that changed (or of `keys`), as text.
+        """
+        width = max((len(v) for v in self.versions), default=0)
+        lines = []
+        for key in sorted(self.timelines if keys is None else keys):
+            timeline = self.timelines.get(key)
+            if not timeline:
+                continue
+            lines.append(key)
+            before = None
+            for version, kind, digest in timeline:
+                entry = None if digest is None else self.entries[digest]
+                lines.append(
+                    "    {:<{w}}  {}  {}".format(
+                        self.versions[version],
+                        kind,
+                        self._describe(before, entry),
+                        w=width,
+                    ).rstrip()
+                )
+                before = entry
+        return "\n".join(lines)
+
+
+def load_history(paths: Iterable, labels: Optional[Iterable[str]] = None) -> History:
+    """
+    `History` of the spec files at `paths`, oldest first, labelled by their
+    names without extension unless `labels` are given.
+    """
+    from . import load_spec
+
+    paths = list(paths)
+    labels = [Path(p).stem for p in paths] if labels is None else list(labels)
+    history = History()
+    for path, label in zip(paths, labels):
+        history.add(label, load_spec(path))
+    return history
@@ -0,0 +1,137 @@
+"""
+Import time and memory of modules, measured in fresh interpreters.
+
+Costs are stored in specs next to the API, as `"<module> (import)"` entries
+of type `import_cost`:
+
+    {"type": "import_cost", "seconds": 0.012, "memory": 1048576, "peak": 2097152}
+
+`seconds` is the best wall time of a few imports, each in a new interpreter,
+so that modules already imported by frappuccino, or by previously measured
+modules, are not free. `memory` is the size of what the import allocated and
+kept, and `peak` the maximum allocated during the import, both measured with
+`tracemalloc` in one more interpreter, as tracing slows imports down.
+
+These entries are not part of the API: `compare` and fingerprints ignore
+them, and `import_regressions` compares them instead.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+IMPORT_SUFFIX = " (import)"
+
+# differences below that are noise, whatever the threshold.
+MIN_SECONDS = 0.002
+MIN_BYTES = 64 * 1024
+
+_SCRIPT = """
+import importlib, json, sys, time, tracemalloc
+name, trace = sys.argv[1], sys.argv[2] == "1"
+sys.path[:0] = json.loads(sys.argv[3])
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+importlib.import_module(name)
+seconds = time.perf_counter() - start
+memory, peak = tracemalloc.get_traced_memory() if trace else (0, 0)
+print(json.dumps({"seconds": seconds, "memory": memory, "peak": peak}))
+"""
+
+
+def import_cost_key(module_name: str) -> str:
+    return module_name + IMPORT_SUFFIX
+
+
+def is_import_cost_key(key: str) -> bool:
+    return key.endswith(IMPORT_SUFFIX)
+
+
+def _run(module_name: str, trace: bool, python: str, timeout: Optional[float]):
+    result = subprocess.run(
+        [
+            python,
+            "-c",
+            _SCRIPT,
+            module_name,
+            "1" if trace else "0",
+            json.dumps([p for p in sys.path if p]),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        timeout=timeout,
+        # the current directory is where frappuccino was started from.
+        cwd=os.getcwd(),
+    )
+    if result.returncode:
+        raise ImportError(
+            "could not import {}:\n{}".format(module_name, result.stderr.strip())
+        )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def measure_import(
+    module_name: str,
+    *,
+    repeat: int = 3,
+    python: str = sys.executable,
+    timeout: Optional[float] = None,
+) -> Dict:
+    """
+    Import cost entry of `module_name`, see the module docstring.
+
+    Raise `ImportError` if the module cannot be imported.
+    """
+    seconds = min(
+        _run(module_name, False, python, timeout)["seconds"] for _ in range(repeat)
+    )
+    traced = _run(module_name, True, python, timeout)
+    return {
+        "type": "import_cost",
+        "seconds": seconds,
+        "memory": traced["memory"],
+        "peak": traced["peak"],
+    }
+
+
+def measure_imports(modules: Iterable[str], **kwargs) -> Tuple[Dict, List[str]]:
+    """
+    Import cost entries of `modules`, keyed by `import_cost_key`, and the
+    modules that could not be imported. See `measure_import` for `kwargs`.
+    """
+    entries = {}
+    failed = []
+    for module_name in modules:
+        try:
+            entries[import_cost_key(module_name)] = measure_import(
+                module_name, **kwargs
+            )
+        except (ImportError, subprocess.TimeoutExpired):
+            failed.append(module_name)
+    return entries, failed
+
+
+def import_regressions(old_spec, new_spec, threshold: float = 0.2) -> List[Tuple]:
+    """
+    Return `(module, metric, old, new)` for the import costs of modules that
+    grew by more than `threshold` (0.2 is 20%) between the two specs.
+
+    Modules measured in only one of the specs are ignored.
+    """
+    regressions = []
+    for key in sorted(k for k in new_spec if is_import_cost_key(k)):
+        if key not in old_spec:
+            continue
+        old, new = old_spec[key], new_spec[key]
+        for metric, floor in [("seconds", MIN_SECONDS), ("memory", MIN_BYTES)]:
+            if new[metric] - old[metric] < floor:
+                continue
+            if new[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    (key[: -len(IMPORT_SUFFIX)], metric, old[metric], new[metric])
+                )
+    return regressions
@@ -0,0 +1,237 @@
+"""
+Crawl modules in isolated worker processes.
+
+Each requested module is imported and visited in its own freshly spawned
+interpreter, so a module that hangs, runs out of memory or segfaults on import
+only loses its own part of the spec. Workers send back a partial `Visitor.spec`
+that is merged in the parent, in the order the modules were requested, so the
+result does not depend on which worker finishes first.
+"""
+
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Set
+
+from .cache import module_dependencies
+from .fingerprint import Spec
+from .logging import logger
+
+
+class CrawlResult:
+    """
+    Merged result of a parallel crawl.
+
+    Exposes the same `spec`, `collected` and `counts()` as a `Visitor` so that
+    callers can use either interchangeably.
+    """
+
+    def __init__(self):
+        self.spec: Dict[str, Dict] = Spec()
+        self.collected: Set[str] = set()
+        # module name -> reason for modules that could not be crawled.
+        self.failures: Dict[str, str] = {}
+        self._counts = {"collected": 0, "visited": 0, "rejected": 0}
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict(self._counts)
+        counts["collected"] = len(self.collected)
+        return counts
+
+    def merge(self, partial: Dict):
+        """
+        Merge the partial result of one worker.
+
+        Earlier entries win, except that a bare `module_item` is replaced by
+        the full entry for the same key, mirroring what `Visitor.visit_module`
+        does when it visits the item right after recording it.
+        """
+        for key, entry in partial["spec"].items():
+            merge_entry(self.spec, key, entry)
+        self.collected.update(partial["collected"])
+        for k in ("visited", "rejected"):
+            self._counts[k] += partial[k]
+
+
+def merge_entry(spec: Dict[str, Dict], key: str, entry: Dict):
+    """
+    Insert `entry` in `spec` unless a more complete entry is already there.
+    """
+    existing = spec.get(key)
+    if existing is None or (
+        existing["type"] == "module_item" and entry["type"] != "module_item"
+    ):
+        spec[key] = entry
+
+
+def partial_spec(rootname: str, module_name: str, visitor) -> Dict:
+    """
+    Partial result of a visitor that crawled a single module, as merged by
+    `CrawlResult.merge` and stored by `CrawlCache`.
+    """
+    partial = {
+        "spec": visitor.spec,
+        "collected": sorted(visitor.collected),
+        "dependencies": module_dependencies(
+            rootname.split(".")[0], module_name, visitor.spec
+        ),
+    }
+    partial.update({k: v for k, v in visitor.counts().items() if k != "collected"})
+    return partial
+
+
+def _limit_memory(memory_limit: int):
+    try:
+        import resource
+    except ImportError:  # not available on windows
+        logger.warning("Memory limit not supported on this platform")
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _crawl_worker(
+    rootname: str,
+    module_name: str,
+    memory_limit,
+    stubs,
+    own_members,
+    resolve_lazy,
+    conn,
+):
+    """
+    Entry point of worker processes; visit a single module and send back its spec.
+    """
+    from . import visit_modules
+
+    try:
+        if memory_limit:
+            _limit_memory(memory_limit)
+        _, visitor = visit_modules(
+            rootname,
+            [module_name],
+            stubs=stubs,
+            own_members=own_members,
+            resolve_lazy=resolve_lazy,
+        )
+        conn.send(("ok", partial_spec(rootname, module_name, visitor)))
+    except BaseException as e:
+        conn.send(("error", "{}: {}".format(type(e).__name__, e)))
+    finally:
+        conn.close()
+
+
+def visit_modules_parallel(
+    rootname: str,
+    modules: List[str],
+    *,
+    jobs: Optional[int] = None,
+    timeout: Optional[float] = None,
+    memory_limit: Optional[int] = None,
+    cache=None,
+    stubs=None,
+    own_members=False,
+    resolve_lazy=False,
+):
+    """
+    Same as `visit_modules`, but visit each module in a separate process.
+
+    Parameters
+    ==========
+
+    rootname: str
+        see `visit_modules`.
+    modules: list of str
+        fully qualified names of modules to crawl.
+    jobs: int
+        number of concurrent worker processes, default to the number of CPUs.
+    timeout: float
+        seconds after which a worker is killed and its module skipped.
+    memory_limit: int
+        maximum address space of a worker, in bytes.
+    cache: CrawlCache
+        if given, only crawl modules without a valid cached fragment, and
+        store the fragments of crawled modules.
+    stubs: StubIndex
+        see `visit_modules`.
+    own_members, resolve_lazy: bool
+        see `Visitor`.
+
+    Returns
+    =======
+
+    (skipped, result): a list of module names that could not be crawled, and a
+    `CrawlResult`. Reasons of failures are in `result.failures`.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn")
+    partials: Dict[int, Dict] = {}
+    pending = []
+    for index, name in enumerate(modules):
+        fragment = cache.get(rootname, name) if cache is not None else None
+        if fragment is None:
+            pending.append((index, name))
+        else:
+            partials[index] = fragment
+    running = {}  # connection -> (index, module name, process, deadline)
+    result = CrawlResult()
+
+    def _finish(conn, reason=None):
+        index, name, process, _ = running.pop(conn)
+        if reason is None:
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                status, payload = "died", None
+            if status == "ok":
+                partials[index] = payload
+                if cache is not None:
+                    cache.put(rootname, name, payload)
+            elif status == "error":
+                reason = payload
+        conn.close()
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        if reason is None and index not in partials:
+            reason = "worker exited with code {}".format(process.exitcode)
+        if reason is not None:
+            logger.warning("Could not crawl %s: %s", name, reason)
+            result.failures[name] = reason
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            index, name = pending.pop(0)
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_crawl_worker,
+                args=(
+                    rootname,
+                    name,
+                    memory_limit,
+                    stubs,
+                    own_members,
+                    resolve_lazy,
+                    child_conn,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            deadline = time.monotonic() + timeout if timeout else None
+            running[parent_conn] = (index, name, process, deadline)
+
+        for conn in wait(list(running), timeout=0.1):
+            _finish(conn)
+
+        now = time.monotonic()
+        for conn, (_, _, process, deadline) in list(running.items()):
+            if deadline is not None and now > deadline:
+                process.kill()
+                _finish(conn, "timed out after {}s".format(timeout))
+
+    for index in sorted(partials):
+        result.merge(partials[index])
+    skipped = [name for name in modules if name in result.failures]
+    return skipped, result
@@ -0,0 +1,208 @@
+"""
+Opt-in profiling of crawls.
+
+A `CrawlProfile` passed to `visit_modules` (or to a `Visitor`) records, for
+each `visit_<type>` handler, each phase and each crawled module, the number of
+calls or objects and the time spent. Times of handlers and phases are
+exclusive: the time a `visit_type` spends visiting the members of a class is
+attributed to the handlers of those members, so what remains for `visit_type`
+is mostly `dir` and `getattr`. Time of modules is inclusive.
+
+Phases are `import`, `signature` (`inspect.signature` on signature cache
+misses) and `stringify` (keys of instances), and `main` adds `save`, `load`
+and `compare`.
+
+When no profile is given, visitors only check that their `profile` is None.
+"""
+
+import importlib
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class _Stats:
+    __slots__ = ("calls", "seconds", "entries")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.entries = 0
+
+    def as_dict(self) -> Dict:
+        return {"calls": self.calls, "seconds": self.seconds, "entries": self.entries}
+
+
+class CrawlProfile:
+    """
+    Time and counts per handler, phase and module of a crawl.
+
+    Not thread safe: a profile must only be used by one crawl at a time.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.handlers: Dict[str, _Stats] = {}
+        self.phases: Dict[str, _Stats] = {}
+        self.modules: Dict[str, _Stats] = {}
+        # module being crawled, objects visited are counted towards it.
+        self._module: Optional[_Stats] = None
+        # time spent in nested timed calls, for each timed call in progress.
+        self._inner: List[float] = []
+
+    def _start(self, table: Dict[str, _Stats], name: str):
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = _Stats()
+        self._inner.append(0.0)
+        return stats, self.clock()
+
+    def _stop(self, stats: _Stats, start: float):
+        elapsed = self.clock() - start
+        stats.calls += 1
+        stats.seconds += elapsed - self._inner.pop()
+        if self._inner:
+            self._inner[-1] += elapsed
+
+    def _run(self, table: Dict[str, _Stats], name: str, function, *args):
+        stats, start = self._start(table, name)
+        try:
+            return function(*args)
+        finally:
+            self._stop(stats, start)
+
+    def handler(self, name: str, function, node):
+        """
+        Call visitor handler `function` on `node`, timing it as `name`.
+        """
+        if self._module is not None:
+            self._module.calls += 1
+        return self._run(self.handlers, name, function, node)
+
+    def call(self, phase: str, function, *args):
+        """
+        Call `function(*args)`, timing it as part of `phase`.
+        """
+        return self._run(self.phases, phase, function, *args)
+
+    def timed(self, phase: str, function):
+        """
+        `function`, timed as part of `phase` each time it is called.
+        """
+
+        def timed(*args):
+            return self._run(self.phases, phase, function, *args)
+
+        return timed
+
+    @contextmanager
+    def phase(self, phase: str):
+        """
+        Time the body of the with statement as part of `phase`.
+        """
+        stats, start = self._start(self.phases, phase)
+        try:
+            yield
+        finally:
+            self._stop(stats, start)
+
+    @contextmanager
+    def module(self, name: str, spec=None):
+        """
+        Attribute what happens in the body of the with statement to module
+        `name`; if `spec` is given, count the entries added to it.
+        """
+        stats = self.modules.get(name)
+        if stats is None:
+            stats = self.modules[name] = _Stats()
+        previous, self._module = self._module, stats
+        before = len(spec) if spec is not None else 0
+        start = self.clock()
+        try:
+            yield
+        finally:
+            stats.seconds += self.clock() - start
+            if spec is not None:
+                stats.entries += len(spec) - before
+            self._module = previous
+
+    def as_dict(self) -> Dict:
+        return {
+            table: {
+                name: stats.as_dict() for name, stats in getattr(self, table).items()
+            }
+            for table in ("phases", "handlers", "modules")
+        }
+
+    def dump(self, f):
+        json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+
+    def report(self, limit: int = 20) -> str:
+        """
+        Tables of the most expensive phases, handlers and modules.
+        """
+        lines = []
+        for title, table, count in [
+            ("Phase", self.phases, "calls"),
+            ("Handler", self.handlers, "calls"),
+            ("Module", self.modules, "objects"),
+        ]:
+            if not table:
+                continue
+            total = sum(stats.seconds for stats in table.values()) or 1.0
+            width = max(len(title), *(len(name) for name in table))
+            lines.append(
+                "{:<{w}}  {:>9}  {:>6}  {:>9}".format(
+                    title, "seconds", "%", count, w=width
+                )
+            )
+            ranked = sorted(table.items(), key=lambda item: -item[1].seconds)
+            for name, stats in ranked[:limit]:
+                lines.append(
+                    "{:<{w}}  {:>9.4f}  {:>5.1f}%  {:>9}".format(
+                        name,
+                        stats.seconds,
+                        100 * stats.seconds / total,
+                        stats.calls,
+                        w=width,
+                    )
+                )
+            if len(ranked) > limit:
+                lines.append("... {} more".format(len(ranked) - limit))
+            lines.append("")
+        return "\n".join(lines)
+
+
+@contextmanager
+def _nothing():
+    yield
+
+
+def module_section(profile: Optional[CrawlProfile], name: str, spec=None):
+    """
+    `profile.module(name, spec)`, or a context manager doing nothing if there
+    is no profile.
+    """
+    if profile is None:
+        return _nothing()
+    return profile.module(name, spec)
+
+
+def phase_section(profile: Optional[CrawlProfile], phase: str):
+    """
+    `profile.phase(phase)`, or a context manager doing nothing if there is no
+    profile.
+    """
+    if profile is None:
+        return _nothing()
+    return profile.phase(phase)
+
+
+def import_module(module_name: str, profile: Optional[CrawlProfile] = None):
+    """
+    `importlib.import_module`, timed as the `import` phase of `profile`.
+    """
+    if profile is None:
+        return importlib.import_module(module_name)
+    return profile.call("import", importlib.import_module, module_name)
@@ -0,0 +1,197 @@
+"""
+Compact records for the signatures of function entries.
+
+A signature dump is a list of `[name, parameter]` pairs, each parameter a
+`{"kind": ..., "name": ..., "default": ...}` dict. Held as such for each
+function of a large crawl, the dicts and lists dominate memory, while most
+parameters (`self`, `*args`, `**kwargs`, `x=None`...) and many signatures are
+the same over and over.
+
+`parameter` and `signature` return immutable `ParameterDump` and
+`SignatureDump` records instead, and each distinct parameter and signature is
+only held once as long as something refers to it. They behave like the dumps
+they replace: a `ParameterDump` is a read only mapping with the same keys, a
+`SignatureDump` a read only sequence of `(name, parameter)` pairs that compares
+equal to the list of lists form, so specs loaded from files written before compare with
+crawled ones. `to_json` is the `default` hook with which JSON encoders write
+them in the usual form.
+"""
+
+import sys
+import weakref
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+_KEYS = ("kind", "name", "default")
+
+
+class ParameterDump(Mapping):
+    """
+    Immutable `{"kind", "name", "default"}` mapping, see `parameter`.
+    """
+
+    __slots__ = ("kind", "name", "default", "__weakref__")
+
+    def __init__(self, kind: str, name: str, default):
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "default", default)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ParameterDump is immutable")
+
+    def __getitem__(self, key: str):
+        if key in _KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_KEYS)
+
+    def __len__(self) -> int:
+        return 3
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, ParameterDump):
+            return (self.kind, self.name, self.default) == (
+                other.kind,
+                other.name,
+                other.default,
+            )
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.name, self.default))
+
+    def __reduce__(self):
+        return parameter, (self.kind, self.name, self.default)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class SignatureDump(Sequence):
+    """
+    Immutable sequence of `(name, ParameterDump)` pairs, see `signature`.
+
+    Equal to lists of `[name, parameter]` pairs with equal content.
+    """
+
+    __slots__ = ("pairs", "__weakref__")
+
+    def __init__(self, pairs: Tuple[Tuple[str, ParameterDump], ...]):
+        object.__setattr__(self, "pairs", pairs)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SignatureDump is immutable")
+
+    def __getitem__(self, index):
+        return self.pairs[index]
+
+    def __iter__(self):
+        return iter(self.pairs)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, SignatureDump):
+            return self.pairs == other.pairs
+        if isinstance(other, (list, tuple)):
+            return len(self.pairs) == len(other) and all(
+                isinstance(o, (list, tuple)) and s == tuple(o)
+                for s, o in zip(self.pairs, other)
+            )
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.pairs)
+
+    def __reduce__(self):
+        return signature, (self.pairs,)
+
+    def __repr__(self) -> str:
+        return repr([list(pair) for pair in self.pairs])
+
+
+# flyweights, entries go away with the last record referring to them.
+_parameters: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+_signatures: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
+
+def parameter(kind: str, name: str, default) -> ParameterDump:
+    """
+    The `ParameterDump` of these fields, shared with all equal ones.
+    """
+    # the type of the default is part of the key, as `True == 1 == 1.0` but
+    # they are not written the same.
+    key = (kind, name, default, type(default))
+    record = _parameters.get(key)
+    if record is None:
+        record = _parameters[key] = ParameterDump(
+            _intern(kind), _intern(name), _intern(default)
+        )
+    return record
+
+
+def _intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def signature(pairs: Iterable) -> Union[SignatureDump, list]:
+    """
+    The `SignatureDump` of a signature dump, shared with all equal ones.
+
+    Dumps with parameters `ParameterDump` cannot represent (with annotations,
+    say) are returned as a list, unchanged.
+    """
+    if isinstance(pairs, SignatureDump):
+        return pairs
+    pairs = list(pairs)
+    try:
+        items = []
+        for name, p in pairs:
+            if not isinstance(p, ParameterDump):
+                if not isinstance(p, Mapping) or p.keys() != set(_KEYS):
+                    return pairs
+                p = parameter(p["kind"], p["name"], p["default"])
+            items.append((_intern(name), p))
+    except TypeError:
+        # unhashable default.
+        return pairs
+    # parameters are shared, and equal ones may differ (`True == 1`), so look
+    # signatures up by the identity of their parameters, that they keep alive.
+    key = tuple((name, id(p)) for name, p in items)
+    record = _signatures.get(key)
+    if record is None:
+        record = _signatures[key] = SignatureDump(tuple(items))
+    return record
+
+
+def to_json(o) -> Union[Dict, List]:
+    """
+    `default` hook for `json` encoders, writing records as plain dicts and
+    lists.
+    """
+    if isinstance(o, ParameterDump):
+        return {"kind": o.kind, "name": o.name, "default": o.default}
+    if isinstance(o, SignatureDump):
+        return o.pairs
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(o).__name__)
+    )
+
+
+def stats() -> Dict[str, int]:
+    """
+    Number of distinct parameters and signatures alive.
+    """
+    return {"parameters": len(_parameters), "signatures": len(_signatures)}
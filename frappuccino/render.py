@@ -0,0 +1,148 @@
+"""
+Bounded text of values recorded in specs.
+
+Default values of parameters and module level instances are recorded as their
+`str`, with hex addresses made uniform. Arrays, data frames or large
+containers can take seconds to convert and give megabytes of text, so `render`
+bounds both:
+
+- containers and arrays of more than `MAX_ITEMS` items (by `len`, or `size`
+  for arrays) are not converted at all, and are recorded as
+  `<module.Type size=N>`;
+- text longer than `MAX_LENGTH` is recorded as
+  `<module.Type length=N digest=...>`, the digest being that of the text, so
+  that it still changes when the value does;
+- values whose conversion fails are recorded as `<module.Type unprintable>`.
+
+Those only depend on the value, so that crawls (including static ones, see
+`astinit`) give the same spec each time. A `Renderer` also times conversions,
+per type, so that what is slow to render can be reported.
+"""
+
+import hashlib
+import re
+import time
+from collections.abc import Sized
+from numbers import Integral
+from typing import Callable, Dict, Optional, Tuple
+
+MAX_LENGTH = 1000
+MAX_ITEMS = 10000
+
+hexd = re.compile("0x[0-9a-f]+")
+
+
+def hexuniformify(s: str) -> str:
+    """
+    Uniforming hex addresses to `0xffffff` to avoid difference between rerun.
+
+    Difference  may be due to object id varying in reprs.
+    """
+    return hexd.sub("0xffffff", s)
+
+
+def _qualname(type_: type) -> str:
+    return "{}.{}".format(type_.__module__, type_.__qualname__)
+
+
+def _size(value) -> Optional[int]:
+    """
+    Number of items of a container or array, without converting it.
+    """
+    # `size` of arrays and data frames is a property, of their type.
+    size = getattr(type(value), "size", None)
+    if size is not None and not callable(size):
+        try:
+            size = value.size
+        except Exception:
+            size = None
+        if isinstance(size, Integral):
+            return int(size)
+    if isinstance(value, Sized) and not isinstance(value, (str, bytes)):
+        try:
+            return len(value)
+        except Exception:
+            return None
+    return None
+
+
+def _render(value, max_length: int, max_items: int) -> Tuple[str, bool]:
+    if type(value) is str:
+        text = value
+    elif value is None or isinstance(value, type):
+        # most defaults, `inspect._empty` is a class.
+        text = str(value)
+    else:
+        size = _size(value)
+        if size is not None and size > max_items:
+            return "<{} size={}>".format(_qualname(type(value)), size), True
+        try:
+            text = str(value)
+        except Exception:
+            return "<{} unprintable>".format(_qualname(type(value))), True
+    if "0x" in text:
+        text = hexuniformify(text)
+    if len(text) > max_length:
+        digest = hashlib.blake2b(
+            text.encode("utf-8", "backslashreplace"), digest_size=8
+        ).hexdigest()
+        return (
+            "<{} length={} digest={}>".format(
+                _qualname(type(value)), len(text), digest
+            ),
+            True,
+        )
+    return text, False
+
+
+def render(value, *, max_length: int = MAX_LENGTH, max_items: int = MAX_ITEMS) -> str:
+    """
+    Text of `value` as recorded in specs, see the module docstring.
+    """
+    return _render(value, max_length, max_items)[0]
+
+
+class Renderer:
+    """
+    `render`, counting and timing conversions.
+
+    Calling a renderer renders a value; `stats` tells how many values were
+    rendered, how many were capped, and the time spent, in total and for the
+    slowest types.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_length: int = MAX_LENGTH,
+        max_items: int = MAX_ITEMS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.max_length = max_length
+        self.max_items = max_items
+        self.clock = clock
+        self.calls = 0
+        self.capped = 0
+        self.seconds = 0.0
+        # type -> seconds spent rendering its instances.
+        self.types: Dict[type, float] = {}
+
+    def __call__(self, value) -> str:
+        start = self.clock()
+        text, capped = _render(value, self.max_length, self.max_items)
+        elapsed = self.clock() - start
+        self.calls += 1
+        self.capped += capped
+        self.seconds += elapsed
+        type_ = type(value)
+        self.types[type_] = self.types.get(type_, 0.0) + elapsed
+        return text
+
+    def stats(self, limit: int = 5) -> Dict:
+        slowest = sorted(self.types.items(), key=lambda item: -item[1])[:limit]
+        return {
+            "calls": self.calls,
+            "capped": self.capped,
+            "seconds": self.seconds,
+            "slowest": [(_qualname(t), seconds) for t, seconds in slowest],
+        }
@@ -0,0 +1,138 @@
+"""
+Parse signatures stored as strings in spec files back to parameter dumps.
+
+`serialize_spec` stores signatures without positional only parameters as
+`str(inspect.Signature)`, for example `(self, a, b='x', *args, c=1.5, **kw)`.
+Defaults are always literals (strings, numbers and booleans, see
+`visitor.parameter_dump`), so the string can be read back with a regular
+expression, without compiling, let alone executing, anything. Strings the
+fast path does not understand are parsed with `ast`, still without executing
+them.
+"""
+
+import ast
+import re
+from inspect import Parameter
+from typing import List
+
+from .records import parameter
+
+_EMPTY = str(Parameter.empty)
+_POSITIONAL_ONLY = str(Parameter.POSITIONAL_ONLY)
+_POSITIONAL_OR_KEYWORD = str(Parameter.POSITIONAL_OR_KEYWORD)
+_VAR_POSITIONAL = str(Parameter.VAR_POSITIONAL)
+_KEYWORD_ONLY = str(Parameter.KEYWORD_ONLY)
+_VAR_KEYWORD = str(Parameter.VAR_KEYWORD)
+
+# defaults rendered as names by `str(Signature)`.
+_NAMED = {
+    "True": True,
+    "False": False,
+    "inf": float("inf"),
+    "-inf": float("-inf"),
+    "nan": float("nan"),
+}
+
+_PARAMETER = re.compile(
+    r"""
+    \s*(?P<star>\*{1,2})?(?P<name>[^\W\d]\w*)?
+    (?:=(?P<default>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^,'")]+))?
+    \s*(?P<end>[,)])
+    """,
+    re.VERBOSE,
+)
+
+
+def _literal(text: str):
+    text = text.strip()
+    if text[0] in "'\"":
+        if "\\" not in text:
+            return text[1:-1]
+        return ast.literal_eval(text)
+    if text in _NAMED:
+        return _NAMED[text]
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _dump(name: str, kind: str, default) -> List:
+    return [name, parameter(kind, name, default)]
+
+
+def parse_signature(text: str) -> List:
+    """
+    Return the `visitor.sig_dump` of the signature `text`.
+
+    Raise `ValueError` if `text` is not a signature as written by
+    `serialize_spec`.
+    """
+    if text == "()":
+        return []
+    if not text.startswith("("):
+        return _parse_with_ast(text)
+    params = []
+    kind = _POSITIONAL_OR_KEYWORD
+    pos = 1
+    while pos < len(text):
+        m = _PARAMETER.match(text, pos)
+        if m is None:
+            return _parse_with_ast(text)
+        star, name, default, end = m.group("star", "name", "default", "end")
+        pos = m.end()
+        if star == "*":
+            kind = _KEYWORD_ONLY
+            if name is not None:
+                params.append(_dump(name, _VAR_POSITIONAL, _EMPTY))
+        elif star == "**":
+            params.append(_dump(name, _VAR_KEYWORD, _EMPTY))
+        elif name is None:
+            return _parse_with_ast(text)
+        else:
+            try:
+                value = _EMPTY if default is None else _literal(default)
+            except (ValueError, SyntaxError):
+                return _parse_with_ast(text)
+            params.append(_dump(name, kind, value))
+        if end == ")":
+            break
+    if pos != len(text) or not text.endswith(")"):
+        return _parse_with_ast(text)
+    return params
+
+
+def _ast_default(node):
+    if node is None:
+        return _EMPTY
+    if isinstance(node, ast.Name) and node.id in _NAMED:
+        return _NAMED[node.id]
+    if (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.USub)
+        and isinstance(node.operand, ast.Name)
+        and node.operand.id == "inf"
+    ):
+        return _NAMED["-inf"]
+    return ast.literal_eval(node)
+
+
+def _parse_with_ast(text: str) -> List:
+    try:
+        args = ast.parse("def f{}: pass".format(text)).body[0].args
+        params = []
+        posonly = getattr(args, "posonlyargs", [])
+        positional = posonly + args.args
+        defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+        for i, (arg, default) in enumerate(zip(positional, defaults)):
+            kind = _POSITIONAL_ONLY if i < len(posonly) else _POSITIONAL_OR_KEYWORD
+            params.append(_dump(arg.arg, kind, _ast_default(default)))
+        if args.vararg:
+            params.append(_dump(args.vararg.arg, _VAR_POSITIONAL, _EMPTY))
+        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+            params.append(_dump(arg.arg, _KEYWORD_ONLY, _ast_default(default)))
+        if args.kwarg:
+            params.append(_dump(args.kwarg.arg, _VAR_KEYWORD, _EMPTY))
+    except (SyntaxError, ValueError, IndexError, AttributeError) as e:
+        raise ValueError("Cannot parse signature {!r}: {}".format(text, e)) from None
+    return params
@@ -0,0 +1,374 @@
+"""
+Comparing specs that do not fit in memory.
+
+`compare` needs both specs as mappings, and builds sets of their keys. Here
+specs are NDJSON spec files (see `stream`) sorted by key, which `sort_spec`
+writes from any spec file with an external merge sort: runs of `run_size`
+entries are sorted in memory, written to temporary files, then merged.
+
+`compare_sorted` reads two sorted files side by side, as a merge join, so that
+only the entries at hand are in memory, plus the bases of the classes crawled
+with `own_members`, which are found by bisecting the files. The key space is
+split in shards, at the keys found at regular offsets of the new spec, that
+are compared in parallel worker processes. The result is the one of
+`compare`; only the differences are held in memory, to be sorted the same way.
+"""
+
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .compression import compression_suffix, open_spec
+from .importcost import is_import_cost_key
+from .parallel import merge_entry
+from .stream import is_ndjson, iter_json, ndjson_line
+
+# entries sorted in memory at once by `sort_spec`.
+RUN_SIZE = 100000
+
+_decoder = json.JSONDecoder()
+
+
+def _line_key(line: bytes) -> str:
+    # lines are `[key, type, stored entry]`, only the key is decoded.
+    return _decoder.raw_decode(line.decode("utf-8"), 1)[0]
+
+
+class SortedSpec(Mapping):
+    """
+    Read only spec backed by a NDJSON spec file sorted by key.
+
+    Nothing is loaded up front: entries are read as they are iterated over, or
+    found by bisecting the file, and repeated keys merged like `read_ndjson`
+    does. The last `cache_size` entries looked up are kept.
+    """
+
+    def __init__(self, path, *, cache_size: int = 1024):
+        self.path = path
+        self._file = open(path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._cache: Dict[str, Dict] = OrderedDict()
+        self._cache_size = cache_size
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _offset(self, key: str) -> int:
+        """
+        Offset of the first line whose key is not lower than `key`.
+        """
+        f = self._file
+        lo, hi = 0, self._size
+        # `lo` and `hi` are always at the start of a line.
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            if mid > lo:
+                f.readline()
+            start = f.tell()
+            if start >= hi:
+                break
+            if _line_key(f.readline()) < key:
+                lo = f.tell()
+            else:
+                hi = start
+        f.seek(lo)
+        while f.tell() < hi:
+            start = f.tell()
+            if _line_key(f.readline()) >= key:
+                return start
+        return hi
+
+    def _key_at(self, offset: int) -> Optional[str]:
+        """
+        Key of the first line starting after `offset`, None at the end.
+        """
+        f = self._file
+        f.seek(offset)
+        if offset:
+            f.readline()
+        line = f.readline()
+        return _line_key(line) if line.strip() else None
+
+    def entries(
+        self, start: Optional[str] = None, stop: Optional[str] = None
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Iterate over the `(key, entry)` pairs with `start <= key < stop`, in
+        order of keys.
+        """
+        from . import _expand_entry
+
+        with open(self.path, "rb") as f:
+            if start is not None:
+                f.seek(self._offset(start))
+            merged: Dict[str, Dict] = {}
+            previous = None
+            for line in f:
+                if not line.strip():
+                    continue
+                key, type_, store = json.loads(line)
+                if stop is not None and key >= stop:
+                    break
+                if previous is not None and key != previous:
+                    if key < previous:
+                        raise ValueError(
+                            "{} is not sorted: {} after {}".format(
+                                self.path, key, previous
+                            )
+                        )
+                    yield previous, merged.pop(previous)
+                merge_entry(merged, key, _expand_entry(type_, store))
+                previous = key
+            if previous is not None:
+                yield previous, merged.pop(previous)
+
+    def __getitem__(self, key: str) -> Dict:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        from . import _expand_entry
+
+        f = self._file
+        f.seek(self._offset(key))
+        merged: Dict[str, Dict] = {}
+        for line in f:
+            stored_key, type_, store = json.loads(line)
+            if stored_key != key:
+                break
+            merge_entry(merged, key, _expand_entry(type_, store))
+        if key not in merged:
+            raise KeyError(key)
+        self._cache[key] = merged[key]
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return merged[key]
+
+    def __iter__(self) -> Iterator[str]:
+        previous = None
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                key = _line_key(line)
+                if key != previous:
+                    yield key
+                previous = key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def is_sorted(path) -> bool:
+    """
+    Whether `path` is an uncompressed NDJSON spec file sorted by key.
+    """
+    if not is_ndjson(path) or compression_suffix(path):
+        return False
+    previous = ""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            key = _line_key(line)
+            if key < previous:
+                return False
+            previous = key
+    return True
+
+
+def _spec_lines(path) -> Iterator[bytes]:
+    """
+    NDJSON lines of the entries of spec file `path`, read as they come when
+    the format allows it.
+    """
+    if is_ndjson(path):
+        # copied as they are, only keys are decoded to sort them.
+        with open_spec(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield line if line.endswith(b"\n") else line + b"\n"
+        return
+    from . import BinarySpec, _expand_entry, is_binary
+
+    if is_binary(path):
+        # entries are decoded when accessed.
+        with BinarySpec(path) as spec:
+            for key in spec:
+                yield (ndjson_line(key, spec[key]) + "\n").encode()
+        return
+    with open_spec(path) as f:
+        for key, type_, stored in iter_json(f):
+            entry = _expand_entry(type_, stored)
+            yield (ndjson_line(key, entry) + "\n").encode()
+
+
+def sort_spec(source, destination, *, run_size: int = RUN_SIZE) -> int:
+    """
+    Write the entries of spec file `source` to `destination`, a NDJSON spec
+    file sorted by key, and return the number of lines written.
+
+    At most `run_size` entries are held in memory at once.
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    count = 0
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".sort-") as tmp:
+        runs = []
+        lines = _spec_lines(source)
+        while True:
+            run = list(itertools.islice(lines, run_size))
+            if not run:
+                break
+            # stable, repeated keys stay in order.
+            run.sort(key=_line_key)
+            path = os.path.join(tmp, "{}.ndjson".format(len(runs)))
+            with open(path, "wb") as f:
+                f.writelines(run)
+            count += len(run)
+            runs.append(path)
+        if len(runs) == 1:
+            os.replace(runs[0], destination)
+            return count
+        files = [open(path, "rb") for path in runs]
+        try:
+            with open(destination, "wb") as out:
+                # ties come from the earlier run first.
+                out.writelines(heapq.merge(*files, key=_line_key))
+        finally:
+            for f in files:
+                f.close()
+    return count
+
+
+def shard_bounds(path, shards: int) -> List[Optional[str]]:
+    """
+    Keys splitting sorted spec file `path` in at most `shards` ranges of
+    about the same size, None standing for the start and the end.
+    """
+    bounds: List[Optional[str]] = [None]
+    with SortedSpec(path) as spec:
+        for i in range(1, shards):
+            key = spec._key_at(spec._size * i // shards)
+            if key is not None and (bounds[-1] is None or key > bounds[-1]):
+                bounds.append(key)
+    bounds.append(None)
+    return bounds
+
+
+def _compare_shard(old_path, new_path, start, stop):
+    """
+    Merge join of the entries from `start` to `stop` of two sorted specs.
+
+    Return whether any differ, and the unsorted rows of `compare`.
+    """
+    from . import _compare_entry, _new_key
+
+    changed = False
+    new_keys, removed_keys, changed_keys = [], [], []
+    with SortedSpec(old_path) as old_spec, SortedSpec(new_path) as new_spec:
+        old_entries = old_spec.entries(start, stop)
+        new_entries = new_spec.entries(start, stop)
+        old = next(old_entries, None)
+        new = next(new_entries, None)
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                if not is_import_cost_key(old[0]):
+                    changed = True
+                    removed_keys.append(old[0])
+                old = next(old_entries, None)
+            elif old is None or new[0] < old[0]:
+                if not is_import_cost_key(new[0]):
+                    changed = True
+                    new_keys.append(_new_key(*new))
+                new = next(new_entries, None)
+            else:
+                key = new[0]
+                if not is_import_cost_key(key) and old[1] != new[1]:
+                    changed = True
+                    changed_keys.extend(
+                        _compare_entry(key, old[1], new[1], old_spec, new_spec)
+                    )
+                old = next(old_entries, None)
+                new = next(new_entries, None)
+    return changed, new_keys, removed_keys, changed_keys
+
+
+def diff_sorted(
+    old_path, new_path, *, jobs: int = 1, shards: Optional[int] = None
+) -> Tuple[bool, Tuple[List, List, List]]:
+    """
+    Whether the API differs between two sorted spec files, and the result of
+    `compare` for them, comparing `shards` key ranges (`jobs` by default) in
+    `jobs` worker processes.
+    """
+    from . import _sorted_list
+
+    bounds = shard_bounds(new_path, shards or jobs)
+    tasks = [
+        (old_path, new_path, start, stop) for start, stop in zip(bounds, bounds[1:])
+    ]
+    if jobs > 1 and len(tasks) > 1:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(min(jobs, len(tasks))) as pool:
+            results = pool.starmap(_compare_shard, tasks)
+    else:
+        results = [_compare_shard(*task) for task in tasks]
+    changed = any(result[0] for result in results)
+    new_keys, removed_keys, changed_keys = (
+        _sorted_list(itertools.chain.from_iterable(result[i] for result in results))
+        for i in (1, 2, 3)
+    )
+    return changed, (new_keys, removed_keys, changed_keys)
+
+
+def compare_sorted(
+    old_path, new_path, *, jobs: int = 1, shards: Optional[int] = None
+) -> Tuple[List, List, List]:
+    """
+    `compare` of two sorted spec files (see `sort_spec`); see `diff_sorted`.
+    """
+    return diff_sorted(old_path, new_path, jobs=jobs, shards=shards)[1]
+
+
+def report_sorted(
+    old_path,
+    new_path,
+    *,
+    jobs: int = 1,
+    import_threshold: float = 0.2,
+    run_size: int = RUN_SIZE,
+) -> bool:
+    """
+    `report_comparison` of two spec files of any format, sorted first in a
+    temporary directory unless they already are.
+    """
+    from . import report_comparison
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, path in enumerate([old_path, new_path]):
+            if not is_sorted(path):
+                sorted_path = os.path.join(tmp, "{}.ndjson".format(i))
+                sort_spec(path, sorted_path, run_size=run_size)
+                path = sorted_path
+            paths.append(path)
+        compared = diff_sorted(paths[0], paths[1], jobs=jobs)
+        with SortedSpec(paths[0]) as old_spec, SortedSpec(paths[1]) as new_spec:
+            return report_comparison(
+                old_spec,
+                new_spec,
+                import_threshold=import_threshold,
+                compared=compared,
+            )
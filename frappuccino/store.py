@@ -0,0 +1,270 @@
+"""
+SQLite store of specs of many packages and versions.
+
+Entries are stored once per distinct content (by digest, see `fingerprint`),
+and each version of a package maps its keys to entries:
+
+    versions    id, package, version, digest of the spec fingerprint
+    entries     id, digest, JSON of the entry
+    items       version id, key, type, entry id
+
+`items` is indexed by key, and by type and version, so that questions like
+"functions removed in the last 5 releases" (see `SpecStore.changes`) are
+answered in SQL without loading whole specs. `SpecStore.load` returns a
+`StoredSpec`, which only reads the entries that are looked up; its fingerprint
+comes from the stored digests, so `compare` against a stored version only
+decodes the entries that differ.
+"""
+
+import json
+import sqlite3
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .fingerprint import Fingerprint, entry_digest
+from .records import signature, to_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    package TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    UNIQUE (package, version)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    key TEXT NOT NULL,
+    type TEXT NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    PRIMARY KEY (version_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_key ON items (key);
+CREATE INDEX IF NOT EXISTS items_type ON items (type, version_id);
+"""
+
+ADDED, REMOVED, CHANGED = "added", "removed", "changed"
+
+_encode = json.JSONEncoder(separators=(",", ":"), default=to_json).encode
+
+
+def _decode(data: str) -> Dict:
+    entry = json.loads(data)
+    if entry["type"] == "function":
+        entry["signature"] = signature(entry["signature"])
+    return entry
+
+
+class StoredSpec(Mapping):
+    """
+    Read only spec of one version in a `SpecStore`, read as it is accessed.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, version_id: int, digest):
+        self._connection = connection
+        self._version_id = version_id
+        self.digest = bytes(digest)
+        self._fingerprint: Optional[Fingerprint] = None
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        if self._fingerprint is None:
+            rows = self._connection.execute(
+                "SELECT key, digest FROM items JOIN entries ON entries.id = entry_id "
+                "WHERE version_id = ?",
+                (self._version_id,),
+            )
+            self._fingerprint = Fingerprint((key, bytes(d)) for key, d in rows)
+        return self._fingerprint
+
+    def __getitem__(self, key: str) -> Dict:
+        row = self._connection.execute(
+            "SELECT data FROM items JOIN entries ON entries.id = entry_id "
+            "WHERE version_id = ? AND key = ?",
+            (self._version_id, key),
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return _decode(row[0])
+
+    def __contains__(self, key) -> bool:
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM items WHERE version_id = ? AND key = ?",
+                (self._version_id, key),
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._connection.execute(
+            "SELECT key FROM items WHERE version_id = ? ORDER BY key",
+            (self._version_id,),
+        )
+        return (key for (key,) in rows)
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            "SELECT count(*) FROM items WHERE version_id = ?", (self._version_id,)
+        ).fetchone()[0]
+
+
+class SpecStore:
+    """
+    Specs of packages and their versions in the SQLite database at `path`.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def packages(self) -> List[str]:
+        rows = self.connection.execute(
+            "SELECT DISTINCT package FROM versions ORDER BY package"
+        )
+        return [package for (package,) in rows]
+
+    def versions(self, package: str) -> List[str]:
+        """
+        Versions of `package`, in the order they were first saved.
+        """
+        rows = self.connection.execute(
+            "SELECT version FROM versions WHERE package = ? ORDER BY id", (package,)
+        )
+        return [version for (version,) in rows]
+
+    def _version_ids(self, package: str) -> List[Tuple[int, str]]:
+        return self.connection.execute(
+            "SELECT id, version FROM versions WHERE package = ? ORDER BY id",
+            (package,),
+        ).fetchall()
+
+    def save(self, package: str, version: str, spec: Mapping):
+        """
+        Store `spec` as `version` of `package`, replacing it if it exists.
+        """
+        if hasattr(type(spec), "fingerprint"):
+            fingerprint = spec.fingerprint
+        else:
+            fingerprint = Fingerprint.of(spec)
+        # import costs are not in fingerprints.
+        digests = {k: fingerprint.entries.get(k) for k in spec}
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT id FROM versions WHERE package = ? AND version = ?",
+                (package, version),
+            ).fetchone()
+            if row is None:
+                version_id = self.connection.execute(
+                    "INSERT INTO versions (package, version, digest) VALUES (?, ?, ?)",
+                    (package, version, fingerprint.digest),
+                ).lastrowid
+            else:
+                version_id = row[0]
+                self.connection.execute(
+                    "UPDATE versions SET digest = ? WHERE id = ?",
+                    (fingerprint.digest, version_id),
+                )
+                self.connection.execute(
+                    "DELETE FROM items WHERE version_id = ?", (version_id,)
+                )
+            items = []
+            entries = {}
+            for key, entry in spec.items():
+                digest = digests[key] or entry_digest(entry)
+                if digest not in entries:
+                    entries[digest] = _encode(entry)
+                items.append((version_id, key, entry["type"], digest))
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO entries (digest, data) VALUES (?, ?)",
+                entries.items(),
+            )
+            self.connection.executemany(
+                "INSERT INTO items (version_id, key, type, entry_id) "
+                "SELECT ?, ?, ?, id FROM entries WHERE digest = ?",
+                items,
+            )
+            if row is not None:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE id NOT IN "
+                    "(SELECT DISTINCT entry_id FROM items)"
+                )
+
+    def __contains__(self, package_version: Tuple[str, str]) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM versions WHERE package = ? AND version = ?",
+                package_version,
+            ).fetchone()
+            is not None
+        )
+
+    def load(self, package: str, version: str) -> StoredSpec:
+        """
+        Spec of `version` of `package`; raise `KeyError` if it is not stored.
+        """
+        row = self.connection.execute(
+            "SELECT id, digest FROM versions WHERE package = ? AND version = ?",
+            (package, version),
+        ).fetchone()
+        if row is None:
+            raise KeyError((package, version))
+        return StoredSpec(self.connection, *row)
+
+    def changes(
+        self,
+        package: str,
+        kind: str,
+        *,
+        type_: Optional[str] = None,
+        last: Optional[int] = None,
+    ) -> List[Tuple[str, str]]:
+        """
+        `(version, key)` of the keys `ADDED`, `REMOVED` or `CHANGED` in each
+        version of `package` compared to the previous one, for the `last`
+        versions only if given, and entries of type `type_` only if given (for
+        removed keys, the type they had).
+        """
+        versions = self._version_ids(package)
+        pairs = list(zip(versions, versions[1:]))
+        if last is not None:
+            pairs = pairs[-last:] if last else []
+        type_clause = "" if type_ is None else " AND a.type = ?"
+        if kind in (ADDED, REMOVED):
+            query = (
+                "SELECT a.key FROM items a WHERE a.version_id = ?{} AND NOT EXISTS "
+                "(SELECT 1 FROM items b WHERE b.version_id = ? AND b.key = a.key)"
+            )
+        elif kind == CHANGED:
+            query = (
+                "SELECT a.key FROM items a JOIN items b ON b.key = a.key "
+                "WHERE a.version_id = ?{} AND b.version_id = ? "
+                "AND a.entry_id != b.entry_id"
+            )
+        else:
+            raise ValueError(kind)
+        query = query.format(type_clause) + " ORDER BY a.key"
+        changes = []
+        for (old_id, _), (new_id, version) in pairs:
+            # the keys looked for are in `a`, the version they are missing from
+            # (or differ in) in `b`.
+            a, b = (old_id, new_id) if kind == REMOVED else (new_id, old_id)
+            params = (a,) + (() if type_ is None else (type_,)) + (b,)
+            changes.extend(
+                (version, key) for (key,) in self.connection.execute(query, params)
+            )
+        return changes
@@ -0,0 +1,320 @@
+"""
+Streaming crawl, line delimited (NDJSON) spec files, and streaming reads and
+writes of JSON spec files.
+
+`SpecStream` runs a `Visitor` in a background thread and yields spec entries
+as soon as they are discovered, through a bounded queue, instead of keeping
+them all in `Visitor.spec`. Together with `write_ndjson`, which writes one
+`[key, type, stored entry]` JSON array per line (stored like in
+`serialize_spec`), this keeps memory bounded by the size of the queue whatever
+the size of the crawled package.
+
+An entry may be yielded (and written) several times for the same key, for
+example a `module_item` that is later found to be a function; readers merge
+them with `parallel.merge_entry`.
+
+`dump_json` and `iter_json` write and read the JSON spec files of
+`serialize_spec` an entry at a time, so that neither the file content nor a
+copy of the spec in the layout of the file is held in memory.
+"""
+
+import json
+import queue
+import re
+import threading
+import types
+from collections import defaultdict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .fingerprint import Fingerprint, Spec, entry_digest
+from .logging import logger
+from .parallel import merge_entry
+from .compression import strip_compression
+from .profiling import import_module, module_section
+from .records import to_json
+from .visitor import Visitor
+
+# file extensions of line delimited spec files.
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+_DONE = object()
+
+
+def is_ndjson(path) -> bool:
+    return strip_compression(path).endswith(NDJSON_SUFFIXES)
+
+
+class SpecSink(MutableMapping):
+    """
+    Stand in for `Visitor.spec` that forwards entries to a queue.
+
+    Only keys and the digest of entries are kept, so that the visitor can
+    still check whether an entry was already recorded, and the spec still has a
+    `fingerprint`.
+    """
+
+    def __init__(self, entries: queue.Queue):
+        self._entries = entries
+        self._keys = set()
+        self._digests: Dict[str, bytes] = {}
+        self._module_items = set()
+
+    def __setitem__(self, key: str, entry: Dict):
+        # same precedence as `merge_entry`.
+        if key not in self._digests or key in self._module_items:
+            self._digests[key] = entry_digest(entry)
+            if entry["type"] == "module_item":
+                self._module_items.add(key)
+            else:
+                self._module_items.discard(key)
+        self._keys.add(key)
+        self._entries.put((key, entry))
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        return Fingerprint(self._digests.items())
+
+    def __getitem__(self, key: str):
+        raise KeyError("{} was already streamed".format(key))
+
+    def __delitem__(self, key: str):
+        raise KeyError("{} was already streamed".format(key))
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SpecStream:
+    """
+    Iterate over `(key, entry)` pairs of the spec of `modules`, as they are
+    visited.
+
+    Same parameters as `visit_modules`; `maxsize` is the number of entries that
+    may be waiting to be consumed before the crawl pauses. Once exhausted,
+    `visitor` is the `Visitor` used, for its counts, and `skipped` the modules
+    that could not be imported.
+    """
+
+    def __init__(
+        self,
+        rootname: str,
+        modules,
+        *,
+        stubs=None,
+        own_members=False,
+        resolve_lazy=False,
+        profile=None,
+        maxsize: Optional[int] = 1024,
+    ):
+        self.rootname = rootname
+        self.modules = modules
+        self.skipped = []
+        self.visitor = Visitor(
+            rootname.split(".")[0],
+            logger=logger,
+            profile=profile,
+            stubs=stubs,
+            own_members=own_members,
+            resolve_lazy=resolve_lazy,
+        )
+        self._entries = queue.Queue(maxsize)
+        self.visitor.spec = SpecSink(self._entries)
+        self._error: Optional[BaseException] = None
+
+    def _crawl(self):
+        try:
+            for module_name in self.modules:
+                name = getattr(module_name, "__name__", module_name)
+                with module_section(self.visitor.profile, name, self.visitor.spec):
+                    if isinstance(module_name, types.ModuleType):
+                        module = module_name
+                    else:
+                        try:
+                            module = import_module(module_name, self.visitor.profile)
+                        except (ImportError, RuntimeError, AttributeError):
+                            self.skipped.append(module_name)
+                            raise
+                    self.visitor.visit(module)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._entries.put(_DONE)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict]]:
+        thread = threading.Thread(target=self._crawl, daemon=True)
+        thread.start()
+        while True:
+            item = self._entries.get()
+            if item is _DONE:
+                break
+            yield item
+        thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def ndjson_line(key: str, entry: Dict) -> str:
+    """
+    Line of `write_ndjson` for an entry, without the end of line.
+    """
+    from . import _compact_entry
+
+    type_, store = _compact_entry(entry)
+    return json.dumps([key, type_, store], default=to_json)
+
+
+def write_ndjson(entries: Iterable[Tuple[str, Dict]], f) -> int:
+    """
+    Write `(key, entry)` pairs to text file `f`, one per line, and return the
+    number of lines written.
+    """
+    count = 0
+    for key, entry in entries:
+        f.write(ndjson_line(key, entry))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def iter_ndjson(f) -> Iterator[Tuple[str, Dict]]:
+    """
+    Iterate over the `(key, entry)` pairs stored in text file `f`.
+    """
+    from . import _expand_entry
+
+    for line in f:
+        if not line.strip():
+            continue
+        key, type_, store = json.loads(line)
+        yield key, _expand_entry(type_, store)
+
+
+def read_ndjson(f) -> Dict[str, Dict]:
+    """
+    Load a spec written by `write_ndjson`, merging repeated keys.
+    """
+    spec: Dict[str, Dict] = Spec()
+    for key, entry in iter_ndjson(f):
+        merge_entry(spec, key, entry)
+    return spec
+
+
+_encode_indented = json.JSONEncoder(indent=2, default=to_json).encode
+
+
+def dump_json(spec, f):
+    """
+    Write mapping `spec` to text file `f`, as `serialize_spec` does, an entry
+    at a time.
+    """
+    from . import _compact_entry
+
+    keys: Dict[str, List[str]] = defaultdict(list)
+    for key, entry in spec.items():
+        keys[entry["type"]].append(key)
+    if not keys:
+        f.write("{}")
+        return
+    f.write("{")
+    for i, (type_, type_keys) in enumerate(keys.items()):
+        f.write("{}\n  {}: {{".format("," if i else "", json.dumps(type_)))
+        for j, key in enumerate(type_keys):
+            _, store = _compact_entry(spec[key])
+            # strings are escaped, only lines of the layout are indented.
+            text = _encode_indented(store).replace("\n", "\n    ")
+            f.write("{}\n    {}: {}".format("," if j else "", json.dumps(key), text))
+        f.write("\n  }")
+    f.write("\n}")
+
+
+class _JSONReader:
+    """
+    JSON values read one at a time from a text file, through a buffer of
+    `chunk_size` characters that only grows to fit a single value.
+    """
+
+    _whitespace = re.compile(r"\s*")
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+    def _skip_whitespace(self):
+        while True:
+            self.position = self._whitespace.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return
+            self._fill()
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        return self.buffer[self.position : self.position + 1]
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(
+                "Expecting one of {!r}, found {!r}".format(characters, character)
+            )
+        self.position += 1
+        return character
+
+    def value(self) -> Any:
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # a number may go on in the next chunk.
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.position = end
+            return value
+
+
+def iter_json(f, chunk_size: int = 2**16) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Iterate over the `(key, type, stored entry)` of a spec written by
+    `serialize_spec` to text file `f`, reading it a chunk at a time.
+    """
+    reader = _JSONReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        type_ = reader.value()
+        reader.expect(":")
+        reader.expect("{")
+        if reader.peek() == "}":
+            reader.expect("}")
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                yield key, type_, reader.value()
+                if reader.expect(",}") == "}":
+                    break
+        if reader.expect(",}") == "}":
+            return
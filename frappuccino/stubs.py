@@ -0,0 +1,140 @@
+"""
+Signatures of compiled extension modules, read from `.pyi` stub files.
+
+`inspect.signature` only works on builtin functions and method descriptors
+that carry a `__text_signature__`, which Cython and pybind11 rarely emit. For
+those, the signature is looked up in the stub file next to the extension
+module (`pkg/_ext.cpython-38-x86_64-linux-gnu.so` -> `pkg/_ext.pyi`).
+
+Stubs are summarised by `astinit.APIVisitor`, and summaries are cached on disk
+keyed by the content of the stub, so a stub is only parsed once.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .cache import find_source
+from .logging import logger
+from .records import signature
+
+
+def stub_path(source: Optional[str]) -> Optional[str]:
+    """
+    Path of the stub file next to `source`, if it exists.
+    """
+    if not source:
+        return None
+    directory, filename = os.path.split(source)
+    stub = os.path.join(directory, filename.split(".")[0] + ".pyi")
+    if stub != source and os.path.isfile(stub):
+        return stub
+    return None
+
+
+def _restore(symbol):
+    """
+    Turn a symbol loaded from JSON back into the tuples `APIVisitor` produces.
+    """
+    if symbol is None:
+        return None
+    symbol = tuple(symbol)
+    if symbol[0] == "class":
+        info = symbol[2]
+        info["namespace"] = {k: _restore(v) for k, v in info["namespace"].items()}
+    elif symbol[0] == "try":
+        symbol = ("try", _restore(symbol[1]), _restore(symbol[2]))
+    return symbol
+
+
+class StubIndex:
+    """
+    Summaries of the stub files of extension modules.
+
+    If `cache_dir` is given, summaries are stored there as JSON, named after
+    the hash of the stub content.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._summaries: Dict[str, Optional[Dict]] = {}
+
+    def summary(self, module_name: str, path: Optional[str] = None) -> Optional[Dict]:
+        """
+        Summary of the stub of `module_name`, None if there is no usable stub.
+
+        `path` is the stub file, found next to the module source if not given.
+        """
+        if module_name in self._summaries:
+            return self._summaries[module_name]
+        if path is None:
+            path = stub_path(find_source(module_name))
+        summary = None
+        if path is not None:
+            with open(path, "rb") as f:
+                source = f.read()
+            summary = self._load(module_name, path, source)
+            if summary["dynamic"]:
+                logger.debug("stubs: cannot use %s: %s", path, summary["dynamic"])
+                summary = None
+        self._summaries[module_name] = summary
+        return summary
+
+    def _load(self, module_name: str, path: str, source: bytes) -> Dict:
+        from . import __version__
+        from .astinit import summarise_source
+
+        cached = None
+        if self.cache_dir is not None:
+            key = hashlib.sha256(
+                "\0".join([module_name, os.path.basename(path), __version__]).encode()
+                + b"\0"
+                + source
+            ).hexdigest()
+            cached = self.cache_dir / (key + ".json")
+            if cached.exists():
+                try:
+                    with cached.open() as f:
+                        summary = json.load(f)
+                except ValueError:
+                    logger.warning("Ignoring corrupted stub cache entry %s", cached)
+                else:
+                    summary["namespace"] = {
+                        k: _restore(v) for k, v in summary["namespace"].items()
+                    }
+                    return summary
+        summary = summarise_source(module_name, path, source)
+        if cached is not None:
+            tmp = cached.with_suffix(".tmp")
+            with tmp.open("w") as f:
+                json.dump(summary, f)
+            os.replace(str(tmp), str(cached))
+        return summary
+
+    def signature(self, module_name: str, qualname: str) -> Optional[List]:
+        """
+        Signature dump of `module_name.qualname` as declared in the stub, or
+        None if it is not declared.
+        """
+        summary = self.summary(module_name)
+        if summary is None:
+            return None
+        namespace = summary["namespace"]
+        symbol = None
+        for part in qualname.split("."):
+            if symbol is not None:
+                if symbol[0] != "class":
+                    return None
+                namespace = symbol[2]["namespace"]
+            symbol = namespace.get(part)
+            if symbol is not None and symbol[0] == "try":
+                symbol = symbol[1] or symbol[2]
+            if symbol is None:
+                return None
+        if symbol[0] != "function":
+            return None
+        return signature(symbol[2])
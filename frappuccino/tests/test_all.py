@@ -1,7 +1,10 @@
 import json
+import types
 from inspect import signature
+from textwrap import dedent
 
 from frappuccino import compare, visit_modules
+from frappuccino.records import to_json
 from frappuccino.tests import new, old
 
 
@@ -20,7 +23,7 @@ def test_old_new():
     new_spec = fix_spec(new_spec_visitor.spec, "frappuccino.tests.new", "tests")
 
     actual = list(compare(old_spec, spec=new_spec))
-    assert json.dumps(old_spec) != "{}"
+    assert json.dumps(old_spec, default=to_json) != "{}"
     expected = [
         [],
         [],
@@ -42,3 +45,73 @@ def test_old_new():
         ],
     ]
     assert expected == actual
+
+
+def test_parallel_matches_sequential():
+    from frappuccino import visit_modules_parallel
+
+    modules = ["frappuccino.tests.old", "frappuccino.tests.new", "not_a_module_xyz"]
+    skipped, result = visit_modules_parallel("frappuccino", modules, jobs=2)
+    assert skipped == ["not_a_module_xyz"]
+    assert "ModuleNotFoundError" in result.failures["not_a_module_xyz"]
+
+    _, sequential = visit_modules("frappuccino", modules[:2])
+    assert result.spec == sequential.spec
+    assert result.collected == sequential.collected
+
+
+def test_streamed_ndjson_matches_json(tmp_path):
+    from frappuccino import load_spec, save_spec
+    from frappuccino.stream import SpecStream
+
+    modules = ["frappuccino.tests.old", "frappuccino.tests.new"]
+    stream = SpecStream("frappuccino", modules, maxsize=4)
+    save_spec(tmp_path / "spec.ndjson", stream)
+
+    _, visitor = visit_modules("frappuccino", modules)
+    save_spec(tmp_path / "spec.json", visitor.spec)
+    assert load_spec(tmp_path / "spec.ndjson") == load_spec(tmp_path / "spec.json")
+    assert stream.visitor.counts() == visitor.counts()
+
+
+def _module(name, source):
+    module = types.ModuleType(name)
+    exec(dedent(source), module.__dict__)
+    return module
+
+
+def test_own_members_resolved_at_compare():
+    from frappuccino import moved_keys
+
+    old_source = """
+    class Base(dict):
+        def a(self): pass
+
+    class C(Base):
+        def m(self, x): pass
+    """
+    new_source = """
+    class Base(dict):
+        def a(self): pass
+        def m(self, x): pass
+
+    class C(Base):
+        pass
+    """
+    specs = {}
+    for own_members in (False, True):
+        for version, source in [("old", old_source), ("new", new_source)]:
+            module = _module("ownpkg", source)
+            _, visitor = visit_modules("ownpkg", [module], own_members=own_members)
+            specs[own_members, version] = visitor.spec
+
+    own = specs[True, "new"]
+    assert own["ownpkg.C"]["mro"] == ["ownpkg.Base"]
+    # members of in scope bases are not repeated, out of scope ones are.
+    assert set(own["ownpkg.C"]["items"]) == {"fromkeys"}
+    assert compare(specs[True, "old"], spec=own) == compare(
+        specs[False, "old"], spec=specs[False, "new"]
+    )
+    _, removed, _ = compare(specs[True, "old"], spec=own)
+    assert removed == ["ownpkg.C.m"]
+    assert moved_keys(removed, spec=own) == [["ownpkg.C.m", "ownpkg.Base.m"]]
@@ -5,3 +5,123 @@ def test_reference():
     new = deserialize_spec(open("frappuccino/tests/IPython-8.0.0.dev.json").read())
 
     assert compare(old, spec=new) != []
+
+
+def test_parse_signature_matches_inspect():
+    import inspect
+    import json
+
+    from frappuccino.sigparse import parse_signature
+    from frappuccino.visitor import sig_dump
+
+    signatures = [
+        "(a, b='x,y)', *args, c=-1.5, d=inf, e=-inf, f=True, **kw)",
+        "(*, a=1e+20, b='it\\'s', c=\"\\\"\")",
+        "(x: int = 3, y=-3)",
+    ]
+    for path in ["IPython-7.14.0.json", "IPython-8.0.0.dev.json"]:
+        with open("frappuccino/tests/" + path) as f:
+            signatures.extend(
+                v for v in json.load(f)["function"].values() if isinstance(v, str)
+            )
+    for text in signatures:
+        d = {"inf": float("inf")}
+        exec(f"def f{text}:pass", d)
+        assert parse_signature(text) == sig_dump(inspect.signature(d["f"])), text
+
+
+def test_binary_roundtrip(tmp_path):
+    from frappuccino import compare, load_spec, save_spec
+
+    old = load_spec("frappuccino/tests/IPython-7.14.0.json")
+    new = load_spec("frappuccino/tests/IPython-8.0.0.dev.json")
+    old["extra"] = {
+        "type": "function",
+        "signature": [
+            ["x", {"kind": "POSITIONAL_OR_KEYWORD", "name": "x", "default": 2**70}]
+        ],
+    }
+    old["other"] = {"type": "type", "items": {"a": "b"}, "mro": ["other"]}
+    save_spec(tmp_path / "old.fspec", old)
+
+    loaded = load_spec(tmp_path / "old.fspec")
+    assert loaded["extra"] == old["extra"]
+    assert "missing" not in loaded
+    assert dict(loaded) == old
+    assert compare(loaded, spec=new) == compare(old, spec=new)
+    loaded.close()
+
+
+def test_compressed_roundtrip(tmp_path):
+    import gzip
+    import io
+
+    import pytest
+
+    from frappuccino import deserialize_spec, load_spec, save_spec, serialize_spec
+    from frappuccino.stream import iter_json
+
+    path = "frappuccino/tests/IPython-8.0.0.dev.json"
+    spec = load_spec(path)
+    with open(path) as f:
+        text = f.read()
+    assert deserialize_spec(text) == spec
+    # values cut across chunks.
+    assert list(iter_json(io.StringIO(text), chunk_size=7)) == list(
+        iter_json(io.StringIO(text))
+    )
+
+    for name in ["spec.json.gz", "spec.json.xz", "spec.ndjson.gz"]:
+        save_spec(tmp_path / name, spec)
+        assert load_spec(tmp_path / name) == spec
+    with gzip.open(tmp_path / "spec.json.gz", "rt") as f:
+        assert f.read() == serialize_spec(spec)
+    with pytest.raises(ValueError):
+        save_spec(tmp_path / "spec.fspec.gz", spec)
+
+
+def test_serialise_non_literal_default():
+    import enum
+    import inspect
+
+    from frappuccino import deserialize_spec, serialize_spec
+    from frappuccino.visitor import sig_dump
+
+    class Flag(enum.IntEnum):
+        A = 1
+
+    def f(a=Flag.A):
+        pass
+
+    spec = {"f": {"type": "function", "signature": sig_dump(inspect.signature(f))}}
+    assert deserialize_spec(serialize_spec(spec)) == spec
+
+
+def test_signature_records_are_shared():
+    import inspect
+    import json
+    import pickle
+
+    from frappuccino.records import to_json
+    from frappuccino.visitor import sig_dump
+
+    def f(self, a, *args, b=True, **kwargs):
+        pass
+
+    def g(self, a, *args, b=True, **kwargs):
+        pass
+
+    def h(self, a, *args, b=1, **kwargs):
+        pass
+
+    dump = sig_dump(inspect.signature(f))
+    assert dump is sig_dump(inspect.signature(g))
+    assert dump[0][1] is sig_dump(inspect.signature(h))[0][1]
+    # `True == 1`, but they are not written the same.
+    assert dump[3][1] is not sig_dump(inspect.signature(h))[3][1]
+    plain = json.loads(json.dumps(dump, default=to_json))
+    assert plain[3] == ["b", {"kind": "KEYWORD_ONLY", "name": "b", "default": True}]
+    assert dump == plain and plain == dump
+    assert {"signature": plain} == {"signature": dump}
+    assert pickle.loads(pickle.dumps(dump)) is dump
+    assert dict(dump[1][1]) == plain[1][1]
@@ -0,0 +1,40 @@
+import json
+import shutil
+
+from frappuccino.batch import CHANGED, FAILED, run_batch, schedule
+
+
+def test_batch(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    for name, source in [("small", "def f(a):\n    pass\n"), ("big", "x = 1\n" * 100)]:
+        (src / name).mkdir(parents=True)
+        (src / name / "__init__.py").write_text(source)
+    monkeypatch.syspath_prepend(str(src))
+    monkeypatch.setenv("PYTHONPATH", str(src))
+    packages = ["small", "big", "missing"]
+    assert schedule(packages) == ["big", "small", "missing"]
+
+    output = tmp_path / "out"
+    summary = run_batch(packages[:2], output, jobs=2)
+    assert summary["status"] == 0
+    assert json.loads((output / "summary.json").read_text()) == summary
+    baseline = shutil.copy(summary["packages"]["small"]["spec"], tmp_path)
+    # times of the previous batch win over sizes.
+    summary["packages"]["small"]["seconds"] = 10
+    assert schedule(packages[:2], summary) == ["small", "big"]
+
+    (src / "small" / "__init__.py").write_text("def f(a, b):\n    pass\n")
+    baselines = {"small": baseline}
+    summary = run_batch(packages, output, baselines=baselines, jobs=2)
+    assert summary["status"] == FAILED
+    results = summary["packages"]
+    assert [results[p]["status"] for p in packages] == [
+        "changed",
+        "unchanged",
+        "failed",
+    ]
+    assert "small.f" in (output / "small.txt").read_text()
+    assert "No module named" in (output / "missing.txt").read_text()
+
+    summary = run_batch(packages[:2], output, baselines=baselines)
+    assert summary["status"] == CHANGED
@@ -0,0 +1,37 @@
+import sys
+
+from frappuccino import CrawlCache, visit_modules
+
+
+def test_crawl_cache(tmp_path, monkeypatch):
+    pkg = tmp_path / "src" / "cachedpkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("from .core import f\n")
+    (pkg / "core.py").write_text("def f(a, b=1):\n    pass\n")
+    (pkg / "other.py").write_text("def g(x):\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+    modules = ["cachedpkg", "cachedpkg.other"]
+
+    cache = CrawlCache(tmp_path / "cache")
+    _, first = visit_modules("cachedpkg", modules, cache=cache)
+    assert cache.stats()["misses"] == 2
+    assert "cachedpkg.core.f" in first.spec
+
+    cache = CrawlCache(tmp_path / "cache")
+    _, second = visit_modules("cachedpkg", modules, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert second.spec == first.spec
+
+    # cachedpkg re-exports from core, so changing core invalidates it.
+    (pkg / "core.py").write_text("def f(a, b=2):\n    pass\n")
+    cache = CrawlCache(tmp_path / "cache")
+    assert cache.get("cachedpkg", "cachedpkg") is None
+    assert cache.get("cachedpkg", "cachedpkg.other") is not None
+
+    cache = CrawlCache(tmp_path / "cache", max_size=0)
+    cache.evict()
+    assert cache.stats()["entries"] == 0
+
+    for name in list(sys.modules):
+        if name.startswith("cachedpkg"):
+            del sys.modules[name]
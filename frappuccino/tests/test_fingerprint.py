@@ -0,0 +1,31 @@
+import copy
+
+from frappuccino import compare, load_spec
+from frappuccino.fingerprint import Spec, api_changed
+
+
+def test_fingerprint_skips_unchanged_subtrees():
+    old = Spec(
+        {
+            "pkg.mod": {"type": "module_item"},
+            "pkg.mod.C": {"type": "type", "items": {"m": "pkg.mod.C.m"}},
+            "pkg.mod.C.m": {"type": "function", "signature": []},
+            "pkg.other.f": {"type": "function", "signature": []},
+        }
+    )
+    new = Spec(copy.deepcopy(old))
+    assert not api_changed(old, new)
+    assert old.fingerprint.hexdigest == new.fingerprint.hexdigest
+    assert compare(old, spec=new) == ([], [], [])
+
+    new["pkg.mod.C"] = {"type": "type", "items": {"m": "pkg.mod.C.m", "n": "x"}}
+    assert api_changed(old, new)
+    assert old.fingerprint.changed_keys(new.fingerprint) == {"pkg.mod.C"}
+    assert old.fingerprint.digests["pkg.other"] == new.fingerprint.digests["pkg.other"]
+
+
+def test_fingerprint_compare_matches_full_compare():
+    old = load_spec("frappuccino/tests/IPython-7.14.0.json")
+    new = load_spec("frappuccino/tests/IPython-8.0.0.dev.json")
+    assert api_changed(old, new)
+    assert compare(old, spec=new) == compare(dict(old), spec=dict(new))
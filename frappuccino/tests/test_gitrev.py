@@ -0,0 +1,43 @@
+import shutil
+import subprocess
+
+import pytest
+
+from frappuccino import gitrev
+from frappuccino.gitrev import resolve_rev, spec_for_rev
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_spec_for_rev(tmp_path, monkeypatch):
+    for var in ["GIT_AUTHOR", "GIT_COMMITTER"]:
+        monkeypatch.setenv(var + "_NAME", "frappuccino")
+        monkeypatch.setenv(var + "_EMAIL", "frappuccino@example.com")
+    repo = tmp_path / "repo"
+    (repo / "src" / "revpkg").mkdir(parents=True)
+    init = repo / "src" / "revpkg" / "__init__.py"
+
+    def commit(source):
+        init.write_text(source)
+        subprocess.run(["git", "-C", str(repo), "add", "."], check=True)
+        subprocess.run(["git", "-C", str(repo), "commit", "-qm", "."], check=True)
+
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    commit("def f(a):\n    pass\n")
+    commit("def f(a, b=1):\n    pass\n")
+
+    spec = spec_for_rev("HEAD~1", ["revpkg"], repo=repo)
+    assert [name for name, _ in spec["revpkg.f"]["signature"]] == ["a"]
+    # the temporary worktree is gone.
+    worktrees = subprocess.check_output(["git", "-C", str(repo), "worktree", "list"])
+    assert len(worktrees.splitlines()) == 1
+
+    # cached under the commit, whatever it is called.
+    def crawl(*args):
+        raise AssertionError("not cached")
+
+    monkeypatch.setattr(gitrev, "_crawl", crawl)
+    sha = resolve_rev("HEAD~1", repo)
+    assert spec_for_rev(sha, ["revpkg"], repo=repo) == spec
+
+    with pytest.raises(RuntimeError, match="unknown revision"):
+        spec_for_rev("nope", ["revpkg"], repo=repo)
@@ -0,0 +1,47 @@
+from frappuccino import save_spec
+from frappuccino.fingerprint import Spec
+from frappuccino.history import ADDED, CHANGED, PRESENT, REMOVED, load_history
+
+
+def _function(*names):
+    return {
+        "type": "function",
+        "signature": [
+            [n, {"kind": "POSITIONAL_OR_KEYWORD", "name": n, "default": 1}]
+            for n in names
+        ],
+    }
+
+
+def test_history(tmp_path):
+    versions = [
+        {"pkg.f": _function("a"), "pkg.g": _function("x")},
+        {"pkg.f": _function("a", "b"), "pkg.g": _function("x")},
+        {"pkg.f": _function("a"), "pkg.g": _function("x"), "pkg.h": _function()},
+        {"pkg.f": _function("a"), "pkg.g": _function("x")},
+    ]
+    paths = []
+    for i, spec in enumerate(versions):
+        paths.append(tmp_path / "v{}{}".format(i, [".json", ".fspec"][i % 2]))
+        save_spec(paths[-1], Spec(spec))
+
+    history = load_history(paths)
+    assert history.versions == ["v0", "v1", "v2", "v3"]
+    # unchanged keys have no timeline.
+    assert set(history.timelines) == {"pkg.f", "pkg.h"}
+    f = history.timelines["pkg.f"]
+    assert [(v, kind) for v, kind, _ in f] == [(0, PRESENT), (1, CHANGED), (2, CHANGED)]
+    # the same entry is only stored once.
+    assert f[0][2] == f[2][2]
+    assert len(history.entries) == 3
+    h = history.timelines["pkg.h"]
+    assert [(v, kind) for v, kind, _ in h] == [(2, ADDED), (3, REMOVED)]
+    assert history.report().splitlines() == [
+        "pkg.f",
+        "    v0     (a=1)",
+        "    v1  ~  (a=1, b=1)",
+        "    v2  ~  (a=1)",
+        "pkg.h",
+        "    v2  +  ()",
+        "    v3  -",
+    ]
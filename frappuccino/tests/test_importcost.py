@@ -0,0 +1,40 @@
+import pytest
+
+from frappuccino import compare
+from frappuccino.fingerprint import Spec, api_changed
+from frappuccino.importcost import import_regressions, measure_import, measure_imports
+
+
+def _cost(seconds, memory):
+    return {"type": "import_cost", "seconds": seconds, "memory": memory, "peak": 0}
+
+
+def test_import_cost_is_not_api():
+    old = Spec(
+        {
+            "pkg.f": {"type": "function", "signature": []},
+            "pkg (import)": _cost(0.01, 2**20),
+        }
+    )
+    new = Spec(old, **{"pkg (import)": _cost(0.5, 2**20)})
+    assert not api_changed(old, new)
+    assert not api_changed(dict(old), dict(new))
+    assert compare(dict(old), spec=dict(new)) == ([], [], [])
+    assert import_regressions(old, new) == [("pkg", "seconds", 0.01, 0.5)]
+    # below the threshold, or the noise floor.
+    assert not import_regressions(old, Spec(old, **{"pkg (import)": _cost(0.011, 0)}))
+    assert not import_regressions(
+        Spec(old, **{"pkg (import)": _cost(0.001, 0)}),
+        Spec(old, **{"pkg (import)": _cost(0.0015, 0)}),
+    )
+
+
+def test_measure_import():
+    cost = measure_import("colorsys", repeat=1)
+    assert cost["type"] == "import_cost"
+    assert cost["seconds"] > 0
+    assert cost["peak"] >= cost["memory"] > 0
+    with pytest.raises(ImportError):
+        measure_import("frappuccino_does_not_exist", repeat=1)
+    entries, failed = measure_imports(["frappuccino_does_not_exist"], repeat=1)
+    assert (entries, failed) == ({}, ["frappuccino_does_not_exist"])
@@ -0,0 +1,61 @@
+from types import ModuleType
+
+from frappuccino.render import Renderer, render
+from frappuccino.visitor import Visitor
+
+
+class Array:
+    size = property(lambda self: 10**6)
+
+    def __str__(self):
+        raise AssertionError("large arrays are not converted")
+
+
+class Broken:
+    def __str__(self):
+        raise ValueError
+
+
+def test_render():
+    assert render("x") == "x"
+    assert render(None) == "None"
+    assert render(object()) == "<object object at 0xffffff>"
+    assert render(list(range(20000))) == "<builtins.list size=20000>"
+    assert render(Array()) == "<{}.Array size=1000000>".format(__name__)
+    assert render(Broken()) == "<{}.Broken unprintable>".format(__name__)
+    long = render("a" * 2000)
+    assert long.startswith("<builtins.str length=2000 digest=")
+    assert render("a" * 2000) == long
+    assert render("b" * 2000) != long
+    assert render("a" * 20, max_length=10).startswith("<builtins.str length=20 ")
+
+    renderer = Renderer(max_items=10)
+    assert renderer(list(range(5))) == "[0, 1, 2, 3, 4]"
+    assert renderer(list(range(50))) == "<builtins.list size=50>"
+    stats = renderer.stats()
+    assert (stats["calls"], stats["capped"]) == (2, 1)
+    assert stats["slowest"][0][0] == "builtins.list"
+
+
+def test_visitor_renders_bounded():
+    def f(a, table=dict.fromkeys(range(20000))):
+        pass
+
+    f.__module__, f.__qualname__ = "rendered", "f"
+    module = ModuleType("rendered")
+    module.f = f
+
+    class Holder:
+        data = list(range(20000))
+
+    Holder.__module__, Holder.__qualname__ = "rendered", "Holder"
+    module.Holder = Holder
+
+    visitor = Visitor("rendered")
+    visitor.visit(module)
+    table = visitor.spec["rendered.f"]["signature"][1][1]
+    assert table["default"] == "<builtins.dict size=20000>"
+    assert visitor.spec["rendered.Holder"]["items"]["data"] == (
+        "<builtins.list size=20000>"
+    )
+    assert visitor.render.capped == 2
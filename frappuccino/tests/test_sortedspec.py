@@ -0,0 +1,79 @@
+import sys
+
+from frappuccino import compare, load_spec, save_spec, visit_modules
+from frappuccino.sortedspec import (
+    SortedSpec,
+    compare_sorted,
+    diff_sorted,
+    is_sorted,
+    shard_bounds,
+    sort_spec,
+)
+
+OLD = """
+class Base:
+    def m(self, a):
+        pass
+    def gone(self):
+        pass
+class Sub(Base):
+    def n(self):
+        pass
+def f(a, b=1):
+    pass
+def removed():
+    pass
+"""
+
+NEW = """
+class Base:
+    def m(self, a, b):
+        pass
+    def added(self):
+        pass
+class Sub(Base):
+    def n(self):
+        pass
+def f(a, *, b=1):
+    pass
+def g():
+    pass
+"""
+
+
+def _crawl(tmp_path, monkeypatch, source):
+    (tmp_path / "sortedpkg.py").write_text(source)
+    monkeypatch.delitem(sys.modules, "sortedpkg", raising=False)
+    return visit_modules("sortedpkg", ["sortedpkg"], own_members=True)[1].spec
+
+
+def test_compare_sorted(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    old_path, new_path = tmp_path / "old.json", tmp_path / "new.ndjson"
+    save_spec(old_path, _crawl(tmp_path, monkeypatch, OLD))
+    new_spec = _crawl(tmp_path, monkeypatch, NEW)
+    # streamed entries, out of order and with repeated keys.
+    save_spec(
+        new_path,
+        list(new_spec.items())[::-1] + [("sortedpkg.g", {"type": "module_item"})],
+    )
+    assert not is_sorted(new_path)
+
+    sorted_old, sorted_new = tmp_path / "old.ndjson", tmp_path / "sorted.ndjson"
+    sort_spec(old_path, sorted_old, run_size=3)
+    sort_spec(new_path, sorted_new, run_size=3)
+    assert is_sorted(sorted_old) and is_sorted(sorted_new)
+    assert not list(tmp_path.glob(".sort-*"))
+
+    expected = compare(load_spec(old_path), spec=load_spec(new_path))
+    assert expected[0] and expected[1] and expected[2]
+    with SortedSpec(sorted_new) as spec:
+        assert dict(spec.items()) == dict(load_spec(new_path))
+        assert "sortedpkg.g" in spec and "sortedpkg.h" not in spec
+        entries = spec.entries("sortedpkg.Sub", "sortedpkg._")
+        assert [k for k, _ in entries] == ["sortedpkg.Sub", "sortedpkg.Sub.n"]
+    assert len(shard_bounds(sorted_new, 3)) == 4
+    for shards in [1, 3, 20]:
+        assert compare_sorted(sorted_old, sorted_new, shards=shards) == expected
+    assert diff_sorted(sorted_old, sorted_new, jobs=2) == (True, expected)
+    assert diff_sorted(sorted_new, sorted_new) == (False, ([], [], []))
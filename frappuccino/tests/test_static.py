@@ -0,0 +1,83 @@
+import sys
+from textwrap import dedent
+
+from frappuccino import visit_modules
+from frappuccino.astinit import visit_modules_static
+
+CORE = """
+from typing import List
+
+X = 1
+SENTINEL = "default"
+
+def f(a, b=None, *args, c=1.5, d=float, e=SENTINEL, **kw):
+    pass
+
+class Base(Exception):
+    a = 1
+    empty = ""
+
+    def meth(self, x, /, y=X):
+        pass
+
+    @classmethod
+    def cm(cls, y=2):
+        pass
+
+    @staticmethod
+    def sm(z):
+        pass
+
+    @property
+    def p(self):
+        return 1
+
+    class Inner:
+        def i(self):
+            pass
+
+class Sub(Base):
+    b = (1, 2)
+    alias = f
+
+    def meth(self, x, y=3):
+        pass
+
+try:
+    from ._speedups import fast
+except ImportError:
+    fast = None
+"""
+
+DYNAMIC = """
+import functools
+
+@functools.lru_cache()
+def cached(a):
+    pass
+"""
+
+
+def test_static_matches_import(tmp_path, monkeypatch):
+    pkg = tmp_path / "staticpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("from .core import Base, f\nfrom . import dyn\n")
+    (pkg / "core.py").write_text(dedent(CORE))
+    (pkg / "dyn.py").write_text(dedent(DYNAMIC))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    try:
+        _, static = visit_modules_static("staticpkg", ["staticpkg.core"])
+        assert static.fallbacks == {}
+        assert "staticpkg.core" not in sys.modules
+        assert "staticpkg.core.Sub.meth" in static.spec
+
+        skipped, static = visit_modules_static("staticpkg", ["staticpkg"])
+        assert skipped == []
+        assert list(static.fallbacks) == ["staticpkg.dyn"]
+
+        _, imported = visit_modules("staticpkg", ["staticpkg"])
+        assert static.spec == imported.spec
+    finally:
+        for name in list(sys.modules):
+            if name.startswith("staticpkg"):
+                del sys.modules[name]
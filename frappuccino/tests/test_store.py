@@ -0,0 +1,51 @@
+from frappuccino import compare
+from frappuccino.fingerprint import Spec
+from frappuccino.store import ADDED, CHANGED, REMOVED, SpecStore
+
+
+def _function(*names):
+    return {
+        "type": "function",
+        "signature": [
+            [n, {"kind": "POSITIONAL_OR_KEYWORD", "name": n, "default": 1}]
+            for n in names
+        ],
+    }
+
+
+def test_store(tmp_path):
+    versions = [
+        {"pkg.f": _function("a"), "pkg.g": _function("x"), "pkg.m": {"type": "int"}},
+        {"pkg.f": _function("a", "b"), "pkg.g": _function("x"), "pkg.h": _function()},
+        {"pkg.f": _function("a"), "pkg.h": _function()},
+    ]
+    with SpecStore(tmp_path / "specs.db") as store:
+        for i, spec in enumerate(versions):
+            store.save("pkg", str(i), Spec(spec))
+        store.save("other", "0", Spec(versions[0]))
+        assert store.packages() == ["other", "pkg"]
+        assert store.versions("pkg") == ["0", "1", "2"]
+        assert ("pkg", "1") in store and ("pkg", "3") not in store
+
+        for i, spec in enumerate(versions):
+            loaded = store.load("pkg", str(i))
+            assert dict(loaded) == spec
+            assert loaded.digest == Spec(spec).digest
+        old, new = store.load("pkg", "0"), store.load("pkg", "1")
+        assert compare(old, spec=new) == compare(versions[0], spec=versions[1])
+
+        assert store.changes("pkg", ADDED) == [("1", "pkg.h")]
+        assert store.changes("pkg", REMOVED) == [
+            ("1", "pkg.m"),
+            ("2", "pkg.g"),
+        ]
+        assert store.changes("pkg", REMOVED, type_="function") == [("2", "pkg.g")]
+        assert store.changes("pkg", CHANGED) == [("1", "pkg.f"), ("2", "pkg.f")]
+        assert store.changes("pkg", CHANGED, last=1) == [("2", "pkg.f")]
+
+        # replacing a version drops the entries nothing refers to anymore.
+        store.save("pkg", "2", Spec({"pkg.f": _function("c")}))
+        store.save("pkg", "2", Spec(versions[2]))
+        assert dict(store.load("pkg", "2")) == versions[2]
+        (count,) = store.connection.execute("SELECT count(*) FROM entries").fetchone()
+        assert count == 5
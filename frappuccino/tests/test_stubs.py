@@ -0,0 +1,56 @@
+import importlib.util
+import shutil
+import sys
+from textwrap import dedent
+
+import pytest
+
+from frappuccino import visit_modules
+from frappuccino.astinit import visit_modules_static
+from frappuccino.stubs import StubIndex
+
+# xxlimited_35 is a small extension module shipped with CPython, whose
+# functions and methods have no `__text_signature__`.
+STUB = """
+class error(Exception): ...
+
+class Xxo:
+    def demo(self, o, /): ...
+
+class Null: ...
+class Str(str): ...
+
+def roj(b, /) -> None: ...
+def foo(i: int, j: int, /) -> int: ...
+def new() -> Xxo: ...
+"""
+
+
+@pytest.fixture
+def extension(tmp_path, monkeypatch):
+    spec = importlib.util.find_spec("xxlimited_35")
+    if spec is None or sys.modules.get("xxlimited_35"):
+        pytest.skip("needs a fresh xxlimited_35 extension module")
+    shutil.copy(spec.origin, str(tmp_path))
+    (tmp_path / "xxlimited_35.pyi").write_text(dedent(STUB))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    sys.modules.pop("xxlimited_35", None)
+
+
+def test_stub_signatures(extension, tmp_path):
+    index = StubIndex(tmp_path / "stubs")
+    _, result = visit_modules_static("xxlimited_35", ["xxlimited_35"], stubs=index)
+    assert not result.fallbacks
+    assert "xxlimited_35" not in sys.modules
+    assert [name for name, _ in result.spec["xxlimited_35.foo"]["signature"]] == [
+        "i",
+        "j",
+    ]
+
+    # parsed stubs are reused from disk.
+    assert len(list((tmp_path / "stubs").glob("*.json"))) == 1
+    index = StubIndex(tmp_path / "stubs")
+    _, visitor = visit_modules("xxlimited_35", ["xxlimited_35"], stubs=index)
+    assert "xxlimited_35.Xxo.demo" in visitor.spec
+    assert visitor.spec == result.spec
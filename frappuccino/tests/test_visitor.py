@@ -0,0 +1,213 @@
+import functools
+import gc
+import json
+import sys
+from types import ModuleType
+
+from frappuccino import visit_modules
+from frappuccino.profiling import CrawlProfile
+from frappuccino.visitor import (
+    IdentityRegistry,
+    SignatureCache,
+    Visitor,
+    _signature_dump,
+    handlers,
+    lazy_attributes,
+    register,
+)
+
+
+class Node:
+    pass
+
+
+def test_identity_registry():
+    registry = IdentityRegistry()
+    a, b = Node(), [1, 2]
+    registry.add(a, "a")
+    registry.add(b)
+
+    assert a in registry
+    assert registry.lookup(a) == (True, "a")
+    assert registry.lookup(Node()) == (False, None)
+    assert len(registry) == 2
+
+    registry.add(b, "b")
+    assert registry.get(b) == "b"
+
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_identity_registry_does_not_keep_objects_alive():
+    registry = IdentityRegistry()
+    node = Node()
+    registry.add(node, "key")
+    assert len(registry) == 1
+    del node
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_signature_cache():
+    import functools
+
+    cache = SignatureCache(maxsize=2)
+    calls = []
+
+    def compute(function):
+        calls.append(function)
+        return _signature_dump(function)
+
+    class Base:
+        @classmethod
+        def make(cls, x, y=1):
+            pass
+
+    class Sub(Base):
+        pass
+
+    def f(a, b=[]):
+        pass
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        pass
+
+    assert cache.dump(Base.make, compute) == cache.dump(Sub.make, compute)
+    assert cache.dump(f, compute) == cache.dump(wrapper, compute)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 2
+
+    cache.dump(len, compute)
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 2
+
+
+def test_crawl_profile():
+    profile = CrawlProfile()
+    _, visitor = visit_modules("json", ["json"], profile=profile)
+    handled = sum(s.calls for s in profile.handlers.values())
+    assert profile.modules["json"].calls == handled
+    assert profile.modules["json"].entries == len(visitor.spec)
+    assert {"import", "signature", "stringify"} <= set(profile.phases)
+    # times are exclusive, so they add up to at most the time of the module.
+    total = sum(s.seconds for s in profile.handlers.values())
+    total += sum(s.seconds for s in profile.phases.values())
+    assert total <= profile.modules["json"].seconds
+    assert json.loads(json.dumps(profile.as_dict()))["modules"]["json"]["calls"]
+    assert "visit_module" in profile.report()
+
+
+def test_registered_handlers():
+    def f(a, b):
+        pass
+
+    module = ModuleType("plug")
+    module.p = functools.partial(f, 1)
+
+    class Proxy:
+        def __getattr__(self, name):
+            return name
+
+    module.proxy = Proxy()
+
+    visitor, later = Visitor("plug"), Visitor("plug")
+    later.visit(ModuleType("plug.empty"))
+    visitor.visit(module)
+    assert "plug.p" in visitor.spec and visitor.spec["plug.p"]["type"] == "module_item"
+    assert visitor._dispatch[functools.partial][0] == "visit_unknown"
+    # depends on the instance, hence not cached.
+    assert Proxy not in visitor._dispatch
+
+    @register(functools.partial)
+    def visit_partial(visitor, node):
+        visitor.spec["plug.p()"] = {"type": "function", "signature": []}
+        return "plug.p()"
+
+    try:
+        # visitors created before the handler was registered use it.
+        later.visit(module)
+        assert later._dispatch[functools.partial][0] == "visit_partial"
+        assert "plug.p()" in later.spec
+    finally:
+        handlers.unregister(functools.partial)
+    assert handlers.lookup(functools.partial) is None
+
+
+LAZY_INIT = """
+import importlib
+
+
+def attach(package_name, submodules, submod_attrs):
+    attr_to_modules = {a: m for m, attrs in submod_attrs.items() for a in attrs}
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module(f"{package_name}.{name}")
+        if name not in attr_to_modules:
+            raise AttributeError(name)
+        submodule = importlib.import_module(
+            f"{package_name}.{attr_to_modules[name]}"
+        )
+        return getattr(submodule, name)
+
+    def __dir__():
+        return sorted(submodules | attr_to_modules.keys())
+
+    return __getattr__, __dir__
+
+
+__getattr__, __dir__ = attach(__name__, {"heavy"}, {"core": ["f"]})
+"""
+
+
+def test_lazy_modules(tmp_path, monkeypatch):
+    for name in ["lazypkg", "stubbedpkg"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "heavy.py").write_text("X = 1\n")
+        (tmp_path / name / "core.py").write_text("def f(a, b=1):\n    pass\n")
+    (tmp_path / "lazypkg" / "__init__.py").write_text(LAZY_INIT)
+    (tmp_path / "stubbedpkg" / "__init__.py").write_text(
+        "def __getattr__(name):\n    raise AttributeError(name)\n"
+    )
+    (tmp_path / "stubbedpkg" / "__init__.pyi").write_text(
+        "from . import heavy\nfrom .core import f as f\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ["lazypkg", "stubbedpkg"]:
+        for module in [name, name + ".heavy", name + ".core"]:
+            monkeypatch.delitem(sys.modules, module, raising=False)
+
+    _, visitor = visit_modules("lazypkg", ["lazypkg"])
+    assert "lazypkg.heavy" not in sys.modules
+    assert "lazypkg.core" not in sys.modules
+    assert visitor.spec["lazypkg.heavy"] == {
+        "type": "module_item",
+        "lazy": "lazypkg.heavy",
+    }
+    assert visitor.spec["lazypkg.f"]["lazy"] == "lazypkg.core.f"
+
+    # declared in the stub, the signature comes from the stub of the submodule.
+    (tmp_path / "stubbedpkg" / "core.pyi").write_text("def f(a, b=...): ...\n")
+    module = __import__("stubbedpkg")
+    assert lazy_attributes(module) == {}
+    _, visitor = visit_modules("stubbedpkg", ["stubbedpkg"])
+    assert "stubbedpkg.core" not in sys.modules
+    assert visitor.spec["stubbedpkg.f"]["lazy"] == "stubbedpkg.core.f"
+    signature = visitor.spec["stubbedpkg.core.f"]["signature"]
+    assert [name for name, _ in signature] == ["a", "b"]
+
+    # already imported attributes are visited as usual.
+    import lazypkg.core  # noqa: F401
+
+    _, visitor = visit_modules("lazypkg", ["lazypkg"])
+    assert "lazypkg.core.f" in visitor.spec
+    assert "lazypkg.f" not in visitor.spec
+    assert "lazypkg.heavy" not in sys.modules
+
+    _, visitor = visit_modules("lazypkg", ["lazypkg"], resolve_lazy=True)
+    assert "lazypkg.heavy" in sys.modules
+    assert visitor.spec["lazypkg.heavy.X"] == {"type": "module_item"}
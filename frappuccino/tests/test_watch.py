@@ -0,0 +1,64 @@
+import sys
+import threading
+
+from frappuccino import visit_modules
+from frappuccino.fingerprint import Spec
+from frappuccino.watch import Watcher, request, serve
+
+
+def test_watcher(tmp_path, monkeypatch):
+    pkg = tmp_path / "src" / "watchedpkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("from . import core, other, util\n")
+    (pkg / "core.py").write_text(
+        "def f(a, b=1):\n    pass\nclass Base:\n    def m(self):\n        pass\n"
+    )
+    (pkg / "other.py").write_text(
+        "from .core import Base\nclass Sub(Base):\n    pass\n"
+    )
+    (pkg / "util.py").write_text("def g(x):\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+
+    watcher = Watcher("watchedpkg", ["watchedpkg"])
+    before = Spec(watcher.spec)
+    util = watcher.parts["watchedpkg.util"]
+    assert watcher.dependencies["watchedpkg.other"] == {"watchedpkg.core"}
+    assert watcher.refresh() == []
+
+    # Sub inherits from core, so other is crawled again, util is not.
+    (pkg / "core.py").write_text(
+        "def f(a, b=22):\n    pass\nclass Base:\n    def m(self, y):\n        pass\n"
+    )
+    assert watcher.refresh() == ["watchedpkg.core"]
+    assert watcher.parts["watchedpkg.util"] is util
+    assert watcher.spec == visit_modules("watchedpkg", ["watchedpkg"])[1].spec
+    report, status = watcher.report(before)
+    assert status == 1
+    assert "(a, b=22)" in report
+
+    (pkg / "util.py").write_text("def g(x:\n")
+    assert watcher.refresh() == ["watchedpkg.util"]
+    assert "SyntaxError" in watcher.errors["watchedpkg.util"]
+
+    socket_path = str(tmp_path / "frappuccino.sock")
+    listening = threading.Event()
+    server = threading.Thread(
+        target=serve,
+        args=(watcher, socket_path, {"before": before}.get),
+        kwargs={"interval": 0.05, "ready": listening.set},
+    )
+    server.start()
+    try:
+        listening.wait(5)
+        (pkg / "util.py").write_text("def g(x, y):\n    pass\n")
+        reply = request(socket_path, {"compare": "before"})
+        assert reply["status"] == 1
+        assert "(x, y)" in reply["report"]
+        assert not watcher.errors
+    finally:
+        request(socket_path, {"stop": True})
+        server.join(5)
+
+    for name in list(sys.modules):
+        if name.startswith("watchedpkg"):
+            del sys.modules[name]
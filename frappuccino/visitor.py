@@ -3,48 +3,372 @@
 
 """
 
+import functools
 import inspect
-import re
-from types import ModuleType
-from typing import Any, Dict, List, Set
-
+import sys
+import typing
+import weakref
+from collections import OrderedDict
+from types import FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .fingerprint import Spec
 from .logging import logger as _logger
+from .records import parameter, signature
+from .render import Renderer, hexuniformify, render
 
-hexd = re.compile("0x[0-9a-f]+")
 
+def sig_dump(sig, render=render):
+    """
+    Given a signature (from inspect signature), dump ti to json
 
-def hexuniformify(s: str) -> str:
+    The dump is a shared `SignatureDump`, see `frappuccino.records`. Default
+    values are converted with `render`.
     """
-    Uniforming hex addresses to `0xffffff` to avoid difference between rerun.
+    return signature(
+        [(k, parameter_dump(v, render)) for k, v in sig.parameters.items()]
+    )
 
-    Difference  may be due to object id varying in reprs.
+
+def parameter_dump(p, render=render):
+    """
+    Given a parameter (from inspect signature), dump to to json
     """
-    return hexd.sub("0xffffff", s)
+    if isinstance(p.default, (int, float, bool)):
+        default = p.default
+    else:
+        default = render(p.default)
+    # annotations are not recorded.
+    return parameter(str(p.kind), p.name, default)
 
 
-def sig_dump(sig):
+def resolve_items(spec, entry: Dict) -> Dict:
     """
-    Given a signature (from inspect signature), dump ti to json
+    Items of a class entry, including the ones inherited from the bases listed
+    in its `mro` (see `Visitor(own_members=True)`).
     """
-    return [[k, parameter_dump(v)] for k, v in sig.parameters.items()]
+    items = {}
+    for base in reversed(entry.get("mro", ())):
+        base_entry = spec.get(base)
+        if base_entry is not None and "items" in base_entry:
+            items.update(base_entry["items"])
+    items.update(entry["items"])
+    return items
 
 
-def parameter_dump(p):
+def lazy_attributes(module, stubs=None) -> Dict[str, Optional[str]]:
     """
-    Given a parameter (from inspect signature), dump to to json
+    Attributes a module resolves in its `__getattr__` (PEP 562), mapped to the
+    fully qualified name of what they resolve to, or None if it is not known.
+
+    Lazy attributes are the ones listed by `dir` or declared by the module
+    (in the `lazy_loader.attach` closure of its `__getattr__`, or as imports
+    in its stub) without being in its namespace. Nothing is imported.
     """
-    if isinstance(p.default, (int, float, bool)):
-        default = p.default
-    else:
-        default = hexuniformify(str(p.default))
-    data = {
-        "kind": str(p.kind),
-        "name": p.name,
-        "default": default,
+    namespace = vars(module)
+    getter = namespace.get("__getattr__")
+    if getter is None:
+        return {}
+    targets = {}
+    try:
+        nonlocals = inspect.getclosurevars(getter).nonlocals
+    except TypeError:
+        nonlocals = {}
+    package = nonlocals.get("package_name", module.__name__)
+    for name in nonlocals.get("submodules", ()):
+        targets[name] = f"{package}.{name}"
+    for name, submodule in nonlocals.get("attr_to_modules", {}).items():
+        targets[name] = f"{package}.{submodule}.{name}"
+    summary = stubs.summary(module.__name__) if stubs is not None else None
+    if summary is not None:
+        for name, symbol in summary["namespace"].items():
+            if symbol is not None and symbol[0] == "from":
+                targets.setdefault(name, f"{symbol[1]}.{symbol[2]}")
+    try:
+        names = set(dir(module))
+    except Exception:
+        names = set()
+    return {
+        name: targets.get(name)
+        for name in names | set(targets)
+        if name not in namespace
     }
-    if p.annotation is not inspect._empty:
-        data["annotation"]: str(p.annotation)
-    return data
+
+
+def is_loaded(qualname: Optional[str]) -> bool:
+    """
+    Whether the object `qualname` is already imported: a module in
+    `sys.modules`, or an attribute in the namespace of one.
+    """
+    if qualname is None:
+        return False
+    if qualname in sys.modules:
+        return True
+    parent, _, name = qualname.rpartition(".")
+    module = sys.modules.get(parent)
+    return module is not None and name in vars(module)
+
+
+def is_reexport(key: str, item) -> bool:
+    """
+    Whether the module attribute `key` re-exports an object defined elsewhere.
+
+    Re-exported classes, functions, modules and typing annotations are neither
+    recorded as module items nor visited from the re-exporting module.
+    """
+    if isinstance(item, typing._SpecialForm):
+        return True
+    elif isinstance(item, type):
+        return key != item.__module__ + "." + item.__name__
+    elif isinstance(item, ModuleType):
+        return key != item.__name__
+    elif isinstance(item, FunctionType):
+        return key != item.__module__ + "." + item.__name__
+    return False
+
+
+class IdentityRegistry:
+    """
+    Registry of objects indexed by identity.
+
+    Lookups are O(1) on `id(obj)`, and each registered object can carry a value
+    (for the visitor, the key returned when the object was visited).
+
+    Objects supporting weak references are only weakly held and their entry is
+    dropped as soon as they are garbage collected, so the registry does not keep
+    the whole crawled object graph alive. Objects that cannot be weakly
+    referenced (ints, strings, tuples, some instances...) are kept alive while
+    registered, otherwise their `id` could be reused by a new object and give
+    a false hit.
+    """
+
+    def __init__(self):
+        # id(obj) -> (reference, value), where reference is either a weakref
+        # or the object itself.
+        self._entries: Dict[int, Tuple[Any, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _reference(self, obj):
+        ident = id(obj)
+        entries = self._entries
+
+        def _forget(ref):
+            # only drop the entry if it has not been replaced since.
+            if entries.get(ident, (None,))[0] is ref:
+                del entries[ident]
+
+        try:
+            return weakref.ref(obj, _forget)
+        except TypeError:
+            return obj
+
+    def add(self, obj, value=None):
+        """
+        Register `obj`, with an optional associated value.
+        """
+        ident = id(obj)
+        entry = self._entries.get(ident)
+        if entry is not None:
+            self._entries[ident] = (entry[0], value)
+        else:
+            self._entries[ident] = (self._reference(obj), value)
+
+    def get(self, obj, default=None):
+        """
+        Return the value associated with `obj`, `default` if not registered.
+
+        This does not count as a lookup in the statistics.
+        """
+        return self._entries.get(id(obj), (None, default))[1]
+
+    def lookup(self, obj) -> Tuple[bool, Any]:
+        """
+        Return a `(found, value)` pair and update hit/miss statistics.
+        """
+        entry = self._entries.get(id(obj))
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry[1]
+
+    def __contains__(self, obj) -> bool:
+        return id(obj) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Size of the registry and lookup hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SignatureCache:
+    """
+    Bounded LRU cache of signature dumps.
+
+    The same function is often reached several times as a different object:
+    classmethods bound to each subclass, methods bound to instances, or
+    wrappers of the same function. Such callables are keyed by the code object
+    and default values of the function at the end of their `__wrapped__` chain,
+    and whether they are bound, so that their signature is computed once.
+    Other callables are keyed by identity.
+
+    Objects whose identity is part of a key are kept alive while cached, so
+    that their `id` cannot be reused.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        # key -> (objects kept alive, dump)
+        self._entries: "OrderedDict[Tuple, Tuple[Any, List]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(function) -> Tuple[Tuple, Any]:
+        """
+        Return the cache key of `function`, and the objects to keep alive.
+        """
+        bound = isinstance(function, MethodType)
+        target = function.__func__ if bound else function
+        while not hasattr(target, "__signature__") and hasattr(target, "__wrapped__"):
+            target = target.__wrapped__
+        if type(target) is not FunctionType or hasattr(target, "__signature__"):
+            return ("id", id(function)), function
+        defaults = (target.__defaults__, target.__kwdefaults__)
+        return (target.__code__, id(defaults[0]), id(defaults[1]), bound), defaults
+
+    def dump(self, function, compute) -> List:
+        """
+        Signature dump of `function`, from the cache or from `compute(function)`.
+        """
+        key, keep = self.key(function)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        dump = compute(function)
+        self._entries[key] = (keep, dump)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return dump
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _signature_dump(function, render=render) -> List:
+    return sig_dump(inspect.signature(function), render)
+
+
+def _dereference(ref):
+    """
+    Return the object behind a reference created for `_consistency`.
+    """
+    if isinstance(ref, weakref.ref):
+        return ref()
+    return ref
+
+
+class HandlerRegistry:
+    """
+    Visit handlers for types the visitors know nothing about.
+
+    A handler is called as `handler(visitor, node)` for nodes whose type is, or
+    derives from, the type it was registered for, and returns the key of the
+    node like the `visit_*` methods do (None if it should not be collected).
+    Registered handlers take precedence over the `visit_*` methods, and are
+    called whatever the `__module__` of the node, deciding themselves whether
+    it is in scope. Handlers are looked up along the MRO of the type of nodes,
+    once per type.
+
+    Usually used through the module level `register`:
+
+        @register(functools.partial)
+        def visit_partial(visitor, node):
+            ...
+    """
+
+    def __init__(self):
+        self._handlers: Dict[type, Callable] = {}
+        self._resolved: Dict[type, Optional[Callable]] = {}
+        # bumped on each change, for visitors to drop their dispatch caches.
+        self.version = 0
+
+    def register(self, type_: type, handler: Optional[Callable] = None):
+        """
+        Register `handler` for `type_`; without handler, return a decorator.
+        """
+        if handler is None:
+            return functools.partial(self.register, type_)
+        self._handlers[type_] = handler
+        self._changed()
+        return handler
+
+    def unregister(self, type_: type):
+        del self._handlers[type_]
+        self._changed()
+
+    def _changed(self):
+        self._resolved.clear()
+        self.version += 1
+
+    def lookup(self, type_: type) -> Optional[Callable]:
+        try:
+            return self._resolved[type_]
+        except KeyError:
+            pass
+        handler = next(
+            (self._handlers[c] for c in type_.__mro__ if c in self._handlers), None
+        )
+        self._resolved[type_] = handler
+        return handler
+
+
+handlers = HandlerRegistry()
+register = handlers.register
+
+
+def _dispatch_name(type_: type) -> Optional[str]:
+    """
+    Name of the `visit_*` method for objects of type `type_`, or None if it
+    depends on the object itself.
+    """
+    if issubclass(type_, ModuleType):
+        return "module"
+    if issubclass(type_, type):
+        return "type" if type_ is type else "metaclass_instance"
+    mro = type_.__mro__
+    if any("__getattr__" in vars(c) for c in mro):
+        # `hasattr(node, "__call__")` may be anything.
+        return None
+    if not any("__call__" in vars(c) for c in mro):
+        return "instance"
+    return type_.__name__
 
 
 class BaseVisitor:
@@ -59,7 +383,9 @@ class BaseVisitor:
     object)`, that should return predictable and stable keys for passed object.
     The generic `visit` method will dispatch on the given `visit_*` method when
     it visit a given type, and will fallback on `visit_unknown(self, obj)` if no
-    corresponding method is found.
+    corresponding method is found. Handlers can also be added without
+    subclassing with `register`, see `HandlerRegistry`. The handler of each
+    type is resolved once, and cached.
 
 
     TODO: figure out and document when to add stuff to rejected, collected, and
@@ -72,7 +398,7 @@ class BaseVisitor:
         3) Black/whitelisted while in dev.
     """
 
-    def __init__(self, name: str, *, logger=None):
+    def __init__(self, name: str, *, logger=None, profile=None):
         """
 
         Parameters
@@ -83,30 +409,30 @@ class BaseVisitor:
             name do not start with this will not be recursed into.
         logger: Logger
             Logger instance to use to print debug messages.
+        profile: CrawlProfile
+            If given, time spent in each `visit_*` method is recorded in it.
 
         """
 
         self.name = name
 
-        # list of visited nodes to avoid recursion and going in circle.
-        # can't be a set we store non-hashable objects
-        # which is weird why not store memory-location -> object ?
-        # anyway...
-        self.visited: List[int] = list()
-        self._hash_cache: Dict[int, str] = dict()
+        # registry of visited nodes to avoid recursion and going in circle,
+        # mapping each node (by identity) to the key it was visited as.
+        self.visited = IdentityRegistry()
 
         # set of object keys that where deemed worth collecting
         self.collected: Set[str] = set({})
 
-        # list of object we did not visit (for example, we encounter an object
-        # not from targeted module, from the stdlib....
-        self.rejected: List[str] = list()
+        # registry of object we did not visit (for example, we encounter an
+        # object not from targeted module, from the stdlib....
+        self.rejected = IdentityRegistry()
 
         # dict of key -> custom spec that should be serialised for later
         # comparison later.
-        self.spec: Dict[str, Dict] = dict()
+        self.spec: Dict[str, Dict] = Spec()
 
-        # debug, make sure 2 objects are not getting the same key
+        # debug, make sure 2 objects are not getting the same key. Map key to a
+        # reference of the first object seen for it (see `IdentityRegistry`).
         self._consistency: Dict[str, Any] = {}
 
         if not logger:
@@ -114,6 +440,22 @@ class BaseVisitor:
         else:
             self.logger = logger
 
+        self.profile = profile
+
+        # type -> (name, handler, registered), see `_handler`.
+        self._dispatch: Dict[type, Tuple[str, Callable, bool]] = {}
+        self._dispatch_version = handlers.version
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of collected, visited and rejected objects.
+        """
+        return {
+            "collected": len(self.collected),
+            "visited": len(self.visited),
+            "rejected": len(self.rejected),
+        }
+
     def _consistent(self, key, value):
         """
         If the current object we are visiting map to the same key and the same value.
@@ -124,13 +466,18 @@ class BaseVisitor:
         that.
         """
         if key in self._consistency:
-            if self._consistency[key] is not value:
+            previous = _dereference(self._consistency[key])
+            if previous is not value:
                 self.logger.info(
-                    "Warning %s is not %s, results may not be consistent"
-                    % (self._consistency[key], value)
+                    "Warning %s is not %s, results may not be consistent",
+                    previous,
+                    value,
                 )
         else:
-            self._consistency[key] = value
+            try:
+                self._consistency[key] = weakref.ref(value)
+            except TypeError:
+                self._consistency[key] = value
 
     def visit(self, node):
         """
@@ -139,47 +486,123 @@ class BaseVisitor:
         If node is not visitable, return `None`.
 
         """
+        found, key = self.visited.lookup(node)
+        if found:
+            # todo, if visited check the localkey and return it.
+            # otherwise methods moved to superclass will/may be lost.
+            # or not correctly reported
+            return key
+        self.visited.add(node)
+        if self._dispatch_version != handlers.version:
+            self._dispatch.clear()
+            self._dispatch_version = handlers.version
         try:
-            if id(node) in [id(x) for x in self.visited]:
-                # todo, if visited check the localkey and return it.
-                # otherwise methods moved to superclass will/may be lost.
-                # or not correctly reported
-                return self._hash_cache.get(id(node))
-            else:
-                # that seem to be wrong, we likely should put id(node) in that.
-                self.visited.append(node)
-        except TypeError:
-            raise
-            # non equalable things (eg dtype/modules)
-            return None
-        mod = getattr(node, "__module__", None)
-        if mod and not mod.startswith(self.name):
-            self.rejected.append(node)
-            return
-
-        is_callable = hasattr(node, "__call__")
-        if isinstance(node, ModuleType):
-            type_ = "module"
-        elif (
-            isinstance(node, object) and not isinstance(node, type) and not is_callable
-        ):
-            type_ = "instance"
-        elif issubclass(type(node), type) and type(node) is not type:
-            type_ = "metaclass_instance"
+            name, visitor, registered = self._dispatch[type(node)]
+        except KeyError:
+            name, visitor, registered = self._handler(node)
+        if not registered:
+            mod = getattr(node, "__module__", None)
+            if mod and not mod.startswith(self.name):
+                self.rejected.add(node)
+                return
+
+        if self.profile is None:
+            visited_hash = visitor(node)
         else:
-            type_ = type(node).__name__
-        visitor = getattr(self, "visit_" + type_, self.visit_unknown)
-        visited_hash = visitor(node)
-        self._hash_cache[id(node)] = visited_hash
+            visited_hash = self.profile.handler(name, visitor, node)
+        self.visited.add(node, visited_hash)
         return visited_hash
 
+    def _handler(self, node) -> Tuple[str, Callable, bool]:
+        """
+        Name and handler to visit `node` with, and whether it was registered,
+        cached by type when it does not depend on the node.
+        """
+        type_ = type(node)
+        handler = handlers.lookup(type_)
+        if handler is not None:
+            name = getattr(handler, "__name__", repr(handler))
+            resolved = name, functools.partial(handler, self), True
+        else:
+            name = _dispatch_name(type_)
+            cache = name is not None
+            if name is None:
+                name = "instance" if not hasattr(node, "__call__") else type_.__name__
+            visitor = getattr(self, "visit_" + name, self.visit_unknown)
+            resolved = visitor.__name__, visitor, False
+            if not cache:
+                return resolved
+        self._dispatch[type_] = resolved
+        return resolved
+
 
 class Visitor(BaseVisitor):
+    def __init__(
+        self,
+        name: str,
+        *,
+        logger=None,
+        profile=None,
+        stubs=None,
+        own_members=False,
+        resolve_lazy=False,
+    ):
+        """
+        See `BaseVisitor`.
+
+        stubs: StubIndex
+            where to look for signatures of functions of extension modules that
+            `inspect.signature` cannot find. Default to an index without disk
+            cache.
+        own_members: bool
+            record in the items of classes only the members they define, and
+            those inherited from out of scope bases, plus the list of their in
+            scope bases as `mro`. Inherited items can be resolved with
+            `resolve_items`.
+        resolve_lazy: bool
+            get the lazy attributes of modules (see `lazy_attributes`) that
+            are not imported yet, importing them. By default they are recorded
+            as module items with what they resolve to as `lazy`, and the
+            signature of functions declared in stubs.
+        """
+        super().__init__(name, logger=logger, profile=profile)
+        self.own_members = own_members
+        self.resolve_lazy = resolve_lazy
+        self.signatures = SignatureCache()
+        # converts default values and instances to text, see `render`.
+        self.render = Renderer()
+        signature_dump = functools.partial(_signature_dump, render=self.render)
+        if profile is None:
+            self._signature_dump = signature_dump
+        else:
+            self._signature_dump = profile.timed("signature", signature_dump)
+        if stubs is None:
+            from .stubs import StubIndex
+
+            stubs = StubIndex()
+        self.stubs = stubs
+
+    def _signature(self, function, module_name: str) -> Optional[List]:
+        """
+        Signature dump of `function`, from its `__text_signature__` or code, or
+        from the stub file of its module; None if none is available.
+        """
+        try:
+            return self.signatures.dump(function, self._signature_dump)
+        except (ValueError, TypeError):
+            pass
+        dump = None
+        if module_name:
+            dump = self.stubs.signature(module_name, function.__qualname__)
+        if dump is None:
+            self.logger.debug("    no signature for %s", function)
+        return dump
+
     def visit_metaclass_instance(self, meta_instance):
         return self.visit_type(meta_instance)
 
     def visit_unknown(self, unknown):
-        self.rejected.append(unknown)
+        self.rejected.add(unknown)
 
         self.logger.debug("Unknown: ========")
         self.logger.debug("Unknown: No clue what to do with %s", unknown)
@@ -206,13 +629,35 @@ class Visitor(BaseVisitor):
         self.logger.debug("Unknown: ========")
 
     def visit_method_descriptor(self, meth):
-        self.logger.debug("Unimplemented, visiting_meth_descriptor", meth)
+        module_name = meth.__objclass__.__module__
+        if not module_name.startswith(self.name):
+            self.rejected.add(meth)
+            return
+        return self._visit_callable(meth, module_name)
+
+    visit_classmethod_descriptor = visit_method_descriptor
 
     def visit_builtin_function_or_method(self, bltin):
-        try:
-            return self.visit_function(bltin)
-        except ValueError:
-            return
+        return self._visit_callable(bltin, bltin.__module__)
+
+    # functions compiled by Cython carry a signature when compiled with
+    # `binding=True`.
+    visit_cython_function_or_method = visit_builtin_function_or_method
+    visit_fused_cython_function = visit_builtin_function_or_method
+
+    def _visit_callable(self, function, module_name):
+        """
+        Record a function of an extension module if its signature is known.
+        """
+        dump = self._signature(function, module_name)
+        if dump is None:
+            return None
+        fullqual = "{}.{}".format(module_name or "BUILTIN", function.__qualname__)
+        self.logger.debug("    visit_function %s", fullqual)
+        self.collected.add(fullqual)
+        self.spec[fullqual] = {"type": "function", "signature": dump}
+        self._consistent(fullqual, function)
+        return fullqual
 
     def visit_method(self, b):
         return self.visit_function(b)
@@ -223,38 +668,32 @@ class Visitor(BaseVisitor):
             name = "BUILTIN"
         fullqual = "{}.{}".format(name, function.__qualname__)
 
-        ##
-        sig = hexuniformify(str(inspect.signature(function)))
-        self.logger.debug("    visit_function {f}{s}".format(f=fullqual, s=sig))
-        ##
+        signature = self.signatures.dump(function, self._signature_dump)
+        self.logger.debug("    visit_function %s", fullqual)
 
         self.collected.add(fullqual)
-        if fullqual.startswith("None."):
-            import pdb
-
-            pdb.set_trace()
-            raise ValueError(function)
         self.spec[fullqual] = {
             "type": "function",
             # we don't store sign here as they would not be
             # deep-copyable.
-            "signature": sig_dump(inspect.signature(function)),
+            "signature": signature,
         }
         self._consistent(fullqual, function)
         return fullqual
 
     def visit_instance(self, instance):
-        self.rejected.append(instance)
-        self.logger.debug("    visit_instance %s", instance)
-        try:
-            return str(instance)
-        except Exception:
-            print("error in visit instance stringifying")
+        self.rejected.add(instance)
+        self.logger.debug("    visit_instance %s", type(instance))
+        if self.profile is None:
+            return self.render(instance)
+        return self.profile.call("stringify", self.render, instance)
 
     def visit_type(self, type_):
         fullqual = type_.__module__ + "." + type_.__qualname__
         items = {}
-        self.logger.debug("Class %s" % type_.__module__ + "." + type_.__qualname__)
+        self.logger.debug("Class %s", fullqual)
+        if self.own_members:
+            return self._visit_type_own_members(type_, fullqual)
         for k in sorted(dir(type_)):
             if not k.startswith("_"):
                 items[k] = self.visit(getattr(type_, k))
@@ -263,26 +702,54 @@ class Visitor(BaseVisitor):
         self.collected.add(fullqual)
         return fullqual
 
+    def _visit_type_own_members(self, type_, fullqual):
+        mro = []
+        in_scope = set()
+        for base in type_.__mro__[1:]:
+            if str(getattr(base, "__module__", "")).startswith(self.name):
+                # make sure the base has its own entry.
+                self.visit(base)
+                mro.append(base.__module__ + "." + base.__qualname__)
+                in_scope.add(base)
+        items = {}
+        for k in sorted(dir(type_)):
+            if k.startswith("_"):
+                continue
+            # members first defined by an in scope base are in its own entry.
+            owner = next((c for c in type_.__mro__ if k in vars(c)), None)
+            if owner not in in_scope:
+                items[k] = self.visit(getattr(type_, k))
+        entry = {"type": "type", "items": {k: v for k, v in items.items() if v}}
+        if mro:
+            entry["mro"] = mro
+        self.spec[fullqual] = entry
+        self.collected.add(fullqual)
+        return fullqual
+
     def visit_module(self, module):
-        self.logger.debug("Module %s" % module)
+        self.logger.debug("Module %s", module)
         if not module.__name__.startswith(self.name):
-            self.logger.debug(
-                "out of scope %s vs %s : %s"
-                % (module.__name__, self.name, module.__name__.startswith(self.name))
-            )
+            self.logger.debug("out of scope %s vs %s", module.__name__, self.name)
             return None
-        for k in dir(module):
+        lazy = {} if self.resolve_lazy else lazy_attributes(module, self.stubs)
+        # the `__dir__` of lazy modules may only list their lazy attributes.
+        for k in sorted(set(dir(module)) | set(vars(module)) | set(lazy)):
             if k.startswith("_") and not (k.startswith("__") and k.endswith("__")):
                 self.logger.debug(
-                    "     visit_module: skipping private attribute: %s.%s"
-                    % (module.__name__, k)
+                    "     visit_module: skipping private attribute: %s.%s",
+                    module.__name__,
+                    k,
                 )
                 continue
             else:
                 self.logger.debug(
-                    "     visit_module: visiting public attribute; %s.%s"
-                    % (module.__name__, k)
+                    "     visit_module: visiting public attribute; %s.%s",
+                    module.__name__,
+                    k,
                 )
+                if k in lazy and not is_loaded(lazy[k]):
+                    self._visit_lazy(module, k, lazy[k])
+                    continue
                 try:
                     item = getattr(module, k)
                     key = f"{module.__name__}.{k}"
@@ -290,41 +757,37 @@ class Visitor(BaseVisitor):
                     # both object with on w.o fullqual name, so this willdepends
                     # on dictionary order.
                     # we want to store the moduels items differently
-                    import typing
-                    from types import FunctionType
-                    if isinstance(item, typing._SpecialForm):
-                        fullqual = ' (reexport of typing annotation '+item.__module__ + "." + item._name+')'
+                    if is_reexport(key, item):
                         continue
-                    elif isinstance(item, type):
-                        if key == item.__module__+'.'+item.__name__ :
-                            fullqual=''
-                        else:
-                            fullqual = ' (reexport of '+item.__module__ + "." + item.__name__+')'
-                            continue
-                    elif isinstance(item, ModuleType):
-                        if key == item.__name__:
-                            fullqual = ''
-                        else:
-                            fullqual = ' (reexport of module '+item.__name__ +')'
-                            continue
-                    elif isinstance(item, FunctionType):
-                        if key == item.__module__+'.'+item.__name__ :
-                            fullqual = ''
-                        else:
-                            fullqual = ' (reexport of function '+item.__module__+'.'+item.__name__ +')'
-                            continue
-                    else:
-                        fullqual = ''
-
-
 
                     if key in self.spec:
                         continue
 
-
-                    self.spec[f"{key}{fullqual}"] = {"type": "module_item"}
+                    self.spec[key] = {"type": "module_item"}
                 except ImportError:
-                    pass
                     # maybe reject ?
+                    continue
 
                 self.visit(item)
+
+    def _visit_lazy(self, module, name: str, target: Optional[str]):
+        """
+        Record the lazy attribute `name` of `module` without resolving it.
+        """
+        self.logger.debug(
+            "     visit_module: lazy attribute %s.%s", module.__name__, name
+        )
+        key = f"{module.__name__}.{name}"
+        if key in self.spec:
+            return
+        entry = {"type": "module_item"}
+        if target is not None:
+            entry["lazy"] = target
+        self.spec[key] = entry
+        if target is None or not target.startswith(self.name) or target in self.spec:
+            return
+        parent, _, attribute = target.rpartition(".")
+        dump = self.stubs.signature(parent, attribute)
+        if dump is not None:
+            self.spec[target] = {"type": "function", "signature": dump}
+            self.collected.add(target)
@@ -0,0 +1,340 @@
+"""
+Keep crawling a package as its sources change.
+
+A `Watcher` crawls the requested modules once, and splits the spec by the
+module that owns each entry (the module defining it, or the module it is an
+item of). `refresh` then looks at the modification time of the sources of the
+imported modules of the package, reloads the modules that changed and the
+modules whose classes refer to their entries (through inherited members or
+bases), and re-crawls each of those alone, without descending into the other
+modules, to replace the entries it owns. `spec` is thus up to date again in a
+fraction of the time of a full crawl in a new interpreter.
+
+`watch` refreshes in the foreground and prints the changes each time; `serve`
+does the same in the background of a Unix socket server, that answers the
+requests `request` sends with a comparison to a given spec.
+
+Reloading modules has the usual limits of `importlib.reload`: objects created
+from the old modules (instances, subclasses in modules that were not
+reloaded) keep referring to the old definitions.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import select
+import socket
+import sys
+import time
+import types
+from collections import defaultdict
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .logging import logger
+from .parallel import merge_entry
+from .profiling import module_section
+from .visitor import Visitor
+
+# seconds between two looks at the sources.
+INTERVAL = 0.5
+
+
+class Watcher:
+    """
+    Crawl of `modules`, updated by `refresh` when their sources change.
+
+    See `visit_modules` for the arguments.
+    """
+
+    def __init__(
+        self,
+        rootname: str,
+        modules,
+        *,
+        stubs=None,
+        own_members=False,
+        resolve_lazy=False,
+        profile=None,
+    ):
+        from . import visit_modules
+
+        self.rootname = rootname
+        self.stubs = stubs
+        self.own_members = own_members
+        self.resolve_lazy = resolve_lazy
+        self.profile = profile
+        # module name -> error, for modules that could not be reloaded.
+        self.errors: Dict[str, str] = {}
+        _, visitor = visit_modules(
+            rootname,
+            modules,
+            stubs=stubs,
+            own_members=own_members,
+            resolve_lazy=resolve_lazy,
+            profile=profile,
+        )
+        self.spec = visitor.spec
+        self._modules = self._in_scope()
+        # module name -> the entries it owns, and the modules they refer to.
+        self.parts: Dict[str, Dict[str, Dict]] = {}
+        self.dependencies: Dict[str, Set[str]] = {}
+        parts = defaultdict(dict)
+        for key, entry in self.spec.items():
+            parts[self._owner(key, entry)][key] = entry
+        for name, part in parts.items():
+            self._set_part(name, part)
+        self._mtimes = self._sources()
+
+    def _in_scope(self) -> Dict[str, types.ModuleType]:
+        root = self.rootname.split(".")[0]
+        return {
+            name: module
+            for name, module in list(sys.modules.items())
+            if module is not None and (name == root or name.startswith(root + "."))
+        }
+
+    def _owner(self, key: str, entry: Optional[Dict] = None) -> str:
+        """
+        The module defining `key`, or the module it is an item of.
+        """
+        if entry is not None and entry["type"] == "module_item":
+            key = key.rpartition(".")[0]
+        while key and key not in self._modules:
+            key = key.rpartition(".")[0]
+        return key
+
+    def _set_part(self, name: str, part: Dict[str, Dict]):
+        old = self.parts.get(name, {})
+        for key, entry in old.items():
+            if self.spec.get(key) is entry:
+                del self.spec[key]
+        for key, entry in part.items():
+            merge_entry(self.spec, key, entry)
+        self.parts[name] = part
+        # classes refer to the members they inherit, and to their bases.
+        dependencies = set()
+        for entry in part.values():
+            if entry["type"] == "type":
+                for ref in chain(entry["items"].values(), entry.get("mro", ())):
+                    if isinstance(ref, str):
+                        dependencies.add(self._owner(ref))
+        self.dependencies[name] = dependencies - {name, ""}
+
+    def _crawl(self, name: str):
+        """
+        Visit module `name` alone, and replace the entries it owns.
+        """
+        visitor = Visitor(
+            self.rootname.split(".")[0],
+            logger=logger,
+            profile=self.profile,
+            stubs=self.stubs,
+            own_members=self.own_members,
+            resolve_lazy=self.resolve_lazy,
+        )
+        # do not descend into the other modules, their entries are up to date.
+        for other, module in self._modules.items():
+            if other != name:
+                visitor.visited.add(module)
+        with module_section(self.profile, name, visitor.spec):
+            visitor.visit(self._modules[name])
+        self._set_part(
+            name,
+            {
+                key: entry
+                for key, entry in visitor.spec.items()
+                if self._owner(key, entry) == name
+            },
+        )
+
+    def _sources(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        mtimes = {}
+        for module in self._modules.values():
+            path = getattr(module, "__file__", None)
+            if not path:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # removed, reloading will tell.
+                mtimes[path] = None
+                continue
+            mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+        return mtimes
+
+    def changed_modules(self) -> List[str]:
+        """
+        Imported modules of the package whose source changed since the last
+        refresh.
+        """
+        mtimes = self._sources()
+        changed = {
+            path for path, mtime in mtimes.items() if self._mtimes.get(path) != mtime
+        }
+        self._mtimes = mtimes
+        return sorted(
+            name
+            for name, module in self._modules.items()
+            if getattr(module, "__file__", None) in changed
+        )
+
+    def refresh(self) -> List[str]:
+        """
+        Reload the modules that changed and the modules whose entries refer to
+        theirs, and re-crawl them. Return the modules that changed.
+
+        Modules that fail to reload are left as they were, with their error in
+        `errors`, until they change again.
+        """
+        changed = self.changed_modules()
+        if not changed:
+            return []
+        stale = set(changed).union(
+            name
+            for name, dependencies in self.dependencies.items()
+            if dependencies.intersection(changed)
+        )
+        # submodules first, so that packages reloaded after them pick up
+        # their new content.
+        for name in sorted(stale, key=lambda n: (-n.count("."), n)):
+            try:
+                importlib.reload(self._modules[name])
+            except Exception as e:
+                self.errors[name] = "{}: {}".format(type(e).__name__, e)
+                continue
+            self.errors.pop(name, None)
+        # reloading may have imported new modules.
+        self._modules = self._in_scope()
+        for name in sorted(stale):
+            # modules the crawl did not reach stay out of the spec.
+            if name in self.parts and name not in self.errors:
+                self._crawl(name)
+        self._mtimes = self._sources()
+        return changed
+
+    def report(self, old_spec, import_threshold: float = 0.2) -> Tuple[str, int]:
+        """
+        Text of the comparison of `old_spec` with the current spec, as printed
+        by `frappuccino --compare`, and its exit status.
+        """
+        from . import report_comparison
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for name, error in sorted(self.errors.items()):
+                print("could not reload {}: {}".format(name, error))
+            changed = report_comparison(
+                old_spec, self.spec, import_threshold=import_threshold
+            )
+        return out.getvalue(), int(changed)
+
+
+def watch(watcher: Watcher, old_spec=None, *, interval: float = INTERVAL, **kwargs):
+    """
+    Refresh `watcher` until interrupted, printing the comparison of its spec
+    with `old_spec` (or, if None, with the spec before the refresh) after each
+    change. See `Watcher.report` for `kwargs`.
+    """
+    if old_spec is not None:
+        print(watcher.report(old_spec, **kwargs)[0])
+    print("Watching {} for changes...".format(watcher.rootname))
+    try:
+        while True:
+            time.sleep(interval)
+            previous = watcher.spec
+            start = time.perf_counter()
+            changed = watcher.refresh()
+            if not changed:
+                continue
+            print(
+                "Changed {}, updated in {:.3f}s".format(
+                    ", ".join(changed), time.perf_counter() - start
+                )
+            )
+            print(
+                watcher.report(previous if old_spec is None else old_spec, **kwargs)[0]
+            )
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(
+    watcher: Watcher,
+    path: str,
+    load: Callable,
+    *,
+    interval: float = INTERVAL,
+    ready: Optional[Callable] = None,
+):
+    """
+    Answer `request`s on the Unix socket at `path`, refreshing `watcher`
+    between requests until one asks to stop.
+
+    Specs to compare to are read with `load(name)`, and kept as long as their
+    file does not change. `ready` is called once the socket listens.
+    """
+    loaded: Dict[str, Tuple] = {}
+
+    def baseline(name: str):
+        try:
+            mtime = os.stat(name).st_mtime_ns
+        except OSError:
+            mtime = None
+        if name not in loaded or loaded[name][0] != mtime:
+            loaded[name] = (mtime, load(name))
+        return loaded[name][1]
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(path):
+        os.unlink(path)
+    server.bind(path)
+    server.listen()
+    if ready is not None:
+        ready()
+    try:
+        while True:
+            if not select.select([server], [], [], interval)[0]:
+                watcher.refresh()
+                continue
+            connection, _ = server.accept()
+            with connection, connection.makefile("rw") as f:
+                message = json.loads(f.readline() or "{}")
+                if message.get("stop"):
+                    _send(f, {"report": "", "status": 0})
+                    break
+                watcher.refresh()
+                try:
+                    report, status = watcher.report(
+                        baseline(message["compare"]),
+                        import_threshold=message.get("import_threshold", 0.2),
+                    )
+                except Exception as e:
+                    report, status = "{}: {}\n".format(type(e).__name__, e), 2
+                _send(f, {"report": report, "status": status})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.unlink(path)
+
+
+def _send(f, message: Dict):
+    f.write(json.dumps(message) + "\n")
+    f.flush()
+
+
+def request(path: str, message: Dict) -> Dict:
+    """
+    Send `message` to the server listening at `path`, and return its reply.
+
+    `message` is `{"compare": name}`, with optionally an `import_threshold`,
+    or `{"stop": True}`; the reply is `{"report": text, "status": status}`.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        with client.makefile("rw") as f:
+            _send(f, message)
+            return json.loads(f.readline())